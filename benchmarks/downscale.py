@@ -0,0 +1,63 @@
+"""Time full-decode Lanczos resizing against the fast downscale path.
+
+    python benchmarks/downscale.py [--size 8000x6000] [--target 1600] [--runs 3]
+
+Generates a synthetic camera-sized JPEG in a temporary folder and converts
+it to a web-sized JPEG with each resampling tier, with and without
+fast_downscale.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image  # noqa: E402
+
+from media_converter.images import RESAMPLE_TIERS, convert_image  # noqa: E402
+
+
+def make_source(path, width, height):
+    # Gradient plus noise so the encoder and resampler do real work
+    base = Image.linear_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), 40)
+    Image.merge("RGB", (base, noise, base.transpose(Image.Transpose.FLIP_LEFT_RIGHT))).save(path, "JPEG", quality=92)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--size", default="8000x6000")
+    ap.add_argument("--target", type=int, default=1600, help="output width")
+    ap.add_argument("--runs", type=int, default=3)
+    args = ap.parse_args()
+    w, h = (int(v) for v in args.size.lower().split("x"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "source.jpg")
+        make_source(src, w, h)
+        out = os.path.join(tmp, "out")
+        os.mkdir(out)
+        # Baseline is the default path: full decode + Lanczos
+        cases = [("quality", False)] + [(t, f) for f in (False, True) for t in RESAMPLE_TIERS if (t, f) != ("quality", False)]
+        baseline = None
+        for tier, fast in cases:
+            samples = []
+            for _ in range(args.runs):
+                t0 = time.perf_counter()
+                ok = convert_image(src, "JPEG", out, width=args.target, conflict="replace",
+                                   resample=tier, fast_downscale=fast)
+                samples.append(time.perf_counter() - t0)
+                if not ok:
+                    sys.exit("conversion failed")
+            med = statistics.median(samples)
+            if baseline is None:
+                baseline = med
+            label = f"{tier}{' + fast_downscale' if fast else ''}"
+            print(f"{label:28s} median {med * 1000:8.1f} ms   speedup {baseline / med:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
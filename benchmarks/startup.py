@@ -0,0 +1,51 @@
+"""Compare CLI and GUI startup time.
+
+    python benchmarks/startup.py [--runs N]
+
+CLI: `python -m media_converter convert --help` (argument parsing only; no
+Pillow, Tk or tkinterdnd2). GUI: importing the GUI dependencies and
+creating/destroying the root window, which needs a display; when none is
+available the import cost alone is reported.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = {
+    "cli --help": [sys.executable, "-m", "media_converter", "convert", "--help"],
+    "library import": [sys.executable, "-c", "import media_converter.images, media_converter.video"],
+    "gui imports": [sys.executable, "-c", "import tkinter, tkinterdnd2, PIL.ImageTk, media_converter.images, media_converter.video"],
+    "gui window": [sys.executable, "-c", "import media_converter.gui as g; g.root.update(); g.root.destroy()"],
+}
+
+
+def time_cmd(cmd, runs):
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        r = subprocess.run(cmd, cwd=REPO_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - t0)
+        if r.returncode != 0:
+            return None
+    return samples
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+    for name, cmd in CASES.items():
+        samples = time_cmd(cmd, args.runs)
+        if samples is None:
+            print(f"{name:16s}  unavailable (missing dependency or display)")
+            continue
+        print(f"{name:16s}  median {statistics.median(samples) * 1000:7.1f} ms  min {min(samples) * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""Reproducible image/video conversion benchmark.
+
+    python benchmarks/suite.py [--quick] [--runs N] [--out results.json]
+                               [--compare baseline.json] [--threshold 10]
+                               [--no-video] [--no-images]
+
+Generates synthetic inputs in a temporary folder: deterministic JPEG, PNG,
+TIFF, HEIC and WEBP images at several resolutions (Pillow/pillow-heif) and,
+when ffmpeg is available, lavfi testsrc2 + sine clips including a raw .hevc
+stream. Each case runs in a fresh child process through the real
+convert_image/convert_video paths and reports throughput, per-file latency
+and peak RSS (ru_maxrss of the worker and of its ffmpeg children). Results
+are written as JSON; --compare prints per-case changes against an earlier
+file and exits 1 when a median latency regressed by more than --threshold
+percent. Needs no network access or GPU.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+IMAGE_SIZES = [(640, 480), (1920, 1080), (4032, 3024)]
+QUICK_IMAGE_SIZES = [(640, 480), (1920, 1080)]
+IMAGE_SOURCES = ["JPEG", "PNG", "TIFF", "HEIC", "WEBP"]
+# (label, convert_image kwargs)
+IMAGE_TARGETS = [
+    ("jpeg", {"output_format": "JPEG"}),
+    ("jpeg-800w", {"output_format": "JPEG", "width": 800}),
+    ("webp", {"output_format": "WEBP"}),
+]
+
+CLIP_SECONDS = 5
+QUICK_CLIP_SECONDS = 2
+CLIP_RATE = 30
+# (name, resolution, ffmpeg output arguments)
+VIDEO_SOURCES = [
+    ("h264-aac-720p.mp4", "1280x720", ["-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-b:a", "128k"]),
+    ("hevc-1080p.hevc", "1920x1080", ["-an", "-c:v", "libx265", "-preset", "ultrafast", "-f", "hevc"]),
+]
+# (label, source name, convert_video kwargs)
+VIDEO_CASES = [
+    ("mp4-encode", "h264-aac-720p.mp4", {"output_format": "mp4"}),
+    ("mp4-remux-mkv", "h264-aac-720p.mp4", {"output_format": "mkv", "remux": True}),
+    ("mp4-webm", "h264-aac-720p.mp4", {"output_format": "webm"}),
+    ("hevc-mp4-encode", "hevc-1080p.hevc", {"output_format": "mp4"}),
+    ("hevc-mp4-720p", "hevc-1080p.hevc", {"output_format": "mp4", "height": 720}),
+]
+
+EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "TIFF": ".tif", "HEIC": ".heic", "WEBP": ".webp"}
+
+
+# ---- input generation -------------------------------------------------------
+
+def synthetic_image(width, height, seed=0):
+    """Deterministic RGB test image: gradients, a fractal and seeded noise, so
+    encoders and resamplers see both smooth areas and fine detail."""
+    from PIL import Image
+
+    rng = random.Random(seed)
+    tile = Image.frombytes("L", (256, 256), rng.randbytes(256 * 256))
+    noise = Image.new("L", (width, height))
+    for x in range(0, width, 256):
+        for y in range(0, height, 256):
+            noise.paste(tile, (x, y))
+    gradient = Image.linear_gradient("L").resize((width, height))
+    fractal = Image.effect_mandelbrot((width, height), (-2.0, -1.25, 0.75, 1.25), 64)
+    detail = Image.blend(fractal, noise, 0.35)
+    return Image.merge("RGB", (gradient, detail, Image.radial_gradient("L").resize((width, height))))
+
+
+def make_images(folder, sizes):
+    from media_converter import images  # noqa: F401  (registers the HEIC opener)
+
+    made = []
+    for w, h in sizes:
+        im = synthetic_image(w, h)
+        for fmt in IMAGE_SOURCES:
+            path = os.path.join(folder, f"{w}x{h}{EXTENSIONS[fmt]}")
+            save_kwargs = {"quality": 90} if fmt in ("JPEG", "HEIC", "WEBP") else {}
+            im.save(path, "HEIF" if fmt == "HEIC" else fmt, **save_kwargs)
+            made.append((fmt, (w, h), path))
+    return made
+
+
+def make_clips(folder, ff, seconds):
+    """Render lavfi clips; sources whose encoder is missing are skipped."""
+    made = {}
+    for name, size, out_args in VIDEO_SOURCES:
+        path = os.path.join(folder, name)
+        cmd = [ff, "-y", "-hide_banner", "-loglevel", "error",
+               "-f", "lavfi", "-i", f"testsrc2=size={size}:rate={CLIP_RATE}:duration={seconds}",
+               "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=48000:duration={seconds}",
+               "-pix_fmt", "yuv420p", *out_args, "-shortest", path]
+        r = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if r.returncode == 0 and os.path.exists(path):
+            made[name] = path
+        else:
+            print(f"skipping {name}: {r.stderr.strip().splitlines()[-1:] or 'ffmpeg failed'}", file=sys.stderr)
+    return made
+
+
+# ---- measurement (runs in a child process per case) --------------------------
+
+def run_case(spec):
+    """Convert spec['inputs'] spec['runs'] times and return the raw samples."""
+    if spec["kind"] == "image":
+        from media_converter.images import convert_image as convert
+    else:
+        from media_converter.video import convert_video as convert
+    latencies = []
+    failures = 0
+    for _ in range(spec["runs"]):
+        for path in spec["inputs"]:
+            t0 = time.perf_counter()
+            ok = convert(path, output_folder=spec["out"], conflict="replace", **spec["options"])
+            latencies.append(time.perf_counter() - t0)
+            failures += not ok
+    return {
+        "latencies": latencies,
+        "failures": failures,
+        # Linux reports KiB
+        "rss_self_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "rss_children_kb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    }
+
+
+def measure(spec):
+    r = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", json.dumps(spec)],
+                       stdout=subprocess.PIPE, text=True, check=True)
+    raw = json.loads(r.stdout)
+    lat = sorted(raw["latencies"])
+    total = sum(lat)
+    files = len(lat)
+    result = {
+        "files": files,
+        "failures": raw["failures"],
+        "total_s": round(total, 4),
+        "files_per_s": round(files / total, 3) if total else None,
+        "latency_ms": {
+            "median": round(statistics.median(lat) * 1000, 2),
+            "p90": round(lat[min(files - 1, int(files * 0.9))] * 1000, 2),
+            "min": round(lat[0] * 1000, 2),
+            "max": round(lat[-1] * 1000, 2),
+        },
+        "peak_rss_mb": round(raw["rss_self_kb"] / 1024, 1),
+        "peak_child_rss_mb": round(raw["rss_children_kb"] / 1024, 1),
+    }
+    if spec.get("pixels"):
+        result["mpix_per_s"] = round(spec["pixels"] * spec["runs"] / total / 1e6, 2)
+    if spec.get("media_seconds"):
+        result["realtime_x"] = round(spec["media_seconds"] * spec["runs"] / total, 2)
+    return result
+
+
+# ---- reporting --------------------------------------------------------------
+
+def environment(ff):
+    import PIL
+
+    info = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pillow": PIL.__version__,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    try:
+        import pillow_heif
+        info["pillow_heif"] = pillow_heif.__version__
+    except ImportError:
+        info["pillow_heif"] = None
+    try:
+        out = subprocess.run([ff, "-version"], stdout=subprocess.PIPE, text=True).stdout
+        info["ffmpeg"] = out.splitlines()[0] if out else None
+    except Exception:
+        info["ffmpeg"] = None
+    try:
+        info["git_commit"] = subprocess.run(["git", "-C", REPO_DIR, "rev-parse", "--short", "HEAD"],
+                                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True).stdout.strip() or None
+    except Exception:
+        info["git_commit"] = None
+    return info
+
+
+def compare(results, baseline, threshold):
+    """Print median latency changes per case; return the regressed case names."""
+    regressed = []
+    old_cases = baseline.get("cases", {})
+    print(f"\n{'case':40s} {'base ms':>10s} {'now ms':>10s} {'change':>8s}")
+    for name, now in results["cases"].items():
+        old = old_cases.get(name)
+        if not old:
+            print(f"{name:40s} {'-':>10s} {now['latency_ms']['median']:10.1f}      new")
+            continue
+        a, b = old["latency_ms"]["median"], now["latency_ms"]["median"]
+        change = (b - a) / a * 100 if a else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressed.append(name)
+        print(f"{name:40s} {a:10.1f} {b:10.1f} {change:+7.1f}%{flag}")
+    return regressed
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--quick", action="store_true", help="smaller images and shorter clips")
+    ap.add_argument("--out", default="benchmark-results.json")
+    ap.add_argument("--compare", help="earlier results file to compare against")
+    ap.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    ap.add_argument("--no-images", action="store_true")
+    ap.add_argument("--no-video", action="store_true")
+    ap.add_argument("--worker", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_case(json.loads(args.worker))))
+        return 0
+
+    from media_converter.video import ffmpeg_available, find_ffmpeg
+
+    ff = find_ffmpeg()
+    results = {"env": environment(ff), "runs": args.runs, "quick": args.quick, "cases": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "out")
+        os.mkdir(out)
+
+        if not args.no_images:
+            sizes = QUICK_IMAGE_SIZES if args.quick else IMAGE_SIZES
+            for fmt, (w, h), path in make_images(tmp, sizes):
+                for label, options in IMAGE_TARGETS:
+                    name = f"image/{fmt.lower()}-{w}x{h}->{label}"
+                    spec = {"kind": "image", "inputs": [path], "options": options, "runs": args.runs,
+                            "out": out, "pixels": w * h}
+                    results["cases"][name] = measure(spec)
+                    print(f"{name:40s} {results['cases'][name]['latency_ms']['median']:9.1f} ms", file=sys.stderr)
+
+        if not args.no_video:
+            if not ffmpeg_available(ff):
+                print("ffmpeg not available; skipping video cases", file=sys.stderr)
+            else:
+                seconds = QUICK_CLIP_SECONDS if args.quick else CLIP_SECONDS
+                clips = make_clips(tmp, ff, seconds)
+                for label, source, options in VIDEO_CASES:
+                    if source not in clips:
+                        continue
+                    name = f"video/{label}"
+                    spec = {"kind": "video", "inputs": [clips[source]], "options": options, "runs": args.runs,
+                            "out": out, "media_seconds": seconds}
+                    results["cases"][name] = measure(spec)
+                    print(f"{name:40s} {results['cases'][name]['latency_ms']['median']:9.1f} ms", file=sys.stderr)
+
+    with open(args.out, "w", encoding="utf-8") as fh:
+        json.dump(results, fh, indent=2, sort_keys=True)
+    print(f"wrote {args.out}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            regressed = compare(results, json.load(fh), args.threshold)
+        if regressed:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""TEK Media Converter: image and video conversion helpers shared by the GUI.
+
+Library API (no Tk required)::
+
+    from media_converter import convert_image, convert_video, ImageConversionEngine
+
+Names are resolved lazily so importing the package stays cheap; Pillow and
+pillow-heif load on first use of an image helper.
+"""
+
+# Public name -> submodule that defines it
+_API = {
+    "convert_image": "images",
+    "convert_renditions": "images",
+    "convert_image_bytes": "images",
+    "convert_images_bytes": "images",
+    "search_quality": "quality",
+    "unique_path": "paths",
+    "OutputPlanner": "paths",
+    "iter_inputs": "paths",
+    "iter_media_files": "paths",
+    "ImageConversionEngine": "engine",
+    "default_workers": "engine",
+    "estimate_image_memory": "memory",
+    "convert_video": "video",
+    "build_video_command": "video",
+    "build_scale": "video",
+    "probe_video": "video",
+    "convert_video_chunked": "chunked",
+    "find_ffmpeg": "video",
+    "find_ffprobe": "video",
+    "ffmpeg_available": "video",
+    "VideoJobScheduler": "scheduler",
+    "EncodeSpeedHistory": "estimate",
+    "default_max_jobs": "scheduler",
+    "FileTimer": "timing",
+    "TimingLog": "timing",
+    "WatchService": "watch",
+    "ThumbnailLoader": "thumbnails",
+    "BatchJournal": "journal",
+    "ConversionServer": "server",
+    "MetadataCache": "cache",
+    "CachedImageProbe": "metadata",
+    "read_image_info": "metadata",
+}
+
+__all__ = sorted(_API)
+
+
+def __getattr__(name):
+    module = _API.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    value = getattr(import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
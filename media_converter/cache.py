@@ -0,0 +1,134 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+# Defaults keep the cache file in the tens of MB even with thumbnails
+DEFAULT_MAX_ENTRIES = 200_000
+DEFAULT_MAX_THUMB_BYTES = 64 * 1024 * 1024
+# Bounds are checked every this many writes rather than on every flush
+_EVICT_EVERY = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path      TEXT PRIMARY KEY,
+    size      INTEGER NOT NULL,
+    mtime_ns  INTEGER NOT NULL,
+    width     INTEGER,
+    height    INTEGER,
+    format    TEXT,
+    frames    INTEGER,
+    mode      TEXT,
+    thumb     BLOB,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_last_used ON files (last_used);
+"""
+
+_FIELDS = ("width", "height", "format", "frames", "mode", "thumb")
+
+
+def default_cache_path() -> str:
+    """Per-user cache location; MEDIA_CONVERTER_CACHE overrides it."""
+    env = os.environ.get("MEDIA_CONVERTER_CACHE")
+    if env:
+        return env
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        return os.path.join(base, "TEKMediaConverter", "metadata.sqlite3")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "tek-media-converter", "metadata.sqlite3")
+
+
+class MetadataCache:
+    """On-disk cache of per-file metadata keyed by (path, size, mtime).
+
+    Entries whose size or mtime no longer match the file are treated as
+    misses and overwritten. Least recently used rows are evicted past
+    max_entries, and the oldest thumbnails are dropped once their total
+    exceeds max_thumb_bytes. Safe to share between threads; writes are
+    committed by flush(), which callers should invoke once per chunk.
+    """
+
+    def __init__(self, path=None, max_entries=DEFAULT_MAX_ENTRIES, max_thumb_bytes=DEFAULT_MAX_THUMB_BYTES):
+        self.path = path or default_cache_path()
+        self.max_entries = max_entries
+        self.max_thumb_bytes = max_thumb_bytes
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        if self.path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(files)")}
+        if "mode" not in columns:
+            # Caches written before the mode was recorded; their rows re-probe once
+            self._db.execute("ALTER TABLE files ADD COLUMN mode TEXT")
+        self._dirty = 0
+        self._since_evict = 0
+
+    def lookup(self, path, size, mtime_ns):
+        """Return the cached dict for path if it matches size/mtime, else None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT width, height, format, frames, mode, thumb FROM files"
+                " WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (path, size, mtime_ns),
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE files SET last_used = ? WHERE path = ?", (time.time(), path))
+            self._dirty += 1
+        return dict(zip(_FIELDS, row))
+
+    def store(self, path, size, mtime_ns, width=None, height=None, format=None, frames=None, mode=None, thumb=None):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO files"
+                " (path, size, mtime_ns, width, height, format, frames, mode, thumb, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, size, mtime_ns, width, height, format, frames, mode, thumb, time.time()),
+            )
+            self._dirty += 1
+
+    def flush(self):
+        """Commit pending writes and enforce the size bounds."""
+        with self._lock:
+            if not self._dirty:
+                return
+            self._since_evict += self._dirty
+            if self._since_evict >= _EVICT_EVERY:
+                self._evict()
+                self._since_evict = 0
+            self._db.commit()
+            self._dirty = 0
+
+    def _evict(self):
+        (count,) = self._db.execute("SELECT COUNT(*) FROM files").fetchone()
+        if count > self.max_entries:
+            self._db.execute(
+                "DELETE FROM files WHERE path IN (SELECT path FROM files ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,),
+            )
+        (thumb_bytes,) = self._db.execute("SELECT COALESCE(SUM(LENGTH(thumb)), 0) FROM files").fetchone()
+        if thumb_bytes > self.max_thumb_bytes:
+            excess = thumb_bytes - self.max_thumb_bytes
+            rows = self._db.execute(
+                "SELECT path, LENGTH(thumb) FROM files WHERE thumb IS NOT NULL ORDER BY last_used"
+            )
+            drop = []
+            for path, n in rows:
+                drop.append((path,))
+                excess -= n
+                if excess <= 0:
+                    break
+            self._db.executemany("UPDATE files SET thumb = NULL WHERE path = ?", drop)
+
+    def close(self):
+        with self._lock:
+            self._evict()
+            self._db.commit()
+            self._db.close()
@@ -0,0 +1,163 @@
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .paths import commit_output, discard_output, output_path_for, temp_path_for
+from .timing import NULL_TIMER
+from .video import (ENCODE, REMUX, audio_args, build_video_command, convert_video, find_ffmpeg, find_ffprobe,
+                    is_raw_hevc, plan_video, probe_video, run_ffmpeg)
+
+CHUNKED = "chunked"
+
+# Shorter inputs aren't worth the split/join overhead
+MIN_CHUNKED_DURATION = 120.0
+MIN_SEGMENT_SECONDS = 20.0
+# Each segment encoder gets at most this many threads, so more segments run at
+# once; libvpx-vp9 in particular gains little from extra threads per process
+MAX_SEGMENT_THREADS = 4
+# Joined output may differ from the source by this much (seconds or fraction)
+DURATION_TOLERANCE = 1.0
+DURATION_TOLERANCE_RATIO = 0.005
+
+
+def segment_plan(duration, total_threads, segment_threads):
+    """Return (parallel encoders, target segment length in seconds).
+
+    Segments are sized so each encoder gets about two of them, which keeps
+    cores busy when keyframe spacing makes some segments longer than others.
+    """
+    parallel = max(1, total_threads // max(1, segment_threads))
+    seconds = max(MIN_SEGMENT_SECONDS, duration / (parallel * 2))
+    return parallel, seconds
+
+
+def _quote_concat(path):
+    # concat demuxer list syntax: single-quoted, with ' written as '\''
+    return "file '" + path.replace("'", "'\\''") + "'"
+
+
+def convert_video_chunked(input_path, output_format, output_folder, width=None, height=None, keep_aspect=True, crf=23,
+                          conflict='keep', ff=None, fp=None, output_path=None, threads=None, on_progress=None,
+                          remux=False, on_plan=None, timer=NULL_TIMER):
+    """convert_video() for long inputs: split the video at keyframes, encode
+    the segments concurrently with the same CRF/scale/pixel format, and join
+    them with the concat demuxer (no second encode). Audio is taken from the
+    original file in the join step, so segments are encoded video-only.
+
+    threads is the total thread budget shared by the segment encoders. Inputs
+    that are short, have no known duration or qualify for a remux go through
+    convert_video() unchanged, as does any input whose joined output fails the
+    duration check. on_plan receives CHUNKED when the split path is used.
+    timer records the split, segments and join stages.
+    """
+    ff = ff or find_ffmpeg()
+    fp = fp or find_ffprobe()
+    with timer.stage("probe"):
+        info = probe_video(input_path, fp)
+    duration = info["duration"]
+    single = dict(width=width, height=height, keep_aspect=keep_aspect, crf=crf, ff=ff, fp=fp,
+                  threads=threads, on_progress=on_progress, remux=remux, on_plan=on_plan, timer=timer)
+    if (not duration or duration < MIN_CHUNKED_DURATION or is_raw_hevc(input_path)
+            or plan_video(info, output_format, width, height, remux) == REMUX):
+        return convert_video(input_path, output_format, output_folder, conflict=conflict, output_path=output_path, **single)
+
+    out_fmt = output_format.lower()
+    outp = output_path or output_path_for(input_path, output_folder, out_fmt)
+
+    total_threads = threads or os.cpu_count() or 1
+    segment_threads = max(1, min(MAX_SEGMENT_THREADS, total_threads))
+    parallel, seconds = segment_plan(duration, total_threads, segment_threads)
+    if on_plan:
+        on_plan(CHUNKED)
+
+    # Named after the output so an interrupted batch can find and remove it
+    work = tempfile.mkdtemp(prefix=f".{os.path.basename(outp)}.chunks-", dir=os.path.dirname(os.path.abspath(outp)))
+    joined_path = temp_path_for(outp)
+    try:
+        ok = _split_encode_join(input_path, out_fmt, joined_path, work, info, width, height, keep_aspect, crf, ff,
+                                parallel, segment_threads, seconds, on_progress, timer)
+        if ok:
+            joined = probe_video(joined_path, fp)["duration"]
+            tolerance = max(DURATION_TOLERANCE, duration * DURATION_TOLERANCE_RATIO)
+            if joined is not None and abs(joined - duration) <= tolerance:
+                if timer.enabled:
+                    timer.set(method=CHUNKED, duration=duration, in_bytes=os.path.getsize(input_path),
+                              out_bytes=os.path.getsize(joined_path))
+                return commit_output(joined_path, outp, not output_path and conflict == 'keep')
+            print(f"Chunked encode of {input_path} is {joined}s long, expected {duration:.2f}s; re-encoding in one pass")
+    except Exception as e:
+        print(f"Chunked encode of {input_path} failed, re-encoding in one pass: {e}")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+        discard_output(joined_path)
+
+    if on_plan:
+        on_plan(ENCODE)
+    return convert_video(input_path, output_format, output_folder, conflict=conflict, output_path=output_path,
+                         **dict(single, on_plan=None))
+
+
+def _split_encode_join(input_path, out_fmt, outp, work, info, width, height, keep_aspect, crf, ff,
+                       parallel, segment_threads, seconds, on_progress, timer):
+    ext = os.path.splitext(outp)[1] or "." + out_fmt
+    # 1. Split the first video stream at keyframes (stream copy, so cuts land
+    #    on the next keyframe after each target time)
+    pattern = os.path.join(work, "src%05d.mkv")
+    with timer.stage("split"):
+        code, err = run_ffmpeg([ff, "-y", "-hide_banner", "-loglevel", "error", "-i", input_path,
+                                "-map", "0:v:0", "-an", "-sn", "-dn", "-c", "copy",
+                                "-f", "segment", "-segment_time", f"{seconds:.3f}", "-reset_timestamps", "1", pattern])
+    if code != 0:
+        raise RuntimeError(err.strip() or "segmenting failed")
+    sources = sorted(os.path.join(work, n) for n in os.listdir(work) if n.startswith("src"))
+    if not sources:
+        raise RuntimeError("segmenting produced no files")
+
+    # 2. Encode segments concurrently; progress is summed across them
+    outputs = [os.path.join(work, f"enc{i:05d}{ext}") for i in range(len(sources))]
+    latest = {}
+    lock = threading.Lock()
+
+    def report(i, fields):
+        with lock:
+            latest[i] = fields
+            merged = {"progress": "continue"}
+            for key in ("frame", "total_size", "out_time_us"):
+                try:
+                    merged[key] = str(sum(int(f.get(key, 0)) for f in latest.values()))
+                except ValueError:
+                    pass
+            for key in ("fps", "speed"):
+                try:
+                    merged[key] = str(sum(float(f.get(key, "0").rstrip("x")) for f in latest.values()))
+                except ValueError:
+                    pass
+        on_progress(merged)
+
+    def encode(i):
+        cmd = build_video_command(sources[i], out_fmt, width, height, keep_aspect, crf, ff=ff, threads=segment_threads)
+        cb = (lambda fields: report(i, fields)) if on_progress else None
+        code, err = run_ffmpeg(cmd + ["-an", outputs[i]], cb)
+        if code != 0:
+            raise RuntimeError(err.strip() or f"segment {i} failed")
+
+    with timer.stage("segments"), ThreadPoolExecutor(max_workers=min(parallel, len(sources))) as pool:
+        for fut in [pool.submit(encode, i) for i in range(len(sources))]:
+            fut.result()
+    timer.set(segments=len(sources))
+
+    # 3. Join without re-encoding; audio comes from the source in the same pass
+    listing = os.path.join(work, "segments.txt")
+    with open(listing, "w", encoding="utf-8") as fh:
+        fh.write("\n".join(_quote_concat(o) for o in outputs) + "\n")
+    cmd = [ff, "-y", "-hide_banner", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", listing,
+           "-i", input_path, "-map", "0:v:0", "-map", "1:a?", "-c:v", "copy", *audio_args(info, out_fmt)]
+    if out_fmt in ("mp4", "mov", "m4v"):
+        cmd += ["-movflags", "+faststart"]
+    with timer.stage("join"):
+        code, err = run_ffmpeg(cmd + [outp])
+    if code != 0:
+        raise RuntimeError(err.strip() or "joining segments failed")
+    return True
@@ -0,0 +1,545 @@
+"""Headless command line entry point.
+
+    python -m media_converter convert --format webp --workers 8 photos/*.heic
+    python -m media_converter convert -r --mirror -o converted archive/
+    python -m media_converter convert --format jpeg --width 1600 --max-size 300K photos/
+    python -m media_converter video --format mp4 --crf 23 clips/*.mov
+    python -m media_converter renditions -t 1280:jpeg:85 -t 1280:webp:80 photos/*.heic
+    python -m media_converter watch --preset web.json -o converted incoming/
+    python -m media_converter serve --port 8765
+    python -m media_converter gui
+
+Only the `gui` command loads Tk/tkinterdnd2.
+"""
+import argparse
+import os
+import sys
+import threading
+
+IMAGE_FORMATS = ["JPEG", "PNG", "BMP", "GIF", "TIFF", "WEBP"]
+VIDEO_FORMATS = ["MP4", "MKV", "MOV", "AVI", "M4V", "WEBM"]
+DEFAULT_RENDITIONS = ["2560:JPEG:85", "1280:JPEG:85", "640:JPEG:85", "160:JPEG:85",
+                      "2560:WEBP:80", "1280:WEBP:80", "640:WEBP:80", "160:WEBP:80"]
+
+
+def parse_rendition(spec: str):
+    """argparse type for "SIZE:FORMAT[:QUALITY]", e.g. "1280:webp:80"."""
+    parts = spec.split(":")
+    try:
+        if len(parts) not in (2, 3):
+            raise ValueError
+        size = int(parts[0])
+        fmt = parts[1].upper().replace("JPG", "JPEG")
+        quality = int(parts[2]) if len(parts) == 3 else 95
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected SIZE:FORMAT[:QUALITY], got {spec!r}")
+    if size <= 0 or fmt not in IMAGE_FORMATS or not 1 <= quality <= 100:
+        raise argparse.ArgumentTypeError(f"invalid rendition {spec!r}")
+    return size, fmt, quality
+
+
+def parse_size(spec: str) -> int:
+    """argparse type for a byte count with an optional K/M suffix, e.g. "300K"."""
+    units = {"K": 1024, "M": 1024 * 1024}
+    text = spec.strip().upper().rstrip("B")
+    try:
+        if text and text[-1] in units:
+            value = int(float(text[:-1]) * units[text[-1]])
+        else:
+            value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a size like 300K or 2M, got {spec!r}")
+    if value <= 0:
+        raise argparse.ArgumentTypeError(f"invalid size {spec!r}")
+    return value
+
+
+def parse_similarity(spec: str) -> float:
+    try:
+        value = float(spec)
+    except ValueError:
+        value = 0.0
+    if not 0 < value < 1:
+        raise argparse.ArgumentTypeError(f"expected a score between 0 and 1, got {spec!r}")
+    return value
+
+
+def _add_inputs(p):
+    p.add_argument("paths", nargs="+", help="input files or folders")
+    p.add_argument("-o", "--output", default="", help="output folder (default: beside each source)")
+    p.add_argument("-r", "--recursive", action="store_true", help="include subfolders of input folders")
+    p.add_argument("--mirror", action="store_true",
+                   help="recreate each input folder's subfolders under the output folder instead of flattening")
+    p.add_argument("--journal", metavar="FILE", default=None,
+                   help="log progress to FILE; rerunning an interrupted batch with the same FILE and settings"
+                        " skips finished files and cleans up partial outputs")
+
+
+def _add_common(p):
+    _add_inputs(p)
+    p.add_argument("--width", type=int, help="resize width")
+    p.add_argument("--height", type=int, help="resize height")
+    p.add_argument("--no-keep-aspect", dest="keep_aspect", action="store_false",
+                   help="use width and height as given instead of preserving aspect ratio")
+    p.add_argument("--overwrite", action="store_true",
+                   help="replace existing outputs instead of writing numbered copies")
+    p.add_argument("-q", "--quiet", action="store_true", help="only report failures")
+    p.add_argument("--incremental", action="store_true",
+                   help="skip files whose output is already up to date for these settings")
+    p.add_argument("--manifest", default=None, help="incremental manifest file (default: per-user cache folder)")
+    p.add_argument("--timings", metavar="FILE", default=None,
+                   help="append per-file stage timings as JSON lines and print a summary"
+                        " (default: $MEDIA_CONVERTER_TIMINGS, off when unset)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="media_converter", description="Batch image and video converter.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("convert", help="convert images")
+    _add_common(p)
+    p.add_argument("-f", "--format", default="JPEG", type=str.upper, choices=IMAGE_FORMATS)
+    p.add_argument("--quality", type=int, default=95, help="JPEG/WEBP quality 1-100 (default 95)")
+    p.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    p.add_argument("--memory-budget", type=int, metavar="MB", default=None,
+                   help="RAM the running conversions may use together, estimated from image headers"
+                        " (default: $MEDIA_CONVERTER_MEMORY_MB or half of physical memory)")
+    p.add_argument("--resample", choices=["fast", "balanced", "quality"], default="quality",
+                   help="resize filter tier (default quality = Lanczos)")
+    p.add_argument("--fast-downscale", action="store_true",
+                   help="decode at reduced resolution when shrinking by 2x or more")
+    p.add_argument("--full-decode", action="store_true",
+                   help="never substitute embedded HEIC/JPEG thumbnails for small outputs")
+    p.add_argument("--max-size", type=parse_size, metavar="SIZE", default=None,
+                   help="JPEG/WEBP: highest quality (up to --quality) whose file fits in SIZE, e.g. 300K")
+    p.add_argument("--min-similarity", type=parse_similarity, metavar="SCORE", default=None,
+                   help="JPEG/WEBP: lowest quality whose SSIM against the resized source is at least SCORE"
+                        " (0-1, e.g. 0.95)")
+    p.add_argument("--optimize", action="store_true", help="JPEG: optimize Huffman tables")
+    p.add_argument("--progressive", action="store_true", help="JPEG: write a progressive file")
+    p.add_argument("--subsampling", choices=["4:4:4", "4:2:2", "4:2:0"], default=None,
+                   help="JPEG chroma subsampling (default: Pillow's choice for the quality)")
+    p.add_argument("--webp-method", type=int, choices=range(7), metavar="0-6", default=None,
+                   help="WEBP effort, higher is smaller and slower (default 4)")
+
+    p = sub.add_parser("video", help="convert videos with ffmpeg")
+    _add_common(p)
+    p.add_argument("-f", "--format", default="MP4", type=str.upper, choices=VIDEO_FORMATS)
+    p.add_argument("--crf", type=int, default=23, help="quality, 0-51, lower is better (default 23)")
+    p.add_argument("-j", "--jobs", type=int, default=None,
+                   help="concurrent ffmpeg processes (default: half the CPU count)")
+    p.add_argument("--remux", action="store_true",
+                   help="stream-copy into the new container when no re-encode is needed (ignores --crf)")
+    p.add_argument("--chunked", action="store_true",
+                   help="split long videos at keyframes and encode the pieces in parallel")
+    p.add_argument("--estimate", action="store_true",
+                   help="probe the inputs and print duration, resolution, codecs and estimated encode time"
+                        " per file and for the batch, without converting")
+
+    p = sub.add_parser("renditions", help="write several sizes/formats of each image from one decode")
+    _add_inputs(p)
+    p.add_argument("-t", "--target", dest="targets", action="append", type=parse_rendition, metavar="SIZE:FORMAT[:QUALITY]",
+                   help="longest edge, format and quality of one rendition; repeat for more"
+                        " (default: 2560/1280/640/160 px as JPEG q85 and WEBP q80)")
+    p.add_argument("--overwrite", action="store_true",
+                   help="replace existing outputs instead of writing numbered copies")
+    p.add_argument("-q", "--quiet", action="store_true", help="only report failures")
+    p.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    p.add_argument("--resample", choices=["fast", "balanced", "quality"], default="quality",
+                   help="resize filter tier (default quality = Lanczos)")
+    p.add_argument("--fast-downscale", action="store_true",
+                   help="decode JPEGs at reduced scale when the largest rendition allows it")
+    p.add_argument("--memory-budget", type=int, metavar="MB", default=None,
+                   help="RAM the running conversions may use together (see convert)")
+    p.add_argument("--timings", metavar="FILE", default=None,
+                   help="append per-file stage timings as JSON lines and print a summary")
+
+    p = sub.add_parser("watch", help="convert files as they appear in hot folders")
+    p.add_argument("directories", nargs="+", help="folders to watch (not recursive)")
+    p.add_argument("-o", "--output", default=None, help="output folder (overrides the preset)")
+    p.add_argument("--preset", help="JSON preset with 'image' and 'video' conversion options")
+    p.add_argument("--image-format", type=str.upper, choices=IMAGE_FORMATS, help="override the preset's image format")
+    p.add_argument("--quality", type=int, help="override the preset's JPEG/WEBP quality")
+    p.add_argument("--video-format", type=str.upper, choices=VIDEO_FORMATS, help="override the preset's video format")
+    p.add_argument("--crf", type=int, help="override the preset's video CRF")
+    p.add_argument("--width", type=int, help="resize width for images and videos")
+    p.add_argument("--height", type=int, help="resize height for images and videos")
+    p.add_argument("--save-preset", metavar="FILE", help="write the effective preset to FILE and exit")
+    p.add_argument("--on-done", choices=["move", "mark", "leave"], default="move",
+                   help="move inputs to processed/ or failed/ (default), add a .done/.failed suffix, or leave them")
+    p.add_argument("--settle", type=float, default=2.0, help="seconds a file must stay unchanged before converting")
+    p.add_argument("--poll", action="store_true", help="poll instead of using inotify")
+    p.add_argument("--poll-interval", type=float, default=2.0)
+    p.add_argument("-j", "--workers", type=int, default=None, help="image worker processes")
+    p.add_argument("--jobs", type=int, default=None, help="concurrent ffmpeg processes")
+    p.add_argument("--status-interval", type=float, default=10.0, help="seconds between status lines")
+    p.add_argument("--stats-file", help="rewrite queue depth/throughput JSON to this file with every status line")
+    p.add_argument("-q", "--quiet", action="store_true", help="no status lines")
+    p.add_argument("--timings", metavar="FILE", default=None,
+                   help="append per-file stage timings as JSON lines")
+
+    p = sub.add_parser("serve", help="run a local HTTP conversion service")
+    p.add_argument("--host", default="127.0.0.1", help="address to listen on (default 127.0.0.1)")
+    p.add_argument("--port", type=int, default=8765, help="port to listen on (default 8765, 0 = any free port)")
+    p.add_argument("-j", "--workers", type=int, default=None, help="image worker processes (default: CPU count)")
+    p.add_argument("--jobs", type=int, default=None, help="concurrent ffmpeg processes (default: half the CPU count)")
+    p.add_argument("--queue", type=int, default=None,
+                   help="requests per pool allowed to wait for a worker before 429 is returned"
+                        " (default: 2x workers for images, 1x jobs for videos)")
+    p.add_argument("--max-upload", type=int, metavar="MB", default=4096, help="largest accepted upload (default 4096)")
+
+    sub.add_parser("gui", help="launch the desktop GUI")
+    return parser
+
+
+def _report(args, done, total, path, ok, method=None):
+    if ok and args.quiet:
+        return
+    status = "ok" if ok else "FAILED"
+    if method:
+        status += f" ({method})"
+    count = f"{done}/{total}" if total is not None else str(done)
+    print(f"[{count}] {status} {path}", file=sys.stderr)
+
+
+def _inputs(args, kinds):
+    """args.paths as given, or a lazy (path, output folder) walk when any of
+    them is a folder, so conversion starts before the walk finishes."""
+    if not any(os.path.isdir(p) for p in args.paths):
+        return args.paths
+    from .paths import iter_inputs
+    return iter_inputs(args.paths, kinds, args.recursive, args.output, args.mirror)
+
+
+def _finish(success, failed, total=None):
+    if total is None:
+        total = success + len(failed)
+    print(f"Converted {success} of {total} files.", file=sys.stderr)
+    for f in failed:
+        print(f"Failed: {f}", file=sys.stderr)
+    return 0 if not failed else 1
+
+
+def _open_manifest(args):
+    if not args.incremental:
+        return None
+    from .manifest import ConversionManifest
+    return ConversionManifest(args.manifest)
+
+
+def _open_timings(args):
+    from .timing import TimingLog, default_timings_path
+
+    path = args.timings or default_timings_path()
+    return TimingLog(path) if path else None
+
+
+def _finish_timings(timings):
+    if timings is None:
+        return
+    timings.close()
+    print(timings.summary(), file=sys.stderr)
+
+
+def _open_journal(args, kind, options):
+    if not args.journal:
+        return None
+    from .journal import BatchJournal
+
+    journal = BatchJournal(args.journal, kind, options)
+    if journal.resumed:
+        print(f"Resuming interrupted batch: {len(journal.completed)} files already done,"
+              f" {journal.cleaned} partial outputs removed.", file=sys.stderr)
+    return journal
+
+
+def _open_image_probe():
+    """Header reads for the engine's memory estimates, answered from the
+    metadata cache; None if the cache can't be opened."""
+    from .cache import MetadataCache
+    from .metadata import CachedImageProbe
+
+    try:
+        return CachedImageProbe(MetadataCache())
+    except Exception as e:
+        print(f"Metadata cache unavailable: {e}", file=sys.stderr)
+        return None
+
+
+def _close_image_probe(probe):
+    if probe is not None:
+        probe.cache.close()
+
+
+def _finish_incremental(manifest, skipped):
+    if manifest is None:
+        return
+    manifest.close()
+    if skipped:
+        print(f"Skipped {skipped} up-to-date files.", file=sys.stderr)
+
+
+def cmd_convert(args):
+    from .engine import ImageConversionEngine
+
+    options = {
+        "output_format": args.format,
+        "output_folder": args.output,
+        "width": args.width,
+        "height": args.height,
+        "keep_aspect": args.keep_aspect,
+        "jpeg_quality": args.quality,
+        "conflict": "replace" if args.overwrite else "keep",
+        "resample": args.resample,
+        "fast_downscale": args.fast_downscale,
+        "full_decode": args.full_decode,
+        "target_bytes": args.max_size,
+        "target_similarity": args.min_similarity,
+        "jpeg_optimize": args.optimize,
+        "jpeg_progressive": args.progressive,
+        "jpeg_subsampling": args.subsampling,
+        "webp_method": args.webp_method,
+    }
+    budget = args.memory_budget * 1024 * 1024 if args.memory_budget else None
+    probe = _open_image_probe()
+    engine = ImageConversionEngine(max_workers=args.workers, memory_budget=budget, probe=probe)
+    manifest = _open_manifest(args)
+    timings = _open_timings(args)
+    if timings is None and (args.max_size or args.min_similarity):
+        from .timing import TimingLog
+        # Always report what the quality search cost
+        timings = TimingLog()
+    journal = _open_journal(args, "image", options)
+    success, failed = engine.run(_inputs(args, ("image",)), options, progress=lambda *a: _report(args, *a),
+                                 manifest=manifest, timings=timings, journal=journal)
+    if journal is not None:
+        journal.close()
+    _close_image_probe(probe)
+    _finish_incremental(manifest, len(engine.skipped))
+    _finish_timings(timings)
+    return _finish(success, failed)
+
+
+def cmd_renditions(args):
+    from .engine import ImageConversionEngine
+
+    targets = args.targets or [parse_rendition(t) for t in DEFAULT_RENDITIONS]
+    options = {
+        "targets": targets,
+        "output_folder": args.output,
+        "conflict": "replace" if args.overwrite else "keep",
+        "resample": args.resample,
+        "fast_downscale": args.fast_downscale,
+    }
+    budget = args.memory_budget * 1024 * 1024 if args.memory_budget else None
+    probe = _open_image_probe()
+    engine = ImageConversionEngine(max_workers=args.workers, memory_budget=budget, probe=probe)
+    timings = _open_timings(args)
+    journal = _open_journal(args, "renditions", options)
+    success, failed = engine.run(_inputs(args, ("image",)), options, progress=lambda *a: _report(args, *a),
+                                 timings=timings, journal=journal)
+    if journal is not None:
+        journal.close()
+    _close_image_probe(probe)
+    _finish_timings(timings)
+    return _finish(success, failed)
+
+
+def _print_estimates(inputs, options, history, fp, max_jobs=None):
+    """video --estimate: one line per input and the batch total."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from .estimate import batch_seconds
+    from .scheduler import default_max_jobs
+    from .video import probe_video
+
+    paths = [item[0] if isinstance(item, tuple) else item for item in inputs]
+    with ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1)) as pool:
+        infos = list(pool.map(lambda p: probe_video(p, fp), paths))
+    estimates = []
+    for path, info in zip(paths, infos):
+        nbytes = os.path.getsize(path) if os.path.exists(path) else None
+        est = history.estimate(info, options, nbytes)
+        res = f"{info['width']}x{info['height']}" if info["width"] else "?"
+        codecs = "/".join([info["video_codec"] or "?"] + info["audio_codecs"])
+        duration = f"{info['duration']:.0f}s" if info["duration"] else "?"
+        cost = f"~{est[0]:.0f}s" if est else "?"
+        print(f"{duration:>8s} {res:>10s} {codecs:16s} {cost:>8s}  {path}")
+        if est:
+            estimates.append(est)
+    total = batch_seconds(estimates, max_jobs or default_max_jobs())
+    samples = history.rate(options["output_format"])[1]
+    basis = f"from {samples} measured encodes" if samples else "default speeds; run a batch to measure this machine"
+    unknown = len(paths) - len(estimates)
+    print(f"Estimated batch time: ~{total / 60:.1f} min for {len(estimates)} files ({basis})"
+          + (f", {unknown} without an estimate" if unknown else ""))
+    return 0
+
+
+def cmd_video(args):
+    from .estimate import EncodeSpeedHistory
+    from .paths import OutputPlanner
+    from .scheduler import VideoJobScheduler
+    from .video import ffmpeg_available, find_ffmpeg, find_ffprobe
+
+    ff = find_ffmpeg()
+    fp = find_ffprobe()
+    options = {
+        "output_format": args.format.lower(),
+        "output_folder": args.output,
+        "width": args.width,
+        "height": args.height,
+        "keep_aspect": args.keep_aspect,
+        "crf": args.crf,
+        "remux": args.remux,
+        "chunked": args.chunked,
+        "conflict": "replace" if args.overwrite else "keep",
+    }
+    history = EncodeSpeedHistory()
+    if args.estimate:
+        # Only probes the inputs, so ffprobe is all it needs
+        if not ffmpeg_available(fp):
+            print("FFprobe is not available. Install FFmpeg or set FFPROBE_BIN.", file=sys.stderr)
+            return 2
+        return _print_estimates(_inputs(args, ("video",)), options, history, fp, args.jobs)
+    if not ffmpeg_available(ff):
+        print("FFmpeg is not available. Install it or set FFMPEG_BIN.", file=sys.stderr)
+        return 2
+    manifest = _open_manifest(args)
+    timings = _open_timings(args)
+    journal = _open_journal(args, "video", options)
+    scheduler = VideoJobScheduler(max_jobs=args.jobs, ff=ff, fp=fp, timings=timings, history=history)
+    planner = OutputPlanner()
+    inputs = _inputs(args, ("video",))
+    total = len(inputs) if isinstance(inputs, list) else None
+    tally = {"done": 0, "success": 0, "skipped": 0}
+    failed = []
+    src_stats = {}  # path -> (stat before converting, manifest options)
+    lock = threading.Lock()
+
+    def count(path, ok, method=None, skipped=False):
+        with lock:
+            tally["skipped"] += skipped
+            tally["done"] += 1
+            tally["success"] += bool(ok)
+            if not ok:
+                failed.append(path)
+            _report(args, tally["done"], total, path, ok, method)
+
+    def feed():
+        # Runs beside the event loop so a folder walk feeds ffmpeg as it goes
+        try:
+            for item in inputs:
+                f, folder = item if isinstance(item, tuple) else (item, args.output)
+                base = dict(options, output_folder=folder)
+                job_options, st = base, None
+                if manifest is not None:
+                    job_options, st = manifest.prepare(f, "video", base)
+                if job_options is not None and journal is not None:
+                    job_options = journal.prepare(f, job_options)
+                if job_options is None:
+                    count(f, True, skipped=True)
+                    continue
+                src_stats[f] = (st, base)
+                job_options = planner.plan_options(f, job_options)
+                if journal is not None:
+                    journal.begin(f, job_options["output_path"])
+                scheduler.add(f, job_options)
+        finally:
+            scheduler.close()
+
+    scheduler.start(streaming=True)
+    threading.Thread(target=feed, daemon=True).start()
+    while True:
+        kind, job = scheduler.events.get()
+        if kind == "done":
+            break
+        if kind != "finished":
+            continue
+        if job.result and manifest is not None:
+            st, base = src_stats[job.path]
+            manifest.record(job.path, "video", base, job.result, st)
+            manifest.flush()
+        if journal is not None:
+            journal.finish(job.path, job.result)
+        count(job.path, bool(job.result), job.method)
+    if journal is not None:
+        journal.close()
+    history.save()
+    _finish_incremental(manifest, tally["skipped"])
+    _finish_timings(timings)
+    return _finish(tally["success"], failed)
+
+
+def cmd_watch(args):
+    import json
+
+    from .watch import DEFAULT_PRESET, WatchService, load_preset, save_preset
+
+    preset = load_preset(args.preset) if args.preset else {k: dict(v) for k, v in DEFAULT_PRESET.items()}
+    overrides = {
+        "image": {"output_format": args.image_format, "jpeg_quality": args.quality,
+                  "width": args.width, "height": args.height},
+        "video": {"output_format": args.video_format and args.video_format.lower(), "crf": args.crf,
+                  "width": args.width, "height": args.height},
+    }
+    for kind, values in overrides.items():
+        preset[kind].update({k: v for k, v in values.items() if v is not None})
+    if args.output is not None:
+        for opts in preset.values():
+            opts["output_folder"] = args.output
+    if args.save_preset:
+        save_preset(args.save_preset, preset)
+        print(f"Saved preset to {args.save_preset}", file=sys.stderr)
+        return 0
+
+    for d in args.directories:
+        if not os.path.isdir(d):
+            print(f"Not a folder: {d}", file=sys.stderr)
+            return 2
+    timings = _open_timings(args)
+    service = WatchService(args.directories, preset, on_done=args.on_done, settle=args.settle,
+                           poll_interval=args.poll_interval, use_inotify=False if args.poll else None,
+                           image_workers=args.workers, video_jobs=args.jobs, timings=timings)
+
+    def status(st):
+        if args.stats_file:
+            tmp = args.stats_file + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump(st, fh)
+            os.replace(tmp, args.stats_file)
+        if not args.quiet:
+            print(f"[{st['mode']}] queue {st['queue_depth']} (settling {st['settling']}, ready {st['ready']},"
+                  f" converting {st['converting']}) done {st['done']} failed {st['failed']}"
+                  f" - {st['files_per_sec']:.2f} files/s", file=sys.stderr)
+
+    print(f"Watching {', '.join(args.directories)} ({service.mode}); Ctrl+C to stop", file=sys.stderr)
+    service.run_forever(status, args.status_interval)
+    _finish_timings(timings)
+    return 0
+
+
+def cmd_serve(args):
+    from .server import ConversionServer
+
+    server = ConversionServer(args.host, args.port, image_workers=args.workers, video_jobs=args.jobs,
+                              queue_limit=args.queue, max_upload=args.max_upload * 1024 * 1024)
+    server.run()
+    return 0
+
+
+def cmd_gui(args):
+    from .gui import main as gui_main
+    gui_main()
+    return 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    output = getattr(args, "output", "")
+    if output and not os.path.isdir(output):
+        print(f"Output folder does not exist: {output}", file=sys.stderr)
+        return 2
+    commands = {"convert": cmd_convert, "renditions": cmd_renditions, "video": cmd_video, "watch": cmd_watch,
+                "serve": cmd_serve, "gui": cmd_gui}
+    return commands[args.command](args)
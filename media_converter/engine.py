@@ -0,0 +1,199 @@
+import itertools
+import os
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from .images import convert_image, convert_renditions
+from .memory import default_memory_budget, estimate_image_memory
+from .paths import OutputPlanner
+from .timing import FileTimer
+
+# ProcessPoolExecutor on Windows cannot wait on more than 61 worker handles
+_WINDOWS_MAX_WORKERS = 61
+
+
+def default_workers() -> int:
+    """Return the default worker count: one process per CPU core."""
+    n = os.cpu_count() or 1
+    if sys.platform == "win32":
+        n = min(n, _WINDOWS_MAX_WORKERS)
+    return n
+
+
+def _convert(path, options, timer=None):
+    # Options with "targets" describe a rendition set rather than one output
+    convert = convert_renditions if "targets" in options else convert_image
+    if timer is not None:
+        return convert(path, **options, timer=timer)
+    return convert(path, **options)
+
+
+def _timed_convert(path, options):
+    """_convert() with a FileTimer; returns (result, timing record).
+    Module-level so it can run in a worker process."""
+    timer = FileTimer(path, "image")
+    result = _convert(path, options, timer)
+    return result, timer.finish(result)
+
+
+class ImageConversionEngine:
+    """Run convert_image() jobs for a batch of files across a process pool.
+
+    All files in a batch share the same conversion options. Options with a
+    "targets" list run convert_renditions() instead (no manifest support). ``progress`` is
+    called as progress(done, total, path, ok) from the thread running run(),
+    so GUI callers should hand the values to the event loop (e.g. via a queue)
+    instead of touching widgets directly.
+
+    Files are only handed to a worker while the estimated peak memory of all
+    running conversions (memory.estimate_image_memory, from the header) fits
+    in memory_budget bytes. A file bigger than the whole budget waits until
+    nothing else is running and then runs alone. With probe (a
+    metadata.CachedImageProbe) the headers come from its MetadataCache.
+    """
+
+    def __init__(self, max_workers=None, memory_budget=None, probe=None):
+        workers = max_workers or default_workers()
+        if sys.platform == "win32":
+            workers = min(workers, _WINDOWS_MAX_WORKERS)
+        self.max_workers = max(1, workers)
+        self.memory_budget = memory_budget or default_memory_budget()
+        self.probe = probe
+        self._cancel = threading.Event()
+        # Sources skipped by the last incremental run because their output was current
+        self.skipped = []
+
+    def cancel(self):
+        """Stop dispatching queued files; conversions already running finish."""
+        self._cancel.set()
+
+    def run(self, paths, options, progress=None, manifest=None, timings=None, planner=None, journal=None):
+        """Convert every path with convert_image(path, **options).
+
+        Returns (success_count, failed_paths) in the same shape as the old
+        sequential loop in the GUI. paths may be any iterable, including a
+        lazy folder walk (paths.iter_inputs); it is consumed only as workers
+        free up, and progress then gets total=None. An item may also be a
+        (path, output_folder) pair to override the output folder per file.
+        With a ConversionManifest, sources whose output is already current
+        are skipped (reported as successful and listed in self.skipped),
+        changed ones are re-encoded into their previous output file, and
+        every new output is recorded. With a timing.TimingLog, each
+        conversion's per-stage timings are added to it.
+
+        Output names are resolved up front by an OutputPlanner (pass the one
+        used for a conflict pre-scan to reuse its folder listings), so
+        workers write to a fixed output_path instead of probing for a free
+        name. Rendition sets still name their own outputs. With a
+        journal.BatchJournal, sources finished by an interrupted run of the
+        same batch are skipped like up-to-date ones, and every hand-off and
+        result is logged; the caller closes it.
+        """
+        self._cancel.clear()
+        if "targets" in options:
+            # A rendition set has several outputs; the manifest tracks one
+            manifest = None
+        elif planner is None:
+            planner = OutputPlanner()
+        total = len(paths) if hasattr(paths, "__len__") else None
+        success = 0
+        failed = []
+        done = 0
+        self.skipped = []
+
+        def record(path, ok):
+            nonlocal success, done
+            done += 1
+            if ok:
+                success += 1
+            else:
+                failed.append(path)
+            if progress:
+                progress(done, total, path, ok)
+
+        def make_jobs():
+            # (path, per-file options, source stat taken before converting, manifest options)
+            for item in paths:
+                p, folder = item if isinstance(item, tuple) else (item, None)
+                base = options if folder is None else dict(options, output_folder=folder)
+                job_options, st = base, None
+                if manifest is not None:
+                    job_options, st = manifest.prepare(p, "image", base)
+                if job_options is not None and journal is not None:
+                    job_options = journal.prepare(p, job_options)
+                if job_options is None:
+                    self.skipped.append(p)
+                    record(p, True)
+                    continue
+                if planner is not None:
+                    job_options = planner.plan_options(p, job_options)
+                if journal is not None:
+                    journal.begin(p, job_options.get("output_path"))
+                yield p, job_options, st, base
+
+        def finished(job, result):
+            path, _, st, base = job
+            if timings is not None:
+                result, timing_record = result
+                timings.add(timing_record)
+            if result and manifest is not None:
+                manifest.record(path, "image", base, result, st)
+            if journal is not None:
+                journal.finish(path, result)
+            record(path, bool(result))
+
+        convert = _convert if timings is None else _timed_convert
+        jobs = make_jobs()
+        # Only look ahead far enough to know whether a pool is worth it
+        first = list(itertools.islice(jobs, self.max_workers))
+        workers = min(self.max_workers, len(first))
+        if workers <= 1:
+            # Not worth spawning processes for a single worker/file
+            for job in itertools.chain(first, jobs):
+                if self._cancel.is_set():
+                    break
+                finished(job, convert(job[0], job[1]))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                self._run_pool(pool, workers, itertools.chain(first, jobs), convert, finished, timings)
+        if manifest is not None:
+            manifest.flush()
+        if self.probe is not None:
+            self.probe.flush()
+        return success, failed
+
+    def _run_pool(self, pool, workers, jobs, convert, finished, timings):
+        """Submit jobs in order, at most one per worker, while their memory
+        estimates fit the budget; hand each result to finished(). jobs is
+        an iterator and is only advanced when the next job is admitted."""
+        job = next(jobs, None)
+        running = {}  # future -> (job, estimated bytes)
+        in_use = 0
+        head_estimate = None
+        while job is not None or running:
+            while job is not None and len(running) < workers and not self._cancel.is_set():
+                if head_estimate is None:
+                    head_estimate = estimate_image_memory(job[0], job[1], self.probe)
+                # An oversized file is admitted only into an empty pool
+                if running and in_use + head_estimate > self.memory_budget:
+                    break
+                running[pool.submit(convert, job[0], job[1])] = (job, head_estimate)
+                in_use += head_estimate
+                head_estimate = None
+                job = next(jobs, None)
+            if not running:
+                break  # cancelled
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                done_job, estimate = running.pop(fut)
+                in_use -= estimate
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    # Worker crashed (e.g. killed by the OS) rather than returning False
+                    print(f"Failed to convert {done_job[0]}: {e}")
+                    result = False
+                    if timings is not None:
+                        result = (False, FileTimer(done_job[0], "image").finish(False, e))
+                finished(done_job, result)
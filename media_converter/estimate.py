@@ -0,0 +1,139 @@
+import json
+import os
+import threading
+
+from .cache import default_cache_path
+from .chunked import MIN_CHUNKED_DURATION
+from .paths import atomic_output
+from .scheduler import threads_for
+from .video import REMUX, plan_video
+
+# Assumed until this machine has measured a conversion of that kind: one
+# encoder thread keeping up with 720p in real time, and stream copies at
+# ordinary disk speed
+DEFAULT_ENCODE_RATE = 1280 * 720
+DEFAULT_REMUX_RATE = 100 * 1024 * 1024
+# Weight of the newest measurement in the running averages
+SMOOTHING = 0.3
+# Shorter runs are mostly ffmpeg startup and say little about its speed
+MIN_SAMPLE_SECONDS = 1.0
+
+
+def default_speeds_path() -> str:
+    """Encode speed history file, stored beside the metadata cache."""
+    return os.path.join(os.path.dirname(default_cache_path()), "encode-speeds.json")
+
+
+class EncodeSpeedHistory:
+    """Conversion speeds measured by earlier batches, used to estimate how
+    long a new one will take.
+
+    Encodes are measured in source pixel-seconds (width x height x duration)
+    per second of wall time per ffmpeg thread, so a measurement on 1080p
+    clips also prices 4K ones and jobs given a different thread share.
+    There is one running average per output format, falling back to the
+    average over all formats. Remuxes (stream copies) are measured in bytes
+    per second. Safe to share between threads; save() writes the file.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_speeds_path()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._data = {"encode": {}, "remux": None}
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                data = json.load(fh)
+            self._data["encode"] = dict(data.get("encode") or {})
+            self._data["remux"] = data.get("remux")
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def rate(self, output_format=None, remux=False):
+        """(rate, samples) for a kind of conversion; samples is 0 when the
+        rate is the built-in default."""
+        with self._lock:
+            if remux:
+                entry = self._data["remux"]
+                return (entry["rate"], entry["samples"]) if entry else (DEFAULT_REMUX_RATE, 0)
+            encode = self._data["encode"]
+            entry = encode.get((output_format or "").lower())
+            if entry:
+                return entry["rate"], entry["samples"]
+            samples = sum(e["samples"] for e in encode.values())
+            if not samples:
+                return DEFAULT_ENCODE_RATE, 0
+            return sum(e["rate"] * e["samples"] for e in encode.values()) / samples, samples
+
+    def record(self, output_format, size, duration, nbytes, wall, threads, method):
+        """Add one finished conversion: size is the source (width, height),
+        nbytes its file size, wall the seconds ffmpeg ran with threads."""
+        if not wall or wall < MIN_SAMPLE_SECONDS:
+            return
+        if method == REMUX:
+            if not nbytes:
+                return
+            key, value = None, nbytes / wall
+        else:
+            if not size or not duration:
+                return
+            key, value = output_format.lower(), size[0] * size[1] * duration / (wall * max(1, threads or 1))
+        with self._lock:
+            entry = self._data["remux"] if key is None else self._data["encode"].get(key)
+            if entry:
+                entry = {"rate": entry["rate"] + SMOOTHING * (value - entry["rate"]), "samples": entry["samples"] + 1}
+            else:
+                entry = {"rate": value, "samples": 1}
+            if key is None:
+                self._data["remux"] = entry
+            else:
+                self._data["encode"][key] = entry
+            self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            text = json.dumps(self._data, indent=1)
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with atomic_output(self.path) as tmp:
+                with open(tmp, "w", encoding="utf-8") as fh:
+                    fh.write(text)
+        except OSError as e:
+            print(f"Could not save encode speeds: {e}")
+
+    def estimate(self, info, options, nbytes=None, total_threads=None):
+        """Estimate one conversion of a source probed with probe_video() using
+        convert_video() options, the way VideoJobScheduler would run it.
+        Returns (seconds, threads), or None when the source's resolution or
+        duration is unknown."""
+        total_threads = total_threads or os.cpu_count() or 1
+        fmt = options.get("output_format", "mp4")
+        if plan_video(info, fmt, options.get("width"), options.get("height"), options.get("remux")) == REMUX:
+            if not nbytes:
+                return None
+            return nbytes / self.rate(remux=True)[0], 1
+        w, h, duration = info.get("width"), info.get("height"), info.get("duration")
+        if not w or not h or not duration:
+            return None
+        if options.get("chunked") and duration >= MIN_CHUNKED_DURATION:
+            threads = total_threads
+        else:
+            threads = threads_for(w, h, total_threads)
+        return w * h * duration / (self.rate(fmt)[0] * threads), threads
+
+
+def batch_seconds(estimates, max_jobs, total_threads=None) -> float:
+    """Wall time of a batch from (seconds, threads) estimates: the scheduler
+    keeps the cores busy with as many jobs as fit, so it is the work in
+    thread-seconds spread over the cores, but never less than the job-count
+    limit or the longest single job allows."""
+    total_threads = total_threads or os.cpu_count() or 1
+    if not estimates:
+        return 0.0
+    thread_seconds = sum(s * t for s, t in estimates)
+    return max(thread_seconds / total_threads,
+               sum(s for s, _ in estimates) / max(1, max_jobs),
+               max(s for s, _ in estimates))
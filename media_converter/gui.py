@@ -0,0 +1,1462 @@
+import os
+import sys
+import queue
+import subprocess
+import threading
+import tempfile
+import webbrowser
+import tkinter as tk
+from tkinter import filedialog, messagebox, Listbox, Scrollbar, Button, OptionMenu, StringVar
+from tkinter import ttk
+from tkinterdnd2 import DND_FILES, TkinterDnD
+from PIL import Image, ImageTk
+
+from .engine import ImageConversionEngine, default_workers
+from .estimate import EncodeSpeedHistory, batch_seconds
+from .images import RESAMPLE_TIERS
+from .journal import BatchJournal, default_journal_path
+from .cache import MetadataCache
+from .manifest import ConversionManifest
+from .metadata import CachedImageProbe, MetadataScanner, probe_image
+from .paths import SCRIPT_DIR, RESOURCES_DIR, OutputPlanner, iter_inputs, iter_media_files, output_path_for
+from .quality import JPEG_SUBSAMPLING
+from .scheduler import VideoJobScheduler, default_max_jobs
+from .thumbnails import ThumbnailLoader, open_thumbnail
+from .timing import TimingLog, default_timings_path
+from .video import ffmpeg_available, find_ffmpeg, find_ffprobe, probe_video
+
+# Paths to resources (icon and logo)
+ICON_PATH = os.path.join(RESOURCES_DIR, "tekutah_logo_icon_Square.ico")
+LOGO_PATH = os.path.join(RESOURCES_DIR, "AppLogo.png")
+LOGO_SCALE = 0.10  # Scale logo to 25% of original size
+
+def browse_files():
+    files = filedialog.askopenfilenames(
+        filetypes=[("Image Files", "*.heic *.png *.jpg *.jpeg *.bmp *.gif *.tiff *.webp"), ("All files", "*.*")]
+    )
+    add_files(files)
+
+def browse_folder():
+    folder = filedialog.askdirectory()
+    if folder:
+        add_folder(folder)
+
+def drop_files(event):
+    files = root.tk.splitlist(event.data)
+    add_files([f for f in files if not os.path.isdir(f)])
+    for folder in (f for f in files if os.path.isdir(f)):
+        add_folder(folder)
+
+
+def add_folder(folder):
+    """Queue a folder's images without freezing the window: a background
+    walk hands chunks of paths to add_files() as it finds them."""
+    found = queue.Queue()
+    output_folder = output_folder_path.get()
+    skip = () if output_folder == "Output: Same as source folder" else {os.path.realpath(output_folder)}
+    recursive = recursive_var.get()  # Tk is only touched from the UI thread
+
+    def walk():
+        chunk = []
+        try:
+            for path, _ in iter_media_files(folder, ("image",), recursive, skip):
+                chunk.append(path)
+                if len(chunk) >= 500:
+                    found.put(chunk)
+                    chunk = []
+        finally:
+            # Even a failed walk ends pump()
+            found.put(chunk)
+            found.put(None)
+
+    def pump():
+        try:
+            while True:
+                chunk = found.get_nowait()
+                if chunk is None:
+                    return
+                add_files(chunk)
+        except queue.Empty:
+            pass
+        root.after(100, pump)
+
+    threading.Thread(target=walk, daemon=True).start()
+    root.after(100, pump)
+
+
+def image_options():
+    """Conversion options from the Images tab controls, or None if invalid."""
+    output_format = format_var.get()
+    
+    # Get output folder from the stringvar, if it's the default text, folder is empty
+    output_folder = output_folder_path.get()
+    if output_folder == "Output: Same as source folder":
+        output_folder = ""
+
+    # Get resize and quality options
+    try:
+        width = int(width_var.get()) if width_var.get() else None
+        height = int(height_var.get()) if height_var.get() else None
+    except ValueError:
+        messagebox.showerror("Invalid Input", "Width and height must be valid numbers.")
+        return None
+        
+    keep_aspect = aspect_ratio_var.get()
+    jpeg_quality = quality_var.get()
+
+    # Optional quality search targets (JPEG/WEBP); the slider is the upper bound
+    try:
+        max_kb = float(max_size_var.get()) if max_size_var.get().strip() else None
+        min_similarity = float(min_similarity_var.get()) if min_similarity_var.get().strip() else None
+    except ValueError:
+        messagebox.showerror("Invalid Input", "Max size and min similarity must be valid numbers.")
+        return None
+    if (max_kb is not None and max_kb <= 0) or (min_similarity is not None and not 0 < min_similarity < 1):
+        messagebox.showerror("Invalid Input", "Max size must be positive and min similarity between 0 and 1.")
+        return None
+
+    options = {
+        "output_format": output_format,
+        "output_folder": output_folder,
+        "width": width,
+        "height": height,
+        "keep_aspect": keep_aspect,
+        "jpeg_quality": jpeg_quality,
+        "resample": resample_var.get(),
+        "fast_downscale": fast_downscale_var.get(),
+        "full_decode": full_decode_var.get(),
+        "target_bytes": int(max_kb * 1024) if max_kb else None,
+        "target_similarity": min_similarity,
+        "jpeg_optimize": optimize_var.get(),
+        "jpeg_progressive": progressive_var.get(),
+        "jpeg_subsampling": None if subsampling_var.get() == "Default" else subsampling_var.get(),
+        "webp_method": None if webp_method_var.get() == "Default" else int(webp_method_var.get()),
+    }
+    return options
+
+
+def image_workers():
+    try:
+        return int(workers_var.get())
+    except (ValueError, tk.TclError):
+        return default_workers()
+
+
+def convert_all():
+    if not file_list:
+        messagebox.showwarning("No Files", "Please add some image files first.")
+        return
+
+    options = image_options()
+    if options is None:
+        return
+    output_format = options["output_format"]
+    output_folder = options["output_folder"]
+    manifest = get_manifest() if incremental_var.get() else None
+    journal = open_journal("images", "image", options)
+
+    # Determine conflict policy if any output targets already exist. In
+    # incremental mode, files already in the manifest reuse their own output.
+    # The planner lists each output folder once; the engine reuses it.
+    planner = OutputPlanner()
+    replace_policy = 'keep'
+    conflicts_found = False
+    for f in file_list:
+        if manifest is not None and manifest.known(f, "image", options):
+            continue
+        if journal is not None and journal.prepare(f, options) is None:
+            continue  # finished before an interruption
+        if planner.exists(output_path_for(f, output_folder, output_format.lower())):
+            conflicts_found = True
+            break
+
+    if conflicts_found:
+        resp = messagebox.askyesno(
+            "File already exists",
+            "One or more output files already exist.\n\nYes = Replace originals (overwrite)\nNo = Keep originals (append unique identifier)",
+        )
+        replace_policy = 'replace' if resp else 'keep'
+    options["conflict"] = replace_policy
+
+    paths = list(file_list)
+    engine = ImageConversionEngine(max_workers=image_workers(), probe=image_probe)
+    events = queue.Queue()
+
+    def progress(done, total, path, ok):
+        events.put(("progress", done, total, path))
+
+    timings = open_timings(options)
+
+    def worker_run():
+        try:
+            result = engine.run(paths, options, progress=progress, manifest=manifest, timings=timings,
+                                planner=planner, journal=journal)
+            complete = True
+        except Exception as e:
+            # Pool could not start at all (e.g. out of resources)
+            print(f"Image batch failed: {e}")
+            result = (0, paths)
+            complete = False
+        if journal is not None:
+            journal.close(complete)
+        report_timings(timings)
+        events.put(("done",) + result + (len(engine.skipped),))
+
+    convert_button.config(state="disabled")
+    image_progress.config(maximum=len(paths), value=0)
+    image_status_var.set(f"Converting 0 of {len(paths)} files...")
+    threading.Thread(target=worker_run, daemon=True).start()
+
+    def poll():
+        # Drain everything queued since the last tick, then reschedule
+        try:
+            while True:
+                evt = events.get_nowait()
+                if evt[0] == "progress":
+                    _, done, total, path = evt
+                    image_progress.config(value=done)
+                    image_status_var.set(f"Converted {done} of {total}: {os.path.basename(path)}")
+                else:
+                    _, success, failed, skipped = evt
+                    finish_image_batch(output_format, len(paths), success, failed, skipped)
+                    return
+        except queue.Empty:
+            pass
+        root.after(100, poll)
+
+    root.after(100, poll)
+
+
+def convert_folder():
+    """Convert a whole folder tree while it is still being walked, without
+    listing it first; with Mirror Subfolders the tree is recreated under
+    the output folder."""
+    folder = filedialog.askdirectory()
+    if not folder:
+        return
+    options = image_options()
+    if options is None:
+        return
+    # The walk is lazy, so existing outputs can't be checked up front; never
+    # overwrite them (Skip Up-to-date still reuses this tool's own outputs)
+    options["conflict"] = 'keep'
+    manifest = get_manifest() if incremental_var.get() else None
+    journal = open_journal("image-folder", "image", options)
+    inputs = iter_inputs([folder], ("image",), recursive_var.get(), options["output_folder"], mirror_var.get())
+    engine = ImageConversionEngine(max_workers=image_workers(), probe=image_probe)
+    events = queue.Queue()
+    timings = open_timings(options)
+
+    def worker_run():
+        try:
+            result = engine.run(inputs, options, progress=lambda done, total, path, ok: events.put((done, path)),
+                                manifest=manifest, timings=timings, journal=journal)
+            complete = True
+        except Exception as e:
+            print(f"Folder batch failed: {e}")
+            result = (0, [folder])
+            complete = False
+        if journal is not None:
+            journal.close(complete)
+        report_timings(timings)
+        events.put(result + (len(engine.skipped),))
+
+    convert_button.config(state="disabled")
+    folder_button.config(state="disabled")
+    image_progress.config(mode="indeterminate")
+    image_progress.start(50)
+    image_status_var.set(f"Converting {folder}...")
+    threading.Thread(target=worker_run, daemon=True).start()
+
+    def poll():
+        try:
+            while True:
+                evt = events.get_nowait()
+                if len(evt) == 2:
+                    done, path = evt
+                    image_status_var.set(f"Converted {done}: {os.path.basename(path)}")
+                    continue
+                success, failed, skipped = evt
+                image_progress.stop()
+                image_progress.config(mode="determinate", value=0)
+                image_status_var.set("")
+                convert_button.config(state="normal")
+                folder_button.config(state="normal")
+                total = success + len(failed)
+                if not failed:
+                    messagebox.showinfo("Done", f"Successfully converted {success} of {total} files to {options['output_format']}." + skipped_note(skipped))
+                else:
+                    messagebox.showwarning("Completed with Errors", f"Converted {success} of {total} files." + skipped_note(skipped) + "\n\nFailed to convert:\n" + "\n".join(os.path.basename(f) for f in failed[:50]))
+                return
+        except queue.Empty:
+            pass
+        root.after(100, poll)
+
+    root.after(100, poll)
+
+
+def skipped_note(skipped):
+    return f"\n\n{skipped} already up to date (skipped)." if skipped else ""
+
+
+def open_journal(name, kind, options):
+    """Journal for a batch, so one cut short by a crash resumes the next time
+    it is run with the same settings; None if it can't be written."""
+    try:
+        journal = BatchJournal(default_journal_path(name), kind, options)
+    except OSError as e:
+        print(f"Batch journal unavailable: {e}")
+        return None
+    if journal.resumed:
+        print(f"Resuming interrupted {name} batch: {len(journal.completed)} files already done,"
+              f" {journal.cleaned} partial outputs removed")
+    return journal
+
+
+def open_timings(options=None):
+    """Per-batch timing log when MEDIA_CONVERTER_TIMINGS names a file, else
+    None; an image batch with a quality search target always gets one (kept
+    in memory) so the extra encodes show up in the summary."""
+    path = default_timings_path()
+    if path:
+        return TimingLog(path)
+    if options and (options.get("target_bytes") or options.get("target_similarity")):
+        return TimingLog()
+    return None
+
+
+def report_timings(timings):
+    # Instrumentation is a diagnostics aid; the summary goes to the console
+    if timings is not None:
+        timings.close()
+        print(timings.summary())
+
+
+def get_manifest():
+    """Open the incremental-conversion manifest on first use."""
+    global conversion_manifest
+    if conversion_manifest is None:
+        conversion_manifest = ConversionManifest()
+    return conversion_manifest
+
+
+def finish_image_batch(output_format, total, success, failed, skipped=0):
+    convert_button.config(state="normal")
+    image_status_var.set("")
+    image_progress.config(value=0)
+    failed_files = [os.path.basename(f) for f in failed]
+    if not failed_files:
+        messagebox.showinfo("Done", f"Successfully converted {success} of {total} files to {output_format}." + skipped_note(skipped))
+    else:
+        messagebox.showwarning("Completed with Errors", f"Converted {success} of {total} files." + skipped_note(skipped) + "\n\nFailed to convert:\n" + "\n".join(failed_files))
+
+    # Files added while the batch ran were appended after it; keep those queued
+    file_tree.delete(*[file_index.pop(p) for p in file_list[:total]])
+    del file_list[:total]
+    on_preview_mode()
+
+
+def fmt_size(num_bytes: int) -> str:
+    try:
+        n = float(num_bytes)
+    except Exception:
+        return "?"
+    for unit in ["B", "KB", "MB", "GB", "TB"]:
+        if n < 1024.0 or unit == "TB":
+            if unit == "B":
+                return f"{int(n)} {unit}"
+            return f"{n:.1f} {unit}"
+        n /= 1024.0
+
+
+def fmt_duration(seconds) -> str:
+    """Format seconds as M:SS or H:MM:SS."""
+    m, sec = divmod(int(seconds), 60)
+    h, m = divmod(m, 60)
+    return f"{h}:{m:02d}:{sec:02d}" if h else f"{m}:{sec:02d}"
+
+
+def fmt_video_progress(job) -> str:
+    """Status cell text for a running video job: percent, speed and ETA."""
+    p = job.progress
+    parts = []
+    if p["percent"] is not None:
+        parts.append(f"{p['percent']:.0f}%")
+    if p["fps"]:
+        parts.append(f"{p['fps']:.0f} fps")
+    if p["speed"]:
+        parts.append(f"{p['speed']:.2g}x")
+    if p["eta"] is not None:
+        parts.append(f"ETA {fmt_duration(p['eta'])}")
+    if job.method:
+        parts.insert(0, job.method)
+    return " ".join(parts) or f"running ({job.threads}t)"
+
+
+def add_file(path: str):
+    add_files([path])
+
+
+def add_files(paths):
+    """Insert rows immediately with placeholder size/dimensions and let the
+    background scanner fill them in."""
+    new = []
+    for path in paths:
+        if not path or path in file_index:
+            continue
+        # The hidden text column holds the full path for the preview pane
+        file_index[path] = file_tree.insert("", tk.END, text=path, values=(os.path.basename(path), "...", "..."))
+        file_list.append(path)
+        new.append(path)
+    if new:
+        image_scanner.submit(new)
+        if not image_pump["scheduled"]:
+            image_pump["scheduled"] = True
+            root.after(50, pump_image_metadata)
+        if preview_mode.get() == "Grid":
+            schedule_grid()
+
+
+def pump_image_metadata():
+    """Apply a bounded chunk of scanner results per tick, rescheduling while
+    any are outstanding."""
+    image_pump["scheduled"] = False
+    for path, nbytes, dims in image_scanner.drain(500):
+        iid = file_index.get(path)
+        if iid is None:
+            # Row was removed (converted) before its metadata arrived
+            continue
+        size_str = fmt_size(nbytes) if nbytes is not None else "?"
+        dims_str = f"{dims[0]} x {dims[1]}" if dims else "?"
+        file_tree.item(iid, values=(os.path.basename(path), size_str, dims_str))
+    if image_scanner.pending:
+        image_pump["scheduled"] = True
+        root.after(50, pump_image_metadata)
+
+
+def selected_image():
+    sel = file_tree.selection()
+    return file_tree.item(sel[0], "text") if sel else None
+
+
+def show_preview():
+    """Show the selected row's thumbnail, asking the loader for it and the
+    next few rows (for arrow-key browsing) when they are not in memory."""
+    path = selected_image()
+    if path is None:
+        preview_label.config(image="", text="No file selected")
+        preview_label.image = None
+        return
+    data = thumbnail_loader.get(path)
+    if data is not None:
+        try:
+            photo = ImageTk.PhotoImage(open_thumbnail(data, PREVIEW_SIZE))
+        except Exception:
+            photo = None
+        preview_label.config(image=photo or "", text=os.path.basename(path))
+        preview_label.image = photo
+    else:
+        preview_label.config(image="", text="No preview" if path in thumbnail_loader.failed else "Loading...")
+        preview_label.image = None
+    i = file_tree.index(file_index[path])
+    request_thumbnails([path] + file_list[i + 1:i + 1 + PREVIEW_PREFETCH])
+
+
+def schedule_grid():
+    if not grid_state["scheduled"]:
+        grid_state["scheduled"] = True
+        root.after_idle(draw_grid)
+
+
+def draw_grid():
+    """Redraw only the grid cells in view. PhotoImages are kept for those
+    cells alone, and thumbnails are requested for them top-left first."""
+    grid_state["scheduled"] = False
+    if preview_mode.get() != "Grid":
+        return
+    grid_canvas.delete("all")
+    cols = max(1, grid_canvas.winfo_width() // GRID_CELL_W)
+    grid_state["cols"] = cols
+    rows = -(-len(file_list) // cols)
+    grid_canvas.configure(scrollregion=(0, 0, cols * GRID_CELL_W, max(1, rows * GRID_CELL_H)))
+    top = grid_canvas.canvasy(0)
+    first = int(top // GRID_CELL_H) * cols
+    last = min(len(file_list), (int((top + grid_canvas.winfo_height()) // GRID_CELL_H) + 1) * cols)
+    selected = selected_image()
+    photos, missing = {}, []
+    for i in range(first, last):
+        path = file_list[i]
+        x = (i % cols) * GRID_CELL_W + GRID_CELL_W // 2
+        y = (i // cols) * GRID_CELL_H + 4
+        photo = grid_photos.get(path)
+        if photo is None:
+            data = thumbnail_loader.get(path)
+            if data is not None:
+                try:
+                    photo = ImageTk.PhotoImage(open_thumbnail(data, GRID_THUMB))
+                except Exception:
+                    photo = None
+        if photo is not None:
+            photos[path] = photo
+            grid_canvas.create_image(x, y + GRID_THUMB // 2, image=photo)
+        else:
+            half = GRID_THUMB // 2
+            grid_canvas.create_rectangle(x - half, y, x + half, y + GRID_THUMB, outline="#ccc")
+            if path not in thumbnail_loader.failed:
+                missing.append(path)
+        if path == selected:
+            half = GRID_THUMB // 2 + 2
+            grid_canvas.create_rectangle(x - half, y - 2, x + half, y + GRID_THUMB + 2, outline="#3874d8", width=2)
+        grid_canvas.create_text(x, y + GRID_THUMB + 10, text=os.path.basename(path)[:14], fill="grey")
+    # Cells scrolled out of view release their images
+    grid_photos.clear()
+    grid_photos.update(photos)
+    request_thumbnails(missing)
+
+
+def grid_yview(*args):
+    grid_canvas.yview(*args)
+    schedule_grid()
+
+
+def on_grid_wheel(event):
+    if getattr(event, "num", None) in (4, 5):
+        step = -1 if event.num == 4 else 1
+    else:
+        step = -1 if event.delta > 0 else 1
+    grid_yview("scroll", step, "units")
+
+
+def on_grid_click(event):
+    """Select the clicked cell's row in the list."""
+    col = int(grid_canvas.canvasx(event.x) // GRID_CELL_W)
+    i = int(grid_canvas.canvasy(event.y) // GRID_CELL_H) * grid_state["cols"] + col
+    if col < grid_state["cols"] and 0 <= i < len(file_list):
+        iid = file_index[file_list[i]]
+        file_tree.selection_set(iid)
+        file_tree.see(iid)
+
+
+def on_tree_select(event=None):
+    mode = preview_mode.get()
+    if mode == "Selected":
+        show_preview()
+    elif mode == "Grid":
+        schedule_grid()
+
+
+def on_preview_mode(*_):
+    mode = preview_mode.get()
+    preview_label.pack_forget()
+    grid_vsb.pack_forget()
+    grid_canvas.pack_forget()
+    grid_photos.clear()
+    preview_label.config(image="")
+    preview_label.image = None
+    if mode == "Selected":
+        preview_frame.pack_propagate(False)
+        preview_label.pack(fill=tk.BOTH, expand=True)
+        show_preview()
+    elif mode == "Grid":
+        preview_frame.pack_propagate(False)
+        grid_vsb.pack(side=tk.RIGHT, fill=tk.Y)
+        grid_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        schedule_grid()
+    else:
+        # Off: shrink to the mode menu and stop generating thumbnails
+        preview_frame.pack_propagate(True)
+        thumbnail_loader.request([])
+
+
+def request_thumbnails(paths):
+    thumbnail_loader.request(paths)
+    if not thumb_pump["scheduled"]:
+        thumb_pump["scheduled"] = True
+        root.after(50, pump_thumbnails)
+
+
+def pump_thumbnails():
+    """Refresh the preview as thumbnails arrive, rescheduling while the
+    loader has work."""
+    thumb_pump["scheduled"] = False
+    done = thumbnail_loader.drain()
+    mode = preview_mode.get()
+    if done and mode == "Selected" and selected_image() in done:
+        show_preview()
+    elif done and mode == "Grid":
+        schedule_grid()
+    if done or thumbnail_loader.busy:
+        thumb_pump["scheduled"] = True
+        root.after(100, pump_thumbnails)
+
+
+def uninstall_app():
+    """Schedule self-uninstall by spawning a PowerShell script that waits for this
+    process to exit, then removes the app folder and the desktop shortcut."""
+    if not messagebox.askyesno(
+        "Uninstall Image Converter",
+        "This will remove the application folder and desktop shortcut.\n\nProceed?",
+    ):
+        return
+
+    app_dir = SCRIPT_DIR
+    parent_pid = os.getpid()
+
+    ps_content = f"""
+$ErrorActionPreference = 'SilentlyContinue'
+$parentPid = {parent_pid}
+$target = "{app_dir}"
+$desk = [Environment]::GetFolderPath('Desktop')
+$short = Join-Path $desk 'Image Converter.lnk'
+
+Start-Sleep -Milliseconds 200
+while (Get-Process -Id $parentPid -ErrorAction SilentlyContinue) {{ Start-Sleep -Milliseconds 200 }}
+
+Set-Location $env:TEMP
+if (Test-Path $short) {{ Remove-Item -LiteralPath $short -Force -ErrorAction SilentlyContinue }}
+if (Test-Path $target) {{ Remove-Item -LiteralPath $target -Recurse -Force -ErrorAction SilentlyContinue }}
+"""
+
+    try:
+        tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".ps1")
+        tmp.write(ps_content.encode("utf-8"))
+        tmp.close()
+
+        # Launch hidden PowerShell to perform uninstall after this GUI exits
+        creationflags = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+        try:
+            si = subprocess.STARTUPINFO()
+            si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        except Exception:
+            si = None
+
+        subprocess.Popen(
+            [
+                "powershell",
+                "-NoProfile",
+                "-ExecutionPolicy", "Bypass",
+                "-WindowStyle", "Hidden",
+                "-File", tmp.name,
+            ],
+            startupinfo=si,
+            creationflags=creationflags,
+        )
+    except Exception as e:
+        messagebox.showerror("Uninstall", f"Failed to start uninstaller: {e}")
+        return
+
+    # Close GUI; the uninstaller will take over afterwards
+    root.after(50, root.destroy)
+
+
+def open_git_page():
+    """Open the GitHub page in the default web browser."""
+    url = "https://github.com/Xerophayze/TEK-Media-Converter"
+    try:
+        webbrowser.open(url, new=2)
+    except Exception as e:
+        messagebox.showerror("Open Page", f"Failed to open GitHub page:\n{e}")
+
+# GUI setup
+root = TkinterDnD.Tk()
+root.title("Image Format Converter")
+root.geometry("500x600")
+root.minsize(500, 650)
+
+# Menu bar with File -> Uninstall, Exit and Help -> View Git Page
+menubar = tk.Menu(root)
+
+filemenu = tk.Menu(menubar, tearoff=0)
+filemenu.add_command(label="Uninstall...", command=uninstall_app)
+filemenu.add_separator()
+filemenu.add_command(label="Exit", command=root.destroy)
+menubar.add_cascade(label="File", menu=filemenu)
+
+helpmenu = tk.Menu(menubar, tearoff=0)
+helpmenu.add_command(label="View Git Page", command=open_git_page)
+menubar.add_cascade(label="Help", menu=helpmenu)
+
+root.config(menu=menubar)
+
+# Set window icon if present
+if os.path.exists(ICON_PATH):
+    try:
+        root.iconbitmap(ICON_PATH)
+    except Exception as e:
+        print(f"Could not set window icon: {e}")
+
+# Add app logo at the top if present
+if os.path.exists(LOGO_PATH):
+    try:
+        _logo_image = Image.open(LOGO_PATH)
+        # Scale logo to desired proportion (default 25%)
+        new_w = max(1, int(_logo_image.width * LOGO_SCALE))
+        new_h = max(1, int(_logo_image.height * LOGO_SCALE))
+        _logo_image = _logo_image.resize((new_w, new_h), Image.Resampling.LANCZOS)
+        root.logo_photo = ImageTk.PhotoImage(_logo_image)
+        tk.Label(root, image=root.logo_photo).pack(pady=(10, 0))
+    except Exception as e:
+        print(f"Could not load logo: {e}")
+
+"""Notebook with two tabs: Images and Video"""
+notebook = ttk.Notebook(root)
+notebook.pack(fill=tk.BOTH, expand=True)
+
+# ----- Image Tab -----
+image_tab = tk.Frame(notebook)
+notebook.add(image_tab, text="Images")
+
+label = tk.Label(image_tab, text="Drag & Drop Image Files Below or Use Browse Button")
+label.pack(pady=10)
+
+frame = tk.Frame(image_tab)
+frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+# Treeview for file details
+columns = ("name", "size", "dims")
+file_tree = ttk.Treeview(frame, columns=columns, show="headings", selectmode="browse")
+file_tree.heading("name", text="File")
+file_tree.heading("size", text="Size")
+file_tree.heading("dims", text="Dimensions")
+file_tree.column("name", anchor="w", width=300, stretch=True)
+file_tree.column("size", anchor="e", width=100, stretch=False)
+file_tree.column("dims", anchor="center", width=120, stretch=False)
+
+vsb = ttk.Scrollbar(frame, orient="vertical", command=file_tree.yview)
+hsb = ttk.Scrollbar(frame, orient="horizontal", command=file_tree.xview)
+file_tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+
+# Keep 'File' column filling available width while keeping Size/Dimensions fixed
+_SIZE_COL_W = 100
+_DIMS_COL_W = 120
+def _resize_columns(event):
+    try:
+        total = event.width
+        name_w = max(150, total - _SIZE_COL_W - _DIMS_COL_W - 2)
+        file_tree.column("name", width=name_w)
+        file_tree.column("size", width=_SIZE_COL_W)
+        file_tree.column("dims", width=_DIMS_COL_W)
+    except Exception:
+        pass
+file_tree.bind("<Configure>", _resize_columns)
+
+# Thumbnail preview beside the list: the selected row, or a grid of the
+# whole list (see show_preview/draw_grid)
+PREVIEW_SIZE = 256
+PREVIEW_PREFETCH = 5
+GRID_THUMB = 80
+GRID_CELL_W, GRID_CELL_H = 92, 108
+preview_frame = tk.Frame(frame, width=PREVIEW_SIZE + 24)
+preview_bar = tk.Frame(preview_frame)
+preview_bar.pack(side=tk.TOP, fill=tk.X)
+tk.Label(preview_bar, text="Preview:").pack(side=tk.LEFT, padx=(5, 0))
+preview_mode = StringVar(root)
+preview_mode.set("Selected")
+OptionMenu(preview_bar, preview_mode, "Off", "Selected", "Grid", command=on_preview_mode).pack(side=tk.LEFT)
+preview_label = tk.Label(preview_frame, text="No file selected", fg="grey", compound=tk.TOP,
+                         wraplength=PREVIEW_SIZE)
+grid_canvas = tk.Canvas(preview_frame, highlightthickness=0)
+grid_vsb = ttk.Scrollbar(preview_frame, orient="vertical", command=grid_yview)
+grid_canvas.configure(yscrollcommand=grid_vsb.set)
+grid_canvas.bind("<Configure>", lambda e: schedule_grid())
+grid_canvas.bind("<Button-1>", on_grid_click)
+for _seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+    grid_canvas.bind(_seq, on_grid_wheel)
+grid_photos = {}  # path -> PhotoImage of the cells in view
+grid_state = {"scheduled": False, "cols": 1}
+thumb_pump = {"scheduled": False}
+file_tree.bind("<<TreeviewSelect>>", on_tree_select)
+preview_frame.pack(side=tk.RIGHT, fill=tk.Y, padx=(5, 0))
+
+hsb.pack(side=tk.BOTTOM, fill=tk.X)
+vsb.pack(side=tk.RIGHT, fill=tk.Y)
+file_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+# Drag-and-drop support on the tree
+file_tree.drop_target_register(DND_FILES)
+file_tree.dnd_bind("<<Drop>>", drop_files)
+
+image_buttons = tk.Frame(image_tab)
+image_buttons.pack(pady=5)
+browse_button = Button(image_buttons, text="Browse Files", command=browse_files)
+browse_button.pack(side=tk.LEFT, padx=3)
+Button(image_buttons, text="Add Folder", command=browse_folder).pack(side=tk.LEFT, padx=3)
+folder_button = Button(image_buttons, text="Convert Folder...", command=convert_folder)
+folder_button.pack(side=tk.LEFT, padx=3)
+
+# --- Options Panel (organized) ---
+controls = tk.LabelFrame(image_tab, text="Options")
+controls.pack(pady=10, fill=tk.X, padx=10)
+
+# Output folder row
+output_folder_path = StringVar()
+output_folder_path.set("Output: Same as source folder")
+
+def select_output_folder():
+    folder_selected = filedialog.askdirectory()
+    if folder_selected:
+        output_folder_path.set(folder_selected)
+
+tk.Label(controls, text="Output Folder:").grid(row=0, column=0, sticky="w", padx=5, pady=5)
+output_folder_label = tk.Label(controls, textvariable=output_folder_path, fg="grey", anchor="w")
+output_folder_label.grid(row=0, column=1, columnspan=3, sticky="we", padx=5, pady=5)
+select_folder_button = Button(controls, text="Browse...", command=select_output_folder)
+select_folder_button.grid(row=0, column=4, sticky="e", padx=5, pady=5)
+
+# Format + quality row
+tk.Label(controls, text="Format:").grid(row=1, column=0, sticky="w", padx=5, pady=5)
+formats = ["JPEG", "PNG", "BMP", "GIF", "TIFF", "WEBP"]
+format_var = StringVar(root)
+format_var.set(formats[0])
+format_menu = OptionMenu(controls, format_var, *formats)
+format_menu.grid(row=1, column=1, sticky="w", padx=5, pady=5)
+
+quality_label = tk.Label(controls, text="Quality:")
+quality_label.grid(row=1, column=2, sticky="e", padx=5, pady=5)
+quality_var = tk.IntVar(value=95)
+quality_slider = tk.Scale(controls, from_=1, to=100, orient=tk.HORIZONTAL, variable=quality_var, length=180)
+quality_slider.grid(row=1, column=3, columnspan=2, sticky="we", padx=5, pady=5)
+
+# Resize row
+tk.Label(controls, text="Resize:").grid(row=2, column=0, sticky="w", padx=5, pady=5)
+width_var = StringVar()
+height_var = StringVar()
+tk.Label(controls, text="W:").grid(row=2, column=1, sticky="w", padx=(5,0), pady=5)
+width_entry = tk.Entry(controls, textvariable=width_var, width=6)
+width_entry.grid(row=2, column=2, sticky="w", padx=(0,5), pady=5)
+tk.Label(controls, text="H:").grid(row=2, column=3, sticky="w", padx=(5,0), pady=5)
+height_entry = tk.Entry(controls, textvariable=height_var, width=6)
+height_entry.grid(row=2, column=4, sticky="w", padx=(0,5), pady=5)
+
+# Aspect ratio and action row
+def on_aspect_toggle(*_):
+    if aspect_ratio_var.get():
+        # Maintain aspect: only width entry active; height disabled and cleared
+        height_var.set("")
+        height_entry.config(state="disabled")
+    else:
+        height_entry.config(state="normal")
+
+aspect_ratio_var = tk.BooleanVar(value=True)
+aspect_ratio_check = tk.Checkbutton(controls, text="Keep Aspect Ratio", variable=aspect_ratio_var, command=on_aspect_toggle)
+aspect_ratio_check.grid(row=3, column=0, columnspan=2, sticky="w", padx=5, pady=5)
+on_aspect_toggle()
+
+# Reduced-resolution decode for large downscales (JPEG draft + staged reduce)
+fast_downscale_var = tk.BooleanVar(value=False)
+fast_downscale_check = tk.Checkbutton(controls, text="Fast Downscale", variable=fast_downscale_var)
+fast_downscale_check.grid(row=3, column=2, columnspan=2, sticky="w", padx=5, pady=5)
+
+# Embedded HEIC/JPEG thumbnails are used for small outputs unless this is set
+full_decode_var = tk.BooleanVar(value=False)
+full_decode_check = tk.Checkbutton(controls, text="Full Decode", variable=full_decode_var)
+full_decode_check.grid(row=3, column=4, sticky="w", padx=5, pady=5)
+
+# Parallel workers row (defaults to one process per CPU core)
+tk.Label(controls, text="Workers:").grid(row=4, column=0, sticky="w", padx=5, pady=5)
+workers_var = tk.IntVar(value=default_workers())
+workers_spin = tk.Spinbox(controls, from_=1, to=max(64, default_workers()), textvariable=workers_var, width=5)
+workers_spin.grid(row=4, column=1, sticky="w", padx=5, pady=5)
+
+tk.Label(controls, text="Resampling:").grid(row=4, column=2, sticky="e", padx=5, pady=5)
+resample_var = StringVar(root)
+resample_var.set("quality")
+resample_menu = OptionMenu(controls, resample_var, *RESAMPLE_TIERS)
+resample_menu.grid(row=4, column=3, sticky="w", padx=5, pady=5)
+
+convert_button = Button(controls, text="Convert", command=convert_all)
+convert_button.grid(row=4, column=4, sticky="e", padx=5, pady=5)
+
+# Incremental mode: skip files whose output already matches source + settings
+incremental_var = tk.BooleanVar(value=False)
+incremental_check = tk.Checkbutton(controls, text="Skip Up-to-date", variable=incremental_var)
+incremental_check.grid(row=5, column=0, columnspan=2, sticky="w", padx=5, pady=5)
+
+# Folder ingest (Add Folder, dropped folders, Convert Folder)
+recursive_var = tk.BooleanVar(value=True)
+recursive_check = tk.Checkbutton(controls, text="Include Subfolders", variable=recursive_var)
+recursive_check.grid(row=5, column=2, columnspan=2, sticky="w", padx=5, pady=5)
+mirror_var = tk.BooleanVar(value=False)
+mirror_check = tk.Checkbutton(controls, text="Mirror Subfolders", variable=mirror_var)
+mirror_check.grid(row=5, column=4, sticky="w", padx=5, pady=5)
+
+# Quality search row (JPEG/WEBP): highest quality under a size, or lowest
+# quality that still scores the given similarity
+max_size_label = tk.Label(controls, text="Max Size (KB):")
+max_size_label.grid(row=6, column=0, sticky="w", padx=5, pady=5)
+max_size_var = StringVar()
+max_size_entry = tk.Entry(controls, textvariable=max_size_var, width=8)
+max_size_entry.grid(row=6, column=1, sticky="w", padx=5, pady=5)
+min_similarity_label = tk.Label(controls, text="Min Similarity:")
+min_similarity_label.grid(row=6, column=2, sticky="e", padx=5, pady=5)
+min_similarity_var = StringVar()
+min_similarity_entry = tk.Entry(controls, textvariable=min_similarity_var, width=6)
+min_similarity_entry.grid(row=6, column=3, sticky="w", padx=5, pady=5)
+progressive_var = tk.BooleanVar(value=False)
+progressive_check = tk.Checkbutton(controls, text="Progressive", variable=progressive_var)
+progressive_check.grid(row=6, column=4, sticky="w", padx=5, pady=5)
+quality_search_widgets = (max_size_label, max_size_entry, min_similarity_label, min_similarity_entry)
+
+# Encoder settings that trade time for size: JPEG subsampling and Huffman
+# optimization, or the WEBP method, sharing one row
+subsampling_label = tk.Label(controls, text="Subsampling:")
+subsampling_label.grid(row=7, column=0, sticky="w", padx=5, pady=5)
+subsampling_var = StringVar(root)
+subsampling_var.set("Default")
+subsampling_menu = OptionMenu(controls, subsampling_var, "Default", *JPEG_SUBSAMPLING)
+subsampling_menu.grid(row=7, column=1, sticky="w", padx=5, pady=5)
+optimize_var = tk.BooleanVar(value=False)
+optimize_check = tk.Checkbutton(controls, text="Optimize", variable=optimize_var)
+optimize_check.grid(row=7, column=2, sticky="w", padx=5, pady=5)
+jpeg_widgets = (progressive_check, subsampling_label, subsampling_menu, optimize_check)
+webp_method_label = tk.Label(controls, text="WEBP Method:")
+webp_method_label.grid(row=7, column=0, sticky="w", padx=5, pady=5)
+webp_method_var = StringVar(root)
+webp_method_var.set("Default")
+webp_method_menu = OptionMenu(controls, webp_method_var, "Default", *(str(m) for m in range(7)))
+webp_method_menu.grid(row=7, column=1, sticky="w", padx=5, pady=5)
+webp_widgets = (webp_method_label, webp_method_menu)
+
+# Grid stretch
+controls.columnconfigure(1, weight=1)
+controls.columnconfigure(3, weight=1)
+controls.columnconfigure(4, weight=0)
+
+# Show/hide quality controls based on format
+def on_format_change(*args):
+    fmt = format_var.get()
+    if fmt in ("JPEG", "WEBP"):
+        # Show and update label for quality-supported formats
+        quality_label.config(text=("JPEG Quality:" if fmt == "JPEG" else "WEBP Quality:"))
+        quality_label.grid()
+        quality_slider.grid()
+        for widget in quality_search_widgets:
+            widget.grid()
+    else:
+        quality_label.grid_remove()
+        quality_slider.grid_remove()
+        for widget in quality_search_widgets:
+            widget.grid_remove()
+    # Encoder settings for the chosen format only
+    for widgets, shown in ((jpeg_widgets, fmt == "JPEG"), (webp_widgets, fmt == "WEBP")):
+        for widget in widgets:
+            if shown:
+                widget.grid()
+            else:
+                widget.grid_remove()
+
+format_var.trace("w", on_format_change)
+
+# Set initial state for quality slider
+on_format_change()
+
+# Batch progress (fed from the conversion engine via a queue)
+image_status_var = StringVar()
+image_progress = ttk.Progressbar(image_tab, mode="determinate")
+image_progress.pack(fill=tk.X, padx=10)
+tk.Label(image_tab, textvariable=image_status_var, fg="grey", anchor="w").pack(fill=tk.X, padx=10, pady=(0, 5))
+
+conversion_manifest = None  # opened by get_manifest() on first incremental batch
+
+file_list = []
+file_index = {}  # path -> tree row id, for O(1) duplicate checks
+# Persistent metadata cache so known folders list instantly; fall back to
+# plain probing if the cache file cannot be opened
+try:
+    metadata_cache = MetadataCache()
+    image_probe = CachedImageProbe(metadata_cache)
+    image_scanner = MetadataScanner(image_probe)
+except Exception as e:
+    print(f"Metadata cache unavailable: {e}")
+    metadata_cache = image_probe = None
+    image_scanner = MetadataScanner(probe_image)
+image_pump = {"scheduled": False}
+# Thumbnails for the preview pane, kept in a bounded in-memory LRU and
+# persisted in the metadata cache
+thumbnail_loader = ThumbnailLoader(metadata_cache)
+on_preview_mode()
+
+# ============================ Video Tab ============================
+video_tab = tk.Frame(notebook)
+notebook.add(video_tab, text="Videos")
+
+vlabel = tk.Label(video_tab, text="Drag & Drop Video Files Below or Use Browse Button")
+vlabel.pack(pady=10)
+
+vframe = tk.Frame(video_tab)
+vframe.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+v_columns = ("name", "size", "duration", "resolution", "codecs", "bitrate", "estimate", "status")
+video_tree = ttk.Treeview(vframe, columns=v_columns, show="headings", selectmode="extended")
+video_tree.heading("name", text="File")
+video_tree.heading("size", text="Size")
+video_tree.heading("duration", text="Duration")
+video_tree.heading("resolution", text="Resolution")
+video_tree.heading("codecs", text="Codecs")
+video_tree.heading("bitrate", text="Bitrate")
+video_tree.heading("estimate", text="Est. Time")
+video_tree.heading("status", text="Status")
+video_tree.column("name", anchor="w", width=220, stretch=True)
+video_tree.column("size", anchor="e", width=80, stretch=False)
+video_tree.column("duration", anchor="e", width=70, stretch=False)
+video_tree.column("resolution", anchor="center", width=90, stretch=False)
+video_tree.column("codecs", anchor="w", width=110, stretch=False)
+video_tree.column("bitrate", anchor="e", width=80, stretch=False)
+video_tree.column("estimate", anchor="e", width=75, stretch=False)
+video_tree.column("status", anchor="center", width=200, stretch=False)
+
+v_vsb = ttk.Scrollbar(vframe, orient="vertical", command=video_tree.yview)
+v_hsb = ttk.Scrollbar(vframe, orient="horizontal", command=video_tree.xview)
+video_tree.configure(yscrollcommand=v_vsb.set, xscrollcommand=v_hsb.set)
+v_hsb.pack(side=tk.BOTTOM, fill=tk.X)
+v_vsb.pack(side=tk.RIGHT, fill=tk.Y)
+video_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+def add_video_file(path: str):
+    if not path or path in video_index:
+        return
+    size_str = "?"
+    try:
+        b = os.path.getsize(path)
+        size_str = fmt_size(b)
+    except Exception:
+        pass
+    video_file_list.append(path)
+    video_index[path] = video_tree.insert("", tk.END, values=(os.path.basename(path), size_str) + ("...",) * 5 + ("",))
+    # ffprobe runs on the bounded probe pool; pump_video_metadata fills the row
+    video_scanner.submit([path])
+    if not video_pump["scheduled"]:
+        video_pump["scheduled"] = True
+        root.after(100, pump_video_metadata)
+
+
+def fmt_bitrate(bits_per_sec) -> str:
+    if bits_per_sec >= 1_000_000:
+        return f"{bits_per_sec / 1_000_000:.1f} Mb/s"
+    return f"{bits_per_sec / 1000:.0f} kb/s"
+
+
+def video_estimate_options():
+    """The conversion settings estimates are priced for; unparsable resize
+    fields count as no resize."""
+    def dim(var):
+        try:
+            return int(var.get()) if var.get() else None
+        except ValueError:
+            return None
+    return {
+        "output_format": video_format_var.get().lower(),
+        "width": dim(vwidth_var),
+        "height": dim(vheight_var),
+        "remux": vremux_var.get(),
+        "chunked": vchunked_var.get(),
+    }
+
+
+def pump_video_metadata():
+    """Apply finished ffprobe results to their rows, rescheduling while any
+    are outstanding."""
+    video_pump["scheduled"] = False
+    probed = []
+    for path, info in video_scanner.drain(200):
+        iid = video_index.get(path)
+        if iid is None:
+            continue  # removed (converted) before its probe finished
+        try:
+            nbytes = os.path.getsize(path)
+        except OSError:
+            nbytes = None
+        video_info[path] = (info, nbytes)
+        duration = fmt_duration(info["duration"]) if info["duration"] else "?"
+        res = f"{info['width']} x {info['height']}" if info["width"] else "?"
+        codecs = " / ".join([info["video_codec"] or "?"] + info["audio_codecs"])
+        bit_rate = info["bit_rate"]
+        if not bit_rate and info["duration"] and nbytes:
+            bit_rate = nbytes * 8 / info["duration"]
+        video_tree.set(iid, "duration", duration)
+        video_tree.set(iid, "resolution", res)
+        video_tree.set(iid, "codecs", codecs)
+        video_tree.set(iid, "bitrate", fmt_bitrate(bit_rate) if bit_rate else "?")
+        probed.append(path)
+    if probed:
+        refresh_video_estimates(probed)
+    if video_scanner.pending:
+        video_pump["scheduled"] = True
+        root.after(100, pump_video_metadata)
+
+
+def refresh_video_estimates(rows=None):
+    """Recompute the batch total for the current settings from encode speeds
+    measured in earlier batches, and the Est. Time cells of rows (every
+    probed row when None)."""
+    options = video_estimate_options()
+    rows = video_file_list if rows is None else set(rows)
+    estimates = []
+    unknown = 0
+    for path in video_file_list:
+        if path not in video_info:
+            continue
+        info, nbytes = video_info[path]
+        est = encode_history.estimate(info, options, nbytes)
+        if path in rows:
+            video_tree.set(video_index[path], "estimate", f"~{fmt_duration(max(1, est[0]))}" if est else "?")
+        if est:
+            estimates.append(est)
+        else:
+            unknown += 1
+    if not estimates:
+        video_estimate_var.set("")
+        return
+    try:
+        max_jobs = int(vjobs_var.get())
+    except (ValueError, tk.TclError):
+        max_jobs = default_max_jobs()
+    samples = encode_history.rate(options["output_format"])[1]
+    basis = f"from {samples} measured encodes" if samples else "default speeds until a batch is measured"
+    notes = ""
+    if unknown:
+        notes += f", {unknown} without an estimate"
+    waiting = len(video_file_list) - len(estimates) - unknown
+    if waiting:
+        notes += f", {waiting} still being probed"
+    video_estimate_var.set(f"Estimated batch time: ~{fmt_duration(batch_seconds(estimates, max_jobs))}"
+                           f" for {len(estimates)} videos ({basis}){notes}")
+
+
+def browse_videos():
+    files = filedialog.askopenfilenames(
+        filetypes=[
+            ("Video Files", "*.mp4 *.mkv *.mov *.avi *.m4v *.webm *.hevc *.h265 *.ts *.m2ts"),
+            ("All files", "*.*"),
+        ]
+    )
+    for f in files:
+        add_video_file(f)
+
+def drop_videos(event):
+    files = root.tk.splitlist(event.data)
+    for f in files:
+        add_video_file(f)
+
+def move_selected_videos(offset: int):
+    """Reorder the selected rows; while a batch runs, queued jobs move too."""
+    path_of = {iid: p for p, iid in video_index.items()}
+    selected = [iid for iid in video_tree.get_children() if iid in video_tree.selection()]
+    if offset > 0:
+        selected.reverse()
+    for iid in selected:
+        path = path_of[iid]
+        i = video_file_list.index(path)
+        j = i + offset
+        if j < 0 or j >= len(video_file_list):
+            # Keep the selection's relative order at the edges
+            return
+        video_file_list.insert(j, video_file_list.pop(i))
+        video_tree.move(iid, "", j)
+        job = video_jobs.get(path)
+        if job is not None and video_batch["scheduler"] is not None:
+            video_batch["scheduler"].move(job, offset)
+
+video_tree.drop_target_register(DND_FILES)
+video_tree.dnd_bind("<<Drop>>", drop_videos)
+
+vbuttons = tk.Frame(video_tab)
+vbuttons.pack(pady=5)
+vbrowse_button = Button(vbuttons, text="Browse Files", command=browse_videos)
+vbrowse_button.pack(side=tk.LEFT, padx=3)
+Button(vbuttons, text="Move Up", command=lambda: move_selected_videos(-1)).pack(side=tk.LEFT, padx=3)
+Button(vbuttons, text="Move Down", command=lambda: move_selected_videos(1)).pack(side=tk.LEFT, padx=3)
+
+vcontrols = tk.LabelFrame(video_tab, text="Options")
+vcontrols.pack(pady=10, fill=tk.X, padx=10)
+
+# Output folder row (video)
+video_output_folder_path = StringVar()
+video_output_folder_path.set("Output: Same as source folder")
+
+def select_video_output_folder():
+    folder_selected = filedialog.askdirectory()
+    if folder_selected:
+        video_output_folder_path.set(folder_selected)
+
+tk.Label(vcontrols, text="Output Folder:").grid(row=0, column=0, sticky="w", padx=5, pady=5)
+video_output_folder_label = tk.Label(vcontrols, textvariable=video_output_folder_path, fg="grey", anchor="w")
+video_output_folder_label.grid(row=0, column=1, columnspan=3, sticky="we", padx=5, pady=5)
+select_video_folder_button = Button(vcontrols, text="Browse...", command=select_video_output_folder)
+select_video_folder_button.grid(row=0, column=4, sticky="e", padx=5, pady=5)
+
+# Format and quality (CRF) row
+tk.Label(vcontrols, text="Format:").grid(row=1, column=0, sticky="w", padx=5, pady=5)
+video_formats = ["MP4", "MKV", "MOV", "AVI", "M4V", "WEBM"]
+video_format_var = StringVar(root)
+video_format_var.set(video_formats[0])
+video_format_menu = OptionMenu(vcontrols, video_format_var, *video_formats)
+video_format_menu.grid(row=1, column=1, sticky="w", padx=5, pady=5)
+
+vquality_label = tk.Label(vcontrols, text="Quality (CRF):")
+vquality_label.grid(row=1, column=2, sticky="e", padx=5, pady=5)
+vquality_var = tk.IntVar(value=23)
+vquality_slider = tk.Scale(vcontrols, from_=0, to=51, orient=tk.HORIZONTAL, variable=vquality_var, length=180)
+vquality_slider.grid(row=1, column=3, columnspan=2, sticky="we", padx=5, pady=5)
+
+# Resize row (video)
+tk.Label(vcontrols, text="Resize:").grid(row=2, column=0, sticky="w", padx=5, pady=5)
+vwidth_var = StringVar()
+vheight_var = StringVar()
+tk.Label(vcontrols, text="W:").grid(row=2, column=1, sticky="w", padx=(5,0), pady=5)
+vwidth_entry = tk.Entry(vcontrols, textvariable=vwidth_var, width=6)
+vwidth_entry.grid(row=2, column=2, sticky="w", padx=(0,5), pady=5)
+tk.Label(vcontrols, text="H:").grid(row=2, column=3, sticky="w", padx=(5,0), pady=5)
+vheight_entry = tk.Entry(vcontrols, textvariable=vheight_var, width=6)
+vheight_entry.grid(row=2, column=4, sticky="w", padx=(0,5), pady=5)
+
+def on_v_aspect_toggle(*_):
+    if vaspect_ratio_var.get():
+        vheight_var.set("")
+        vheight_entry.config(state="disabled")
+    else:
+        vheight_entry.config(state="normal")
+
+vaspect_ratio_var = tk.BooleanVar(value=True)
+vaspect_ratio_check = tk.Checkbutton(vcontrols, text="Keep Aspect Ratio", variable=vaspect_ratio_var, command=on_v_aspect_toggle)
+vaspect_ratio_check.grid(row=3, column=0, columnspan=2, sticky="w", padx=5, pady=5)
+on_v_aspect_toggle()
+
+def convert_all_videos():
+    if not video_file_list:
+        messagebox.showwarning("No Files", "Please add some video files first.")
+        return
+
+    ff = find_ffmpeg()
+    fp = find_ffprobe()
+    if not ffmpeg_available(ff):
+        messagebox.showerror("FFmpeg Missing", "FFmpeg is not available. Please re-run the installer or ensure ffmpeg is in PATH.")
+        return
+
+    out_fmt = video_format_var.get().lower()  # container/ext
+    out_folder = video_output_folder_path.get()
+    if out_folder == "Output: Same as source folder":
+        out_folder = ""
+
+    # Parse resize and quality
+    try:
+        vw = int(vwidth_var.get()) if vwidth_var.get() else None
+        vh = int(vheight_var.get()) if vheight_var.get() else None
+    except ValueError:
+        messagebox.showerror("Invalid Input", "Width and height must be valid numbers.")
+        return
+    vkeep = vaspect_ratio_var.get()
+    vcrf = vquality_var.get()
+    options = {
+        "output_format": out_fmt,
+        "output_folder": out_folder,
+        "width": vw,
+        "height": vh,
+        "keep_aspect": vkeep,
+        "crf": vcrf,
+        "remux": vremux_var.get(),
+        "chunked": vchunked_var.get(),
+    }
+    manifest = get_manifest() if vincremental_var.get() else None
+    journal = open_journal("videos", "video", options)
+
+    # Conflict policy detection (once per batch)
+    planner = OutputPlanner()
+    replace_policy = 'keep'
+    conflicts_found = False
+    for f in video_file_list:
+        if manifest is not None and manifest.known(f, "video", options):
+            continue
+        if journal is not None and journal.prepare(f, options) is None:
+            continue
+        if planner.exists(output_path_for(f, out_folder, out_fmt)):
+            conflicts_found = True
+            break
+    if conflicts_found:
+        resp = messagebox.askyesno(
+            "File already exists",
+            "One or more output files already exist.\n\nYes = Replace originals (overwrite)\nNo = Keep originals (append unique identifier)",
+        )
+        replace_policy = 'replace' if resp else 'keep'
+    options["conflict"] = replace_policy
+
+    try:
+        max_jobs = int(vjobs_var.get())
+    except (ValueError, tk.TclError):
+        max_jobs = default_max_jobs()
+
+    paths = list(video_file_list)
+    # With a thread-enabled Tcl (the python.org builds) worker threads can post
+    # a virtual event and the UI only wakes up when there is something to draw
+    event_driven = bool(int(root.tk.call("info", "exists", "tcl_platform(threaded)")))
+    notify = (lambda: root.event_generate("<<VideoJobEvent>>", when="tail")) if event_driven else None
+    scheduler = VideoJobScheduler(max_jobs=max_jobs, ff=ff, fp=fp, notify=notify, timings=open_timings(),
+                                  history=encode_history)
+    src_stats = {}
+    skipped = 0
+    video_jobs.clear()
+    for f in paths:
+        job_options, src_stat = options, None
+        if manifest is not None:
+            job_options, src_stat = manifest.prepare(f, "video", options)
+        if job_options is not None and journal is not None:
+            job_options = journal.prepare(f, job_options)
+        if job_options is None:
+            skipped += 1
+            video_tree.set(video_index[f], "status", "up to date")
+            continue
+        src_stats[f] = src_stat
+        job_options = planner.plan_options(f, job_options)
+        if journal is not None:
+            journal.begin(f, job_options["output_path"])
+        video_jobs[f] = scheduler.add(f, job_options)
+        video_tree.set(video_index[f], "status", "queued")
+
+    video_batch["scheduler"] = scheduler
+    vconvert_button.config(state="disabled")
+    video_progress.config(maximum=max(1, len(paths)), value=skipped)
+
+    def drain(event=None):
+        # Apply everything the scheduler reported since the last wake-up
+        finished = False
+        updated = set()
+        try:
+            while True:
+                kind, job = scheduler.events.get_nowait()
+                if kind == "started":
+                    video_tree.set(video_index[job.path], "status", f"running ({job.threads}t)")
+                elif kind == "plan":
+                    updated.add(job)
+                elif kind == "progress":
+                    # Several blocks may arrive per tick; only the latest is drawn
+                    updated.add(job)
+                elif kind == "finished":
+                    updated.discard(job)
+                    status = "done" if job.result else "failed"
+                    if job.method:
+                        status += f" ({job.method})"
+                    video_tree.set(video_index[job.path], "status", status)
+                    video_progress.step(1)
+                    if job.result and manifest is not None:
+                        manifest.record(job.path, "video", options, job.result, src_stats[job.path])
+                        manifest.flush()
+                    if journal is not None:
+                        journal.finish(job.path, job.result)
+                elif kind == "done":
+                    finished = True
+        except queue.Empty:
+            pass
+        for job in updated:
+            video_tree.set(video_index[job.path], "status", fmt_video_progress(job))
+        st = scheduler.stats()
+        video_status_var.set(
+            f"Running {st['running']}, queued {st['queued']}, done {st['done'] + skipped} of {len(paths)}"
+            f" - {st['fps']:.1f} fps, {fmt_size(st['bytes_per_sec'])}/s"
+        )
+        if finished:
+            if event_driven:
+                root.unbind("<<VideoJobEvent>>")
+            if journal is not None:
+                journal.close()
+            finish_video_batch(paths, scheduler, skipped)
+        elif not event_driven:
+            root.after(200, drain)
+
+    if event_driven:
+        root.bind("<<VideoJobEvent>>", drain)
+    else:
+        root.after(200, drain)
+    scheduler.start()
+
+
+def finish_video_batch(paths, scheduler, skipped):
+    video_batch["scheduler"] = None
+    report_timings(scheduler.timings)
+    encode_history.save()
+    vconvert_button.config(state="normal")
+    video_status_var.set("")
+    video_progress.config(value=0)
+    failed = [os.path.basename(j.path) for j in scheduler.jobs if not j.result]
+    success = len(paths) - len(failed)
+    remuxed = sum(1 for j in scheduler.jobs if j.result and j.method == "remux")
+    notes = skipped_note(skipped)
+    if remuxed:
+        notes += f"\n\n{remuxed} remuxed without re-encoding."
+    if not failed:
+        messagebox.showinfo("Done", f"Successfully converted {success} of {len(paths)} videos to {video_format_var.get()}." + notes)
+    else:
+        messagebox.showwarning("Completed with Errors", f"Converted {success} of {len(paths)} videos." + notes + "\n\nFailed:\n" + "\n".join(failed))
+
+    # Only clear the batch; files dropped while it ran stay queued
+    for f in paths:
+        video_tree.delete(video_index.pop(f))
+        video_file_list.remove(f)
+        video_info.pop(f, None)
+    video_jobs.clear()
+    refresh_video_estimates()
+
+# Skip videos whose output is already up to date for these settings
+vincremental_var = tk.BooleanVar(value=False)
+vincremental_check = tk.Checkbutton(vcontrols, text="Skip Up-to-date", variable=vincremental_var)
+vincremental_check.grid(row=3, column=2, columnspan=2, sticky="w", padx=5, pady=5)
+
+vconvert_button = Button(vcontrols, text="Convert", command=convert_all_videos)
+vconvert_button.grid(row=3, column=4, sticky="e", padx=5, pady=5)
+
+# Concurrent ffmpeg processes; each gets a -threads share sized by resolution
+tk.Label(vcontrols, text="Parallel Jobs:").grid(row=4, column=0, sticky="w", padx=5, pady=5)
+vjobs_var = tk.IntVar(value=default_max_jobs())
+vjobs_spin = tk.Spinbox(vcontrols, from_=1, to=max(16, default_max_jobs()), textvariable=vjobs_var, width=5)
+vjobs_spin.grid(row=4, column=1, sticky="w", padx=5, pady=5)
+
+# Stream-copy (no CRF/re-encode) when codecs already fit the target container
+vremux_var = tk.BooleanVar(value=False)
+vremux_check = tk.Checkbutton(vcontrols, text="Remux When Possible", variable=vremux_var)
+vremux_check.grid(row=4, column=2, columnspan=2, sticky="w", padx=5, pady=5)
+
+# Long videos: encode keyframe-aligned pieces in parallel, then join them
+vchunked_var = tk.BooleanVar(value=False)
+vchunked_check = tk.Checkbutton(vcontrols, text="Split Long Videos", variable=vchunked_var)
+vchunked_check.grid(row=5, column=0, columnspan=2, sticky="w", padx=5, pady=5)
+
+vcontrols.columnconfigure(1, weight=1)
+vcontrols.columnconfigure(3, weight=1)
+vcontrols.columnconfigure(4, weight=0)
+
+# Estimates follow the settings they are priced for
+for _var in (video_format_var, vwidth_var, vheight_var, vremux_var, vchunked_var, vjobs_var):
+    _var.trace_add("write", lambda *_: refresh_video_estimates())
+
+# Estimated total for the queued videos (see refresh_video_estimates)
+video_estimate_var = StringVar()
+tk.Label(video_tab, textvariable=video_estimate_var, anchor="w").pack(fill=tk.X, padx=10)
+
+# Batch progress and aggregate throughput (fed from the job scheduler)
+video_status_var = StringVar()
+video_progress = ttk.Progressbar(video_tab, mode="determinate")
+video_progress.pack(fill=tk.X, padx=10)
+tk.Label(video_tab, textvariable=video_status_var, fg="grey", anchor="w").pack(fill=tk.X, padx=10, pady=(0, 5))
+
+video_file_list = []
+video_index = {}  # path -> tree row id
+video_jobs = {}  # path -> VideoJob for the running batch
+video_batch = {"scheduler": None}
+video_info = {}  # path -> (probe_video() summary, file size)
+video_pump = {"scheduled": False}
+# ffprobe for new rows on a few threads; probe_video caches the result, so the
+# batch later reuses it instead of probing again
+VIDEO_PROBE_WORKERS = 4
+video_scanner = MetadataScanner(lambda path: (probe_video(path, find_ffprobe()),),
+                                max_workers=min(VIDEO_PROBE_WORKERS, os.cpu_count() or 1))
+encode_history = EncodeSpeedHistory()
+
+
+def main():
+    root.mainloop()
+    image_scanner.shutdown()
+    thumbnail_loader.shutdown()
+    video_scanner.shutdown()
+    if metadata_cache is not None:
+        metadata_cache.close()
+    if conversion_manifest is not None:
+        conversion_manifest.close()
@@ -0,0 +1,455 @@
+import io
+import os
+from PIL import ExifTags, Image
+import pillow_heif
+
+from .paths import commit_output, discard_output, output_path_for, temp_path_for
+from .quality import SEARCHABLE_FORMATS, encoder_options, search_quality
+from .timing import NULL_TIMER
+
+# Enable HEIC support in Pillow
+pillow_heif.register_heif_opener()
+
+# Resampling tiers selectable from the GUI/CLI: filter and the reducing_gap
+# used when the fast downscale path is active (smaller gap = faster, coarser)
+RESAMPLE_TIERS = {
+    "fast": (Image.Resampling.BILINEAR, 2.0),
+    "balanced": (Image.Resampling.BICUBIC, 2.5),
+    "quality": (Image.Resampling.LANCZOS, 3.0),
+}
+# An embedded preview is only used if its aspect ratio matches the image
+# (EXIF thumbnails are often letterboxed to 4:3)
+PREVIEW_ASPECT_TOLERANCE = 0.01
+# EXIF IFD1 tags locating the embedded JPEG thumbnail
+_EXIF_THUMB_OFFSET = 0x0201
+_EXIF_THUMB_LENGTH = 0x0202
+# Fast downscale only engages when the source is at least this many times
+# larger than the target on both axes
+FAST_DOWNSCALE_MIN_RATIO = 2.0
+
+
+def _same_aspect(size, ref):
+    return abs(size[0] * ref[1] - size[1] * ref[0]) <= PREVIEW_ASPECT_TOLERANCE * size[1] * ref[0]
+
+
+def _embedded_preview(image, size):
+    """Return a cheaper-to-decode embedded preview of image that is at least
+    size in both dimensions and has the same aspect ratio, or None.
+
+    HEIC: thumbnails chosen by pillow-heif's draft(). JPEG: MPF large
+    thumbnails (camera JPEGs) and the EXIF IFD1 thumbnail.
+    """
+    want_w, want_h = size
+    if image.format == "HEIF":
+        # pillow-heif picks the smallest matching thumbnail; no-op on older versions
+        try:
+            return image if image.draft(image.mode, size) is not None else None
+        except Exception:
+            return None
+    if image.format not in ("JPEG", "MPO"):
+        return None
+
+    candidates = []
+    mpinfo = getattr(image, "mpinfo", None) or {}
+    for index, entry in enumerate(mpinfo.get(0xB002, [])):
+        if index and str(entry.get("Attribute", {}).get("MPType", "")).startswith("Large Thumbnail"):
+            candidates.append(("mpf", index))
+    if image.info.get("exif"):
+        candidates.append(("exif", None))
+
+    best = None
+    for kind, index in candidates:
+        try:
+            if kind == "mpf":
+                image.seek(index)
+                preview, preview_size = None, image.size
+                image.seek(0)
+            else:
+                ifd1 = image.getexif().get_ifd(ExifTags.IFD.IFD1)
+                offset, length = ifd1.get(_EXIF_THUMB_OFFSET), ifd1.get(_EXIF_THUMB_LENGTH)
+                if not offset or not length:
+                    continue
+                # Offsets are relative to the TIFF header, just after "Exif\0\0"
+                data = image.info["exif"][6 + offset:6 + offset + length]
+                preview = Image.open(io.BytesIO(data))
+                preview_size = preview.size
+        except Exception:
+            continue
+        if preview_size[0] < want_w or preview_size[1] < want_h or not _same_aspect(preview_size, image.size):
+            continue
+        if best is None or preview_size[0] * preview_size[1] < best[0][0] * best[0][1]:
+            best = (preview_size, kind, index, preview)
+
+    if best is None:
+        return None
+    _, kind, index, preview = best
+    if kind == "mpf":
+        image.seek(index)
+        return image
+    return preview
+
+
+def target_size(size, width=None, height=None, keep_aspect=True):
+    """Output (width, height) for an image of the given size. With
+    keep_aspect, a single given dimension scales the other one."""
+    original_width, original_height = size
+    if keep_aspect:
+        if width and not height:
+            ratio = width / float(original_width)
+            height = int(original_height * ratio)
+        elif height and not width:
+            ratio = height / float(original_height)
+            width = int(original_width * ratio)
+    # Missing dimensions keep the original size
+    return (width if width else original_width), (height if height else original_height)
+
+
+def _encoder(jpeg_optimize=False, jpeg_progressive=False, jpeg_subsampling=None, webp_method=None):
+    return {"optimize": jpeg_optimize, "progressive": jpeg_progressive,
+            "subsampling": jpeg_subsampling, "webp_method": webp_method}
+
+
+def _search(image, output_format, quality, target_bytes, target_similarity, encoder, timer):
+    """Encoded bytes at the best quality (at most quality) for the size or
+    similarity target; the search is recorded on timer."""
+    data, info = search_quality(image, output_format, target_bytes, target_similarity, max_quality=quality,
+                                timer=timer, **encoder)
+    timer.set(quality=info["quality"], encode_attempts=info["attempts"], target_met=info["met"],
+              similarity=info.get("similarity"), target_missed=info["missed"] or None)
+    if "size" in info["missed"]:
+        print(f"Warning: {info['size']} bytes at quality {info['quality']} is over the {target_bytes} byte target")
+    if "similarity" in info["missed"]:
+        print(f"Warning: similarity {info['similarity']} at quality {info['quality']} is under the"
+              f" {target_similarity} target")
+    return data
+
+
+def _save(image, path, output_format, quality, timer=NULL_TIMER, encoder=None, data=None, exclusive=False):
+    """Encode image to path, or write data (already encoded) when given.
+    Returns the path written; with exclusive an existing file is kept and
+    the first free " (n)" name is used (see paths.commit_output)."""
+    ofmt = output_format.upper()
+    # Written under a temporary name and renamed into place, so a crash
+    # never leaves a truncated file under the final name
+    tmp = temp_path_for(path)
+    try:
+        if data is None and timer.enabled:
+            # Encode to memory first so encode and disk write are timed apart
+            buf = io.BytesIO()
+            with timer.stage("encode"):
+                image.save(buf, ofmt, **encoder_options(output_format, quality, **(encoder or {})))
+            data = buf.getbuffer()
+        if data is not None:
+            with timer.stage("write"):
+                with open(tmp, "wb") as fh:
+                    fh.write(data)
+                path = commit_output(tmp, path, exclusive)
+            if timer.enabled:
+                timer.set(out_bytes=(timer.record.get("out_bytes") or 0) + len(data))
+        else:
+            image.save(tmp, ofmt, **encoder_options(output_format, quality, **(encoder or {})))
+            path = commit_output(tmp, path, exclusive)
+    finally:
+        discard_output(tmp)
+    return path
+
+
+def _prepare(image, output_format, width, height, keep_aspect, resample, fast_downscale, full_decode, timer):
+    """Decode, resize and mode-convert an opened image for output_format;
+    the steps shared by convert_image() and convert_image_bytes()."""
+    # --- Resize Logic ---
+    if width or height:
+        original_width, original_height = image.size
+        final_width, final_height = target_size(image.size, width, height, keep_aspect)
+
+        # Small outputs: decode an embedded thumbnail/preview instead, unless
+        # the caller needs the full-resolution pixels
+        if not full_decode and final_width <= original_width and final_height <= original_height:
+            with timer.stage("preview"):
+                preview = _embedded_preview(image, (final_width, final_height))
+            if preview is not None:
+                image = preview
+
+        resample_filter, reducing_gap = RESAMPLE_TIERS.get(resample, RESAMPLE_TIERS['quality'])
+        source_width, source_height = image.size
+        if fast_downscale and (source_width >= final_width * FAST_DOWNSCALE_MIN_RATIO
+                               and source_height >= final_height * FAST_DOWNSCALE_MIN_RATIO):
+            # JPEG: let libjpeg decode at 1/2, 1/4 or 1/8 scale (never below the target)
+            image.draft(image.mode, (final_width, final_height))
+            with timer.stage("decode"):
+                image.load()
+            # Integer-factor reduce() first, then the real filter over the last few x
+            with timer.stage("resize"):
+                image = image.resize((final_width, final_height), resample_filter, reducing_gap=reducing_gap)
+        else:
+            with timer.stage("decode"):
+                image.load()
+            with timer.stage("resize"):
+                image = image.resize((final_width, final_height), resample_filter)
+    else:
+        with timer.stage("decode"):
+            image.load()
+
+    # Handle transparency and other modes for formats that don't support them (like JPEG)
+    if output_format.upper() == 'JPEG' and image.mode != 'RGB':
+        with timer.stage("convert"):
+            image = image.convert('RGB')
+    return image
+
+
+def convert_image(input_path, output_format, output_folder, width=None, height=None, keep_aspect=True, jpeg_quality=95, conflict='keep',
+                  resample='quality', fast_downscale=False, full_decode=False, output_path=None,
+                  target_bytes=None, target_similarity=None, jpeg_optimize=False, jpeg_progressive=False,
+                  jpeg_subsampling=None, webp_method=None, timer=NULL_TIMER):
+    """Convert one image. Returns the path written on success (truthy) or
+    False on failure. output_path, if given, is written as-is (overwriting)
+    instead of being derived from the source name and conflict policy.
+    For JPEG/WEBP, target_bytes or target_similarity search for the quality
+    (at most jpeg_quality) that meets them; see quality.search_quality().
+    jpeg_optimize/jpeg_progressive/jpeg_subsampling ("4:4:4", "4:2:2",
+    "4:2:0") and webp_method (0-6) are passed to the encoder.
+    timer (a timing.FileTimer) records per-stage times and sizes."""
+    exclusive = False
+    try:
+        with timer.stage("open"):
+            image = Image.open(input_path)
+        if timer.enabled:
+            timer.set(in_bytes=os.path.getsize(input_path), in_pixels=image.width * image.height, in_format=image.format)
+
+        image = _prepare(image, output_format, width, height, keep_aspect, resample, fast_downscale, full_decode, timer)
+
+        if not output_path:
+            output_path = output_path_for(input_path, output_folder, output_format.lower())
+
+            # Handle existing file conflicts: 'keep' takes the first free
+            # " (n)" name when the output is committed, 'replace' overwrites
+            exclusive = conflict == 'keep'
+
+        # --- Save Logic ---
+        encoder = _encoder(jpeg_optimize, jpeg_progressive, jpeg_subsampling, webp_method)
+        data = None
+        if (target_bytes or target_similarity) and output_format.upper() in SEARCHABLE_FORMATS:
+            data = _search(image, output_format, jpeg_quality, target_bytes, target_similarity, encoder, timer)
+        output_path = _save(image, output_path, output_format, jpeg_quality, timer, encoder, data, exclusive)
+        if timer.enabled:
+            timer.set(out_pixels=image.width * image.height)
+        return output_path
+    except Exception as e:
+        print(f"Failed to convert {input_path}: {e}")
+        timer.set(error=f"{type(e).__name__}: {e}")
+        return False
+
+
+class _BufferReader(io.RawIOBase):
+    """Read-only, seekable file over a memoryview. Unlike io.BytesIO it does
+    not copy the whole buffer up front; decoders pull chunks via readinto()."""
+
+    def __init__(self, view):
+        self._view = view
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        n = min(len(b), len(self._view) - self._pos)
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+
+class _BufferWriter(io.RawIOBase):
+    """Seekable file writing straight into a caller's writable buffer;
+    raises BufferError instead of growing when it runs out of room."""
+
+    def __init__(self, view):
+        self._view = view
+        self._pos = 0
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def write(self, b):
+        b = memoryview(b).cast("B")
+        end = self._pos + len(b)
+        if end > len(self._view):
+            raise BufferError(f"output buffer too small ({len(self._view)} bytes)")
+        self._view[self._pos:end] = b
+        self._pos = end
+        self.size = max(self.size, end)
+        return len(b)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self.size}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+
+def _input_file(data):
+    if isinstance(data, bytes):
+        return io.BytesIO(data)  # shares the bytes object, no copy
+    if hasattr(data, "read"):
+        return data
+    return _BufferReader(memoryview(data).cast("B"))
+
+
+def convert_image_bytes(data, output_format, width=None, height=None, keep_aspect=True, jpeg_quality=95,
+                        resample='quality', fast_downscale=False, full_decode=False, out=None,
+                        target_bytes=None, target_similarity=None, jpeg_optimize=False, jpeg_progressive=False,
+                        jpeg_subsampling=None, webp_method=None, timer=NULL_TIMER):
+    """convert_image() without the filesystem: data is the encoded source as
+    bytes, a bytes-like object (bytearray, memoryview, mmap) or a readable
+    file object. Returns the encoded output as bytes, or, when out is given,
+    writes into it and returns the byte count: out may be a writable file
+    object or a writable buffer (bytearray, memoryview, mmap) that the
+    encoder fills in place. Returns False on failure, including an out
+    buffer that is too small.
+
+    Bytes-like sources are read through a view rather than copied; HEIC
+    sources are still read whole, since pillow-heif decodes from one buffer.
+    """
+    try:
+        fp = _input_file(data)
+        with timer.stage("open"):
+            image = Image.open(fp)
+        if timer.enabled:
+            in_bytes = len(data) if not hasattr(data, "read") else None
+            timer.set(in_bytes=in_bytes, in_pixels=image.width * image.height, in_format=image.format)
+        image = _prepare(image, output_format, width, height, keep_aspect, resample, fast_downscale, full_decode, timer)
+        encoder = _encoder(jpeg_optimize, jpeg_progressive, jpeg_subsampling, webp_method)
+        encoded = None
+        if (target_bytes or target_similarity) and output_format.upper() in SEARCHABLE_FORMATS:
+            encoded = _search(image, output_format, jpeg_quality, target_bytes, target_similarity, encoder, timer)
+            if out is None:
+                if timer.enabled:
+                    timer.set(out_bytes=len(encoded), out_pixels=image.width * image.height)
+                return encoded
+        if out is None:
+            target = io.BytesIO()
+        elif hasattr(out, "write"):
+            target = out
+        else:
+            target = _BufferWriter(memoryview(out).cast("B"))
+        seekable = getattr(target, "seekable", lambda: False)()
+        start = target.tell() if seekable else None
+        if encoded is not None:
+            with timer.stage("write"):
+                target.write(encoded)
+        else:
+            with timer.stage("encode"):
+                image.save(target, output_format.upper(), **encoder_options(output_format, jpeg_quality, **encoder))
+        if isinstance(target, _BufferWriter):
+            size = target.size
+        else:
+            # A non-seekable file object can't report how much was written
+            size = target.tell() - start if seekable else None
+        if timer.enabled:
+            timer.set(out_bytes=size, out_pixels=image.width * image.height)
+        return target.getvalue() if out is None else size
+    except Exception as e:
+        print(f"Failed to convert in-memory image: {e}")
+        timer.set(error=f"{type(e).__name__}: {e}")
+        return False
+
+
+def convert_images_bytes(items, output_format, max_workers=None, **options):
+    """convert_image_bytes() over a list of sources, returning the results in
+    the same order. Runs on threads, not processes: Pillow releases the GIL
+    while decoding, resizing and encoding, and the buffers are shared with
+    the workers instead of being pickled into them. Each item is either a
+    source or a (source, out) pair to encode into a caller buffer."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    def one(item):
+        source, out = item if isinstance(item, tuple) else (item, None)
+        return convert_image_bytes(source, output_format, out=out, **options)
+
+    items = list(items)
+    if len(items) <= 1:
+        return [one(item) for item in items]
+    with ThreadPoolExecutor(max_workers=max_workers or min(len(items), os.cpu_count() or 1)) as pool:
+        return list(pool.map(one, items))
+
+
+def rendition_path(input_path, output_folder, size, output_format):
+    """Predictable rendition name: <stem>_<size>.<ext> in the output folder
+    (or beside the source)."""
+    root, ext = os.path.splitext(output_path_for(input_path, output_folder, output_format.lower()))
+    return f"{root}_{size}{ext}"
+
+
+def convert_renditions(input_path, targets, output_folder, conflict='keep', resample='quality',
+                       fast_downscale=False, timer=NULL_TIMER):
+    """Write several renditions of one image from a single decode.
+
+    targets is a list of (size, format, quality) where size is the longest
+    edge in pixels; sources smaller than a size are not upscaled. Sizes are
+    produced largest first, each resized from the previous one, and every
+    format of a size is encoded from the same pixels. Outputs are named by
+    rendition_path() and follow the conflict policy like convert_image().
+    Returns the list of paths written, or False if the source can't be read
+    or any rendition fails (already written renditions are kept).
+    """
+    resample_filter, reducing_gap = RESAMPLE_TIERS.get(resample, RESAMPLE_TIERS['quality'])
+    written = []
+    try:
+        with timer.stage("open"):
+            image = Image.open(input_path)
+        if timer.enabled:
+            timer.set(in_bytes=os.path.getsize(input_path), in_pixels=image.width * image.height, in_format=image.format)
+        by_size = {}
+        for size, fmt, quality in targets:
+            by_size.setdefault(size, []).append((fmt, quality))
+        sizes = sorted(by_size, reverse=True)
+
+        longest = max(image.size)
+        if fast_downscale and longest >= sizes[0] * FAST_DOWNSCALE_MIN_RATIO:
+            # One reduced-scale decode still covers the largest rendition
+            scale = sizes[0] / float(longest)
+            image.draft(image.mode, (max(1, int(image.width * scale)), max(1, int(image.height * scale))))
+        with timer.stage("decode"):
+            image.load()
+
+        current = image
+        for size in sizes:
+            scale = min(1.0, size / float(max(current.size)))
+            if scale < 1.0:
+                new_size = (max(1, round(current.width * scale)), max(1, round(current.height * scale)))
+                with timer.stage("resize"):
+                    current = current.resize(new_size, resample_filter,
+                                             reducing_gap=reducing_gap if fast_downscale else None)
+            rgb = None
+            for fmt, quality in by_size[size]:
+                out = current
+                if fmt == 'JPEG' and current.mode != 'RGB':
+                    if rgb is None:
+                        with timer.stage("convert"):
+                            rgb = current.convert('RGB')
+                    out = rgb
+                path = rendition_path(input_path, output_folder, size, fmt)
+                written.append(_save(out, path, fmt, quality, timer, exclusive=conflict == 'keep'))
+        if timer.enabled:
+            timer.set(renditions=len(written))
+        return written
+    except Exception as e:
+        print(f"Failed to convert {input_path}: {e}")
+        timer.set(error=f"{type(e).__name__}: {e}")
+        return False
@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+import time
+
+from .cache import default_cache_path
+from .manifest import options_key
+from .paths import remove_partial_outputs
+
+
+def default_journal_path(name: str) -> str:
+    """Journal file for one kind of batch ("images", "videos"), stored beside
+    the metadata cache."""
+    return os.path.join(os.path.dirname(default_cache_path()), f"journal-{name}.jsonl")
+
+
+class BatchJournal:
+    """Append-only JSON-lines log of a batch, used to resume it after a crash.
+
+    The first line names the batch kind and a digest of its settings. Each
+    source gets a "begin" line with its planned output when it is handed to
+    a worker, and a "done" or "failed" line when it finishes; close() adds
+    an "end" line. Opening a journal that has no "end" line, with the same
+    kind and settings, resumes it: sources that finished (and whose outputs
+    still exist) are skipped by prepare(), unfinished ones are pointed back
+    at their planned output, and temp files and chunk folders they left
+    behind are deleted. Anything else starts a new journal.
+
+    Lines are flushed as they are written but only fsynced on close; a
+    "done" line lost in a power cut just means that file is converted again
+    into the same output.
+    """
+
+    def __init__(self, path, kind, options):
+        self.path = path
+        self.kind = kind
+        self._key = options_key(kind, options)
+        self._lock = threading.Lock()
+        self.completed = {}  # source -> output(s) from the interrupted run
+        self.unfinished = {}  # source -> planned output from the interrupted run
+        self.cleaned = 0
+        self._torn = False
+        self.resumed = self._load()
+        if self.resumed:
+            for output in self.unfinished.values():
+                if output:
+                    self.cleaned += remove_partial_outputs(output)
+            self._fh = open(path, "a", encoding="utf-8")
+            if self._torn:
+                self._fh.write("\n")  # end the line cut off by the crash
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._fh = open(path, "w", encoding="utf-8")
+            self._write({"batch": kind, "options": self._key, "started": time.time()})
+
+    def _load(self) -> bool:
+        """Read an interrupted journal for the same batch; True if there is one."""
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                text = fh.read()
+        except OSError:
+            return False
+        lines = text.splitlines()
+        entries = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue  # last line cut off mid-write
+        if not entries or entries[0].get("batch") != self.kind or entries[0].get("options") != self._key:
+            return False
+        completed, unfinished = {}, {}
+        for e in entries[1:]:
+            if "end" in e:
+                return False
+            if "begin" in e:
+                unfinished[e["begin"]] = e.get("output")
+            elif "done" in e:
+                unfinished.pop(e["done"], None)
+                completed[e["done"]] = e.get("output")
+            elif "failed" in e:
+                unfinished.pop(e["failed"], None)
+        self.completed, self.unfinished = completed, unfinished
+        self._torn = bool(lines) and not text.endswith("\n")
+        return True
+
+    def _write(self, entry):
+        self._fh.write(json.dumps(entry) + "\n")
+        self._fh.flush()
+
+    def prepare(self, source, options):
+        """Options for source in a resumed batch, or None if it already
+        finished. An unfinished source is re-encoded into its planned output."""
+        key = os.path.abspath(source)
+        done = self.completed.get(key)
+        if done:
+            outputs = done if isinstance(done, list) else [done]
+            if all(os.path.exists(o) for o in outputs):
+                return None
+        planned = self.unfinished.get(key)
+        if planned and not options.get("output_path"):
+            options = dict(options, output_path=planned)
+        return options
+
+    def begin(self, source, output=None):
+        with self._lock:
+            self._write({"begin": os.path.abspath(source), "output": output})
+
+    def finish(self, source, result):
+        """Record the outcome: result is the output path(s), or False."""
+        key = os.path.abspath(source)
+        with self._lock:
+            self._write({"done": key, "output": result} if result else {"failed": key})
+
+    def close(self, complete=True):
+        """Close the journal; complete=False leaves it resumable."""
+        with self._lock:
+            if self._fh is None:
+                return
+            if complete:
+                self._write({"end": time.time()})
+            os.fsync(self._fh.fileno())
+            self._fh.close()
+            self._fh = None
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+from .cache import default_cache_path
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outputs (
+    source      TEXT NOT NULL,
+    options     TEXT NOT NULL,
+    src_size    INTEGER NOT NULL,
+    src_mtime   INTEGER NOT NULL,
+    output      TEXT NOT NULL,
+    out_size    INTEGER NOT NULL,
+    out_mtime   INTEGER NOT NULL,
+    PRIMARY KEY (source, options)
+);
+"""
+
+# Options that choose how an existing file is handled, not what gets written
+_IGNORED_OPTIONS = ("conflict", "output_path")
+
+NEW = "new"
+STALE = "stale"
+CURRENT = "current"
+
+
+def default_manifest_path() -> str:
+    """Stored beside the metadata cache; MEDIA_CONVERTER_MANIFEST overrides it."""
+    env = os.environ.get("MEDIA_CONVERTER_MANIFEST")
+    if env:
+        return env
+    return os.path.join(os.path.dirname(default_cache_path()), "manifest.sqlite3")
+
+
+def options_key(kind: str, options: dict) -> str:
+    """Stable digest of the conversion settings that affect the output bytes."""
+    relevant = {k: v for k, v in options.items() if k not in _IGNORED_OPTIONS}
+    blob = json.dumps([kind, relevant], sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+class ConversionManifest:
+    """Record of (source fingerprint, conversion options) -> output file, used
+    by incremental batches to skip sources whose output is already up to date.
+
+    The fingerprint is the source's size and mtime; an output only counts as
+    current while it still exists with the size and mtime it had when it was
+    written.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_manifest_path()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        if self.path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def _row(self, source, key):
+        with self._lock:
+            return self._db.execute(
+                "SELECT src_size, src_mtime, output, out_size, out_mtime FROM outputs WHERE source = ? AND options = ?",
+                (os.path.abspath(source), key),
+            ).fetchone()
+
+    def known(self, source, kind, options) -> bool:
+        """True if source was converted before with these options (no stat calls)."""
+        return self._row(source, options_key(kind, options)) is not None
+
+    def check(self, source, kind, options):
+        """Return (status, output_path) where status is NEW, STALE or CURRENT.
+
+        STALE means the source or the recorded output changed since it was
+        written; output_path is then the file to re-encode into.
+        """
+        row = self._row(source, options_key(kind, options))
+        if row is None:
+            return NEW, None
+        src_size, src_mtime, output, out_size, out_mtime = row
+        try:
+            st = os.stat(source)
+            ost = os.stat(output)
+        except OSError:
+            return STALE, output
+        if (st.st_size, st.st_mtime_ns) == (src_size, src_mtime) and (ost.st_size, ost.st_mtime_ns) == (out_size, out_mtime):
+            return CURRENT, output
+        return STALE, output
+
+    def prepare(self, source, kind, options):
+        """Plan one source of an incremental batch. Returns (None, None) if its
+        output is current and it can be skipped, otherwise (options, src_stat)
+        where options point a stale source back at its previous output."""
+        status, previous = self.check(source, kind, options)
+        if status == CURRENT:
+            return None, None
+        try:
+            st = os.stat(source)
+        except OSError:
+            st = None
+        if status == STALE:
+            options = dict(options, output_path=previous)
+        return options, st
+
+    def record(self, source, kind, options, output, src_stat=None):
+        """Remember that output was produced from source with options.
+        Pass src_stat from before the conversion started so a source that
+        changes mid-encode is picked up next time."""
+        try:
+            st = src_stat or os.stat(source)
+            ost = os.stat(output)
+        except OSError:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO outputs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (os.path.abspath(source), options_key(kind, options), st.st_size, st.st_mtime_ns,
+                 os.path.abspath(output), ost.st_size, ost.st_mtime_ns),
+            )
+
+    def flush(self):
+        with self._lock:
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.commit()
+            self._db.close()
@@ -0,0 +1,101 @@
+import ctypes
+import os
+import sys
+
+# Bytes per pixel of Pillow's in-memory image for each mode (3-band modes are
+# stored padded to 4 bytes); unknown modes are assumed to need 4 per band
+MODE_BYTES_PER_PIXEL = {
+    "1": 1, "L": 1, "P": 1,
+    "I;16": 2, "I;16L": 2, "I;16B": 2, "I;16N": 2,
+    "I": 4, "F": 4,
+    "LA": 4, "La": 4, "PA": 4, "RGB": 4, "RGBA": 4, "RGBa": 4, "RGBX": 4,
+    "CMYK": 4, "YCbCr": 4, "LAB": 4, "HSV": 4,
+}
+# Decoder/encoder state, Python objects and I/O buffers on top of the pixels
+JOB_OVERHEAD = 32 * 1024 * 1024
+# Share of physical RAM conversions may use by default
+DEFAULT_BUDGET_SHARE = 0.5
+FALLBACK_BUDGET = 4 * 1024 ** 3
+
+
+def physical_memory():
+    """Total physical RAM in bytes, or None if it can't be determined."""
+    if sys.platform == "win32":
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                        ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                        ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                        ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                        ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(status)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullTotalPhys
+        return None
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def default_memory_budget() -> int:
+    """RAM budget for concurrent conversions in bytes. MEDIA_CONVERTER_MEMORY_MB
+    overrides it; otherwise half of physical memory."""
+    env = os.environ.get("MEDIA_CONVERTER_MEMORY_MB")
+    if env:
+        try:
+            return int(float(env) * 1024 * 1024)
+        except ValueError:
+            pass
+    total = physical_memory()
+    return int(total * DEFAULT_BUDGET_SHARE) if total else FALLBACK_BUDGET
+
+
+def mode_bytes(mode, bands=None) -> int:
+    return MODE_BYTES_PER_PIXEL.get(mode, 4 * (bands or 1))
+
+
+def estimate_image_memory(path, options, probe=None) -> int:
+    """Estimate peak RAM of convert_image(path, **options) (or
+    convert_renditions when options has "targets") from the header.
+
+    Each step keeps its input alive while it builds its output, so the peak
+    is the larger of decode+resize and resize+RGB conversion (JPEG only).
+    Embedded previews and draft decoding only lower the real figure, so
+    they are ignored. Unreadable headers estimate just the
+    fixed overhead; the conversion itself will report the error. With a
+    metadata.CachedImageProbe the header is read from its MetadataCache
+    when the file is unchanged.
+    """
+    from PIL import Image
+    from .images import target_size
+
+    if probe is not None:
+        _, info = probe.info(path)
+        if not info or not info["width"] or not info["mode"]:
+            return JOB_OVERHEAD
+        size, mode = (info["width"], info["height"]), info["mode"]
+        try:
+            bands = Image.getmodebands(mode)
+        except (KeyError, ValueError):
+            bands = None
+    else:
+        try:
+            with Image.open(path) as im:
+                size, mode, bands = im.size, im.mode, len(im.getbands())
+        except Exception:
+            return JOB_OVERHEAD
+    source = size[0] * size[1] * mode_bytes(mode, bands)
+    targets = options.get("targets")
+    if targets:
+        # Renditions: the largest one dominates; smaller ones are derived from it
+        scale = min(1.0, max(t[0] for t in targets) / float(max(size)))
+        out_w, out_h = round(size[0] * scale), round(size[1] * scale)
+        jpeg = any(str(t[1]).upper() == "JPEG" for t in targets)
+    else:
+        out_w, out_h = target_size(size, options.get("width"), options.get("height"), options.get("keep_aspect", True))
+        jpeg = str(options.get("output_format", "")).upper() == "JPEG"
+    resized = out_w * out_h * mode_bytes(mode, bands) if (out_w, out_h) != size else 0
+    converted = out_w * out_h * mode_bytes("RGB") if jpeg and mode != "RGB" else 0
+    # resize() holds source + result; convert() holds its input + result
+    return max(source + resized, (resized or source) + converted) + JOB_OVERHEAD
@@ -0,0 +1,142 @@
+import io
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def probe_image(path: str):
+    """Return (size_in_bytes, (width, height)) for an image file. Either item is
+    None if it cannot be read. Only the header is parsed, no pixels are decoded."""
+    from PIL import Image
+    from . import images  # noqa: F401  (registers the HEIC opener)
+
+    nbytes = None
+    dims = None
+    try:
+        nbytes = os.path.getsize(path)
+    except Exception:
+        pass
+    try:
+        with Image.open(path) as im:
+            dims = im.size
+    except Exception:
+        pass
+    return nbytes, dims
+
+
+def read_image_info(path: str, thumb_size=None):
+    """Return header-level details for an image: format, width, height,
+    frame count and mode, plus JPEG thumbnail bytes when thumb_size is given.
+    Fields are None if the file cannot be opened as an image."""
+    from PIL import Image
+    from . import images  # noqa: F401  (registers the HEIC opener)
+
+    info = {"width": None, "height": None, "format": None, "frames": None, "mode": None, "thumb": None}
+    try:
+        with Image.open(path) as im:
+            info["width"], info["height"] = im.size
+            info["format"] = im.format
+            info["frames"] = getattr(im, "n_frames", 1)
+            info["mode"] = im.mode
+            if thumb_size:
+                im.draft("RGB", (thumb_size, thumb_size))
+                im.thumbnail((thumb_size, thumb_size))
+                buf = io.BytesIO()
+                im.convert("RGB").save(buf, "JPEG", quality=80)
+                info["thumb"] = buf.getvalue()
+    except Exception:
+        pass
+    return info
+
+
+class CachedImageProbe:
+    """probe_image() replacement that answers from a MetadataCache when the
+    file's size and mtime are unchanged, and records fresh probes otherwise."""
+
+    def __init__(self, cache, thumb_size=None):
+        self.cache = cache
+        self.thumb_size = thumb_size
+
+    def info(self, path: str):
+        """Return (stat_result, info dict), or (None, None) if path is missing."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None, None
+        info = self.cache.lookup(path, st.st_size, st.st_mtime_ns)
+        # Rows cached before the mode was recorded, or without a wanted thumbnail
+        stale = info is not None and info["format"] and (
+            info["mode"] is None or (self.thumb_size and info["thumb"] is None))
+        if info is None or stale:
+            info = read_image_info(path, self.thumb_size)
+            self.cache.store(path, st.st_size, st.st_mtime_ns, **info)
+        return st, info
+
+    def __call__(self, path: str):
+        st, info = self.info(path)
+        if st is None:
+            return None, None
+        dims = (info["width"], info["height"]) if info["width"] else None
+        return st.st_size, dims
+
+    def flush(self):
+        self.cache.flush()
+
+
+class MetadataScanner:
+    """Probe file metadata on a small thread pool, off the UI thread.
+
+    Paths are submitted in chunks; results land in a queue as
+    (path, *probe(path)) tuples that the GUI drains in bounded batches from
+    root.after, so neither scanning nor row updates block the event loop.
+    """
+
+    def __init__(self, probe, max_workers=None, chunk_size=64):
+        self.probe = probe
+        self.chunk_size = chunk_size
+        self._pool = ThreadPoolExecutor(max_workers=max_workers or min(8, os.cpu_count() or 1),
+                                        thread_name_prefix="metadata")
+        self._results = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        """Number of paths submitted whose results have not been drained yet."""
+        with self._lock:
+            return self._pending
+
+    def submit(self, paths):
+        paths = list(paths)
+        with self._lock:
+            self._pending += len(paths)
+        for i in range(0, len(paths), self.chunk_size):
+            self._pool.submit(self._scan_chunk, paths[i:i + self.chunk_size])
+
+    def _scan_chunk(self, paths):
+        for p in paths:
+            try:
+                result = self.probe(p)
+            except Exception:
+                result = (None, None)
+            self._results.put((p, *result))
+        flush = getattr(self.probe, "flush", None)
+        if flush:
+            flush()
+
+    def drain(self, limit=500):
+        """Return up to limit finished results without blocking."""
+        out = []
+        try:
+            while len(out) < limit:
+                out.append(self._results.get_nowait())
+        except queue.Empty:
+            pass
+        if out:
+            with self._lock:
+                self._pending -= len(out)
+        return out
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,277 @@
+import contextlib
+import glob
+import os
+import shutil
+import uuid
+
+# Application folder (the one holding run_converter.bat and resources/)
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESOURCES_DIR = os.path.join(SCRIPT_DIR, "resources")
+
+# Input extensions offered in the file dialogs and picked up by folder ingest
+IMAGE_EXTENSIONS = (".heic", ".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tiff", ".tif", ".webp")
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".mov", ".avi", ".m4v", ".webm", ".hevc", ".h265", ".ts", ".m2ts")
+
+
+def media_kind(path: str):
+    """Return "image" or "video" from the file extension, or None."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in IMAGE_EXTENSIONS:
+        return "image"
+    if ext in VIDEO_EXTENSIONS:
+        return "video"
+    return None
+
+
+def output_path_for(input_path: str, output_folder: str, ext: str) -> str:
+    """Return the default output path for input_path with a new extension,
+    either beside the source or inside output_folder."""
+    if output_folder:
+        base = os.path.splitext(os.path.basename(input_path))[0]
+        return os.path.join(output_folder, f"{base}.{ext}")
+    return os.path.splitext(input_path)[0] + f".{ext}"
+
+
+def unique_path(path: str) -> str:
+    """Return a non-colliding path by appending " (n)" before the extension."""
+    base, ext = os.path.splitext(path)
+    i = 1
+    candidate = f"{base} ({i}){ext}"
+    while os.path.exists(candidate):
+        i += 1
+        candidate = f"{base} ({i}){ext}"
+    return candidate
+
+
+def reserve_path(path: str) -> str:
+    """Atomically claim path, or the first free " (n)" variant, by creating it empty.
+    Safe when several worker processes resolve the same output name at once.
+    Prefer commit_output(..., exclusive=True), which never leaves an empty
+    file under the final name."""
+    base, ext = os.path.splitext(path)
+    candidate = path
+    i = 0
+    while True:
+        try:
+            fd = os.open(candidate, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            i += 1
+            candidate = f"{base} ({i}){ext}"
+            continue
+        os.close(fd)
+        return candidate
+
+
+def temp_path_for(path: str) -> str:
+    """Hidden sibling of path to write into before renaming it into place.
+    The extension is kept so ffmpeg picks the same muxer; folder watchers
+    skip it as a hidden file."""
+    folder, name = os.path.split(path)
+    return os.path.join(folder, f".{name}.{uuid.uuid4().hex[:8]}.tmp{os.path.splitext(name)[1]}")
+
+
+def commit_output(tmp: str, path: str, exclusive=False) -> str:
+    """Flush tmp to disk and atomically rename it to path, so path is either
+    the previous file or the complete new one, never a truncated write.
+
+    With exclusive, an existing file is never replaced: tmp is hard-linked
+    to path or the first free " (n)" variant (an atomic create-if-absent, so
+    worker processes racing for one name each get their own). Returns the
+    path written.
+    """
+    with open(tmp, "rb+") as fh:
+        os.fsync(fh.fileno())
+    if not exclusive:
+        os.replace(tmp, path)
+        return path
+    base, ext = os.path.splitext(path)
+    candidate = path
+    i = 0
+    while True:
+        try:
+            os.link(tmp, candidate)
+        except FileExistsError:
+            i += 1
+            candidate = f"{base} ({i}){ext}"
+            continue
+        except OSError:
+            # No hard links on this filesystem (e.g. FAT): claim the name and
+            # replace it straight away
+            candidate = reserve_path(candidate)
+            os.replace(tmp, candidate)
+            return candidate
+        discard_output(tmp)
+        return candidate
+
+
+def discard_output(tmp: str):
+    try:
+        os.remove(tmp)
+    except OSError:
+        pass
+
+
+@contextlib.contextmanager
+def atomic_output(path: str):
+    """Yield a temporary path to write path's contents to; it replaces path
+    when the block completes and is removed if the block raises."""
+    tmp = temp_path_for(path)
+    try:
+        yield tmp
+        commit_output(tmp, path)
+    finally:
+        discard_output(tmp)
+
+
+def remove_partial_outputs(path: str) -> int:
+    """Delete leftovers of interrupted writes to path (temp files and chunk
+    folders named after it, see temp_path_for). Returns how many were removed."""
+    folder, name = os.path.split(path)
+    removed = 0
+    for leftover in glob.glob(os.path.join(glob.escape(folder), glob.escape("." + name) + ".*")):
+        if os.path.isdir(leftover):
+            shutil.rmtree(leftover, ignore_errors=True)
+        else:
+            discard_output(leftover)
+        removed += 1
+    return removed
+
+
+class OutputPlanner:
+    """Resolve a batch's output paths in memory before any worker starts.
+
+    Each target folder is listed once with os.scandir; after that, existence
+    checks and " (n)" numbering are set lookups, so thousands of inputs that
+    share a name (IMG_0001.HEIC from several phones) cost one directory
+    listing instead of a stat per candidate. Names planned earlier in the
+    batch count as taken too, so two inputs never get the same output, even
+    with conflict='replace' (which only overwrites files that were there
+    before the batch). Names are compared with os.path.normcase, matching
+    the case-insensitive filesystems on Windows.
+
+    Files created by something else after a folder was listed are not seen;
+    the workers write to the planned path as given.
+    """
+
+    def __init__(self):
+        self._existing = {}  # folder -> normcased names present when listed
+        self._planned = {}  # folder -> normcased names handed out this batch
+        self._next = {}  # (folder, normcased stem, ext) -> next " (n)" to try
+
+    def _listing(self, folder):
+        names = self._existing.get(folder)
+        if names is None:
+            names = set()
+            try:
+                with os.scandir(folder or ".") as it:
+                    for entry in it:
+                        names.add(os.path.normcase(entry.name))
+            except OSError:
+                pass  # missing folder: nothing to collide with
+            self._existing[folder] = names
+            self._planned[folder] = set()
+        return names
+
+    def exists(self, path: str) -> bool:
+        """True if path was on disk when its folder was listed."""
+        folder, name = os.path.split(path)
+        return os.path.normcase(name) in self._listing(folder)
+
+    def claim(self, path: str):
+        """Mark path as used by this batch (e.g. a known output being rewritten)."""
+        folder, name = os.path.split(path)
+        self._listing(folder)
+        self._planned[folder].add(os.path.normcase(name))
+
+    def plan(self, path: str, conflict='keep') -> str:
+        """Return path, or its first free " (n)" variant, and claim it."""
+        folder, name = os.path.split(path)
+        existing = self._listing(folder)
+        planned = self._planned[folder]
+
+        def taken(n):
+            n = os.path.normcase(n)
+            return n in planned or (conflict == 'keep' and n in existing)
+
+        if not taken(name):
+            planned.add(os.path.normcase(name))
+            return path
+        base, ext = os.path.splitext(name)
+        key = (folder, os.path.normcase(base), os.path.normcase(ext))
+        i = self._next.get(key, 1)
+        while taken(f"{base} ({i}){ext}"):
+            i += 1
+        self._next[key] = i + 1
+        candidate = f"{base} ({i}){ext}"
+        planned.add(os.path.normcase(candidate))
+        return os.path.join(folder, candidate)
+
+    def output_for(self, input_path: str, output_folder: str, ext: str, conflict='keep') -> str:
+        """Planned output_path_for(input_path, output_folder, ext)."""
+        return self.plan(output_path_for(input_path, output_folder, ext), conflict)
+
+    def plan_options(self, input_path: str, options: dict) -> dict:
+        """Conversion options with output_path filled in from the plan. An
+        output_path that is already set (e.g. a stale output being rewritten
+        in place) is claimed as-is."""
+        if options.get("output_path"):
+            self.claim(options["output_path"])
+            return options
+        out = self.output_for(input_path, options.get("output_folder", ""), options["output_format"].lower(),
+                              options.get("conflict", "keep"))
+        return dict(options, output_path=out)
+
+
+def iter_media_files(root: str, kinds=("image", "video"), recursive=True, skip=()):
+    """Yield (path, relative folder) for media files of the given kinds under
+    root, walking lazily with os.scandir so callers can start on the first
+    files before the walk finishes. Hidden folders, symlinked folders and
+    folders whose real path is in skip (e.g. the output folder) are skipped;
+    the relative folder is "" for files directly in root."""
+    stack = [""]
+    while stack:
+        rel = stack.pop()
+        subdirs = []
+        try:
+            with os.scandir(os.path.join(root, rel) if rel else root) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not recursive or entry.name.startswith("."):
+                                continue
+                            if not (skip and os.path.realpath(entry.path) in skip):
+                                subdirs.append(os.path.join(rel, entry.name) if rel else entry.name)
+                        elif entry.is_file() and media_kind(entry.name) in kinds:
+                            yield entry.path, rel
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+        # Reversed so folders are visited in listing order
+        stack.extend(reversed(subdirs))
+
+
+def iter_inputs(paths, kinds, recursive=False, output_folder="", mirror=False):
+    """Expand files and folders into a lazy stream of (path, output folder).
+
+    Files given directly keep output_folder. Files found in a folder go to
+    output_folder too, or with mirror to the same relative subfolder under
+    it (created on first use). Without an output folder outputs are written
+    beside their sources, which already keeps the tree. An output folder
+    inside a walked folder is not walked, so earlier outputs aren't picked up
+    as inputs.
+    """
+    created = set()
+    skip = {os.path.realpath(output_folder)} if output_folder else ()
+    for p in paths:
+        if not os.path.isdir(p):
+            yield p, output_folder
+            continue
+        for path, rel in iter_media_files(p, kinds, recursive, skip):
+            folder = output_folder
+            if mirror and output_folder and rel:
+                folder = os.path.join(output_folder, rel)
+                if folder not in created:
+                    os.makedirs(folder, exist_ok=True)
+                    created.add(folder)
+            yield path, folder
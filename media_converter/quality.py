@@ -0,0 +1,192 @@
+import io
+import operator
+
+from PIL import Image
+
+from .timing import NULL_TIMER
+
+# Formats whose size/quality trade-off can be searched
+SEARCHABLE_FORMATS = ("JPEG", "WEBP")
+JPEG_SUBSAMPLING = {"4:4:4": 0, "4:2:2": 1, "4:2:0": 2}
+MIN_QUALITY = 1
+# Encodes per target: bisection over 1..100 needs at most 7
+MAX_ATTEMPTS = 8
+# Similarity is measured on luma downscaled to at most this many pixels on
+# the long edge, in 8x8 blocks (the JPEG block size)
+SIMILARITY_SIZE = 512
+BLOCK = 8
+_C1 = (0.01 * 255) ** 2
+_C2 = (0.03 * 255) ** 2
+_SQUARES = [i * i for i in range(256)]
+
+
+def encoder_options(output_format, quality, optimize=False, progressive=False, subsampling=None, webp_method=None):
+    """Pillow save() keyword arguments for output_format."""
+    fmt = output_format.upper()
+    options = {}
+    if fmt in ("JPEG", "WEBP"):
+        options["quality"] = quality
+    if fmt == "JPEG":
+        if optimize:
+            options["optimize"] = True
+        if progressive:
+            options["progressive"] = True
+        if subsampling:
+            options["subsampling"] = JPEG_SUBSAMPLING.get(subsampling, subsampling)
+    elif fmt == "WEBP" and webp_method is not None:
+        options["method"] = webp_method
+    return options
+
+
+def _luma(image):
+    """Grayscale copy of image, shrunk for similarity scoring."""
+    gray = image.convert("L")
+    scale = SIMILARITY_SIZE / float(max(gray.size))
+    if scale < 1.0:
+        gray = gray.resize((max(BLOCK, round(gray.width * scale)), max(BLOCK, round(gray.height * scale))),
+                           Image.Resampling.BOX)
+    return gray
+
+
+def _rows(gray):
+    data = gray.tobytes()
+    w = gray.width
+    return [data[y * w:(y + 1) * w] for y in range(gray.height)]
+
+
+class Reference:
+    """Per-block statistics of the image being encoded, computed once so each
+    candidate encode only needs its own pass."""
+
+    def __init__(self, image):
+        gray = _luma(image)
+        self.size = gray.size
+        self.rows = _rows(gray)
+        self.blocks = []  # (x, y, sum, sum of squares)
+        w, h = self.size
+        for y in range(0, h - BLOCK + 1, BLOCK):
+            rows = self.rows[y:y + BLOCK]
+            for x in range(0, w - BLOCK + 1, BLOCK):
+                s = sq = 0
+                for r in rows:
+                    seg = r[x:x + BLOCK]
+                    s += sum(seg)
+                    sq += sum(map(_SQUARES.__getitem__, seg))
+                self.blocks.append((x, y, s, sq))
+
+    def similarity(self, candidate) -> float:
+        """Mean SSIM over 8x8 luma blocks between the reference and candidate
+        (1.0 = identical)."""
+        gray = _luma(candidate)
+        if gray.size != self.size:
+            gray = gray.resize(self.size, Image.Resampling.BOX)
+        rows = _rows(gray)
+        n = float(BLOCK * BLOCK)
+        total = 0.0
+        for x, y, sx, sxx in self.blocks:
+            sy = syy = sxy = 0
+            for a, b in zip(self.rows[y:y + BLOCK], rows[y:y + BLOCK]):
+                ref, seg = a[x:x + BLOCK], b[x:x + BLOCK]
+                sy += sum(seg)
+                syy += sum(map(_SQUARES.__getitem__, seg))
+                sxy += sum(map(operator.mul, ref, seg))
+            mx, my = sx / n, sy / n
+            vx, vy = sxx / n - mx * mx, syy / n - my * my
+            cov = sxy / n - mx * my
+            total += ((2 * mx * my + _C1) * (2 * cov + _C2)) / ((mx * mx + my * my + _C1) * (vx + vy + _C2))
+        return total / len(self.blocks) if self.blocks else 1.0
+
+
+def search_quality(image, output_format, target_bytes=None, target_similarity=None, max_quality=100,
+                   max_attempts=MAX_ATTEMPTS, timer=NULL_TIMER, **encoder):
+    """Encode image (JPEG or WEBP) at the best quality for a target.
+
+    target_bytes: the highest quality whose output fits in that many bytes.
+    target_similarity: the lowest quality whose output still scores at least
+    that (Reference.similarity, 0..1; around 0.95 is visually close). With
+    both, the similarity pick is lowered further if it is over the byte
+    budget. Quality is bisected between 1 and max_quality over in-memory
+    encodes of the same pixels, at most max_attempts of them per target (each
+    quality is encoded once). encoder holds
+    optimize/progressive/subsampling/webp_method.
+
+    Returns (data, info): the chosen encode and a dict with quality,
+    attempts, size, similarity (the chosen encode's score, whenever
+    target_similarity is given), met and missed. met is False when a target
+    was not reached and missed then names it ("size", "similarity"): the
+    smallest encode tried is returned when nothing fits the byte budget, and
+    max_quality when nothing scores high enough.
+    """
+    fmt = output_format.upper()
+    encodes = {}  # quality -> bytes
+    scores = {}
+
+    def encode(q):
+        if q not in encodes:
+            buf = io.BytesIO()
+            with timer.stage("encode"):
+                image.save(buf, fmt, **encoder_options(fmt, q, **encoder))
+            encodes[q] = buf.getvalue()
+        return encodes[q]
+
+    reference = None
+
+    def score(q):
+        nonlocal reference
+        if q not in scores:
+            data = encode(q)
+            with timer.stage("similarity"):
+                if reference is None:
+                    reference = Reference(image)
+                with Image.open(io.BytesIO(data)) as decoded:
+                    scores[q] = reference.similarity(decoded)
+        return scores[q]
+
+    def fits(q):
+        return target_bytes is None or len(encode(q)) <= target_bytes
+
+    def good_enough(q):
+        return target_similarity is None or score(q) >= target_similarity
+
+    def bisect(ok, low, high, want_highest):
+        """Highest (or lowest) q in [low, high] with ok(q), assuming ok is
+        monotonic; None if none is found within the attempt budget."""
+        best = None
+        start = len(encodes)
+        while low <= high and len(encodes) - start < max_attempts:
+            mid = (low + high + (1 if want_highest else 0)) // 2
+            if ok(mid):
+                best = mid
+                if want_highest:
+                    low = mid + 1
+                else:
+                    high = mid - 1
+            elif want_highest:
+                high = mid - 1
+            else:
+                low = mid + 1
+        return best
+
+    high = max(MIN_QUALITY, min(100, max_quality))
+    quality = high
+    if target_similarity is not None:
+        # Lowest quality that still looks close enough
+        found = bisect(good_enough, MIN_QUALITY, high, want_highest=False)
+        quality = found if found is not None else high
+    if target_bytes is not None and not fits(quality):
+        found = bisect(fits, MIN_QUALITY, quality - 1, want_highest=True)
+        if found is None:
+            # Nothing tried fits: return the smallest encode we have
+            found = min(encodes, key=lambda q: len(encodes[q]))
+        quality = found
+    data = encode(quality)
+    info = {"quality": quality, "attempts": len(encodes), "size": len(data), "missed": []}
+    if target_bytes is not None and len(data) > target_bytes:
+        info["missed"].append("size")
+    if target_similarity is not None:
+        # Scored even when the byte budget moved the pick below the similarity one
+        info["similarity"] = round(score(quality), 4)
+        if scores[quality] < target_similarity:
+            info["missed"].append("similarity")
+    info["met"] = not info["missed"]
+    return data, info
@@ -0,0 +1,259 @@
+import os
+import queue
+import threading
+import time
+
+from .chunked import MIN_CHUNKED_DURATION, convert_video_chunked
+from .timing import NULL_TIMER, FileTimer
+from .video import REMUX, convert_video, find_ffmpeg, find_ffprobe, plan_video, probe_video, progress_stats
+
+# Roughly one encoder thread per half megapixel: 480p -> 1, 720p -> 2,
+# 1080p -> 5, 4K -> capped. libx264/libvpx scale poorly past ~16 threads.
+PIXELS_PER_THREAD = 500_000
+MAX_THREADS_PER_JOB = 16
+# A single job never gets more than this share of the cores, so small clips
+# keep running next to a big encode
+MAX_JOB_SHARE = 0.75
+# Assumed when ffprobe cannot report a resolution
+DEFAULT_PIXELS = 1920 * 1080
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def threads_for(width, height, total_threads):
+    """Per-job -threads budget for a video of the given resolution."""
+    pixels = (width * height) if width and height else DEFAULT_PIXELS
+    want = -(-pixels // PIXELS_PER_THREAD)  # ceil
+    return max(1, min(want, MAX_THREADS_PER_JOB, int(total_threads * MAX_JOB_SHARE)))
+
+
+def default_max_jobs(total_threads=None) -> int:
+    """Default number of concurrent ffmpeg processes."""
+    return max(1, (total_threads or os.cpu_count() or 1) // 2)
+
+
+class VideoJob:
+    """One queued ffmpeg encode and its live counters."""
+
+    def __init__(self, path, options):
+        self.path = path
+        self.options = options
+        self.status = QUEUED
+        self.size = None
+        self.threads = None
+        self.duration = None
+        self.method = None  # video.REMUX or video.ENCODE once started
+        self.frames = 0
+        self.bytes = 0
+        # Latest progress_stats(): percent, fps, speed, eta (None until known)
+        self.progress = {"percent": None, "fps": None, "speed": None, "eta": None}
+        self.result = None
+        self.started = None
+        self.finished = None
+
+
+class VideoJobScheduler:
+    """Run up to max_jobs ffmpeg processes at once.
+
+    Each job gets a -threads budget from its resolution (threads_for), and a
+    new job is only started while the running jobs' budgets fit in
+    total_threads, so one 4K encode can't starve the machine and small clips
+    fill the remaining cores. Queued jobs can be reordered until they start.
+    Events are posted to self.events as (kind, job) with kind in "started",
+    "plan" (job.method says whether it is remuxed or encoded), "progress"
+    (job.progress holds percent/fps/speed/eta against the probed duration)
+    and "finished", followed by ("done", None) when the queue is
+    empty. notify(), if given, is called from the worker thread after every
+    event so a GUI can wake up and drain the queue instead of polling it.
+    Successful jobs are added to history (an estimate.EncodeSpeedHistory),
+    if given, so later batches can be estimated from this one.
+    """
+
+    def __init__(self, max_jobs=None, total_threads=None, ff=None, fp=None, notify=None, timings=None,
+                 history=None):
+        self.total_threads = total_threads or os.cpu_count() or 1
+        self.max_jobs = max_jobs or default_max_jobs(self.total_threads)
+        self.ff = ff or find_ffmpeg()
+        self.fp = fp or find_ffprobe()
+        self.events = queue.Queue()
+        self.notify = notify
+        self.timings = timings
+        self.history = history
+        self.jobs = []
+        self._queue = []
+        self._running = []
+        self._cond = threading.Condition()
+        self._cancel = False
+        self._closed = True
+        self._started_at = None
+        self._thread = None
+
+    # ---- queue management -------------------------------------------------
+    def add(self, path, options) -> VideoJob:
+        job = VideoJob(path, options)
+        with self._cond:
+            if self._cancel:
+                return job  # a streaming walk can still be adding after cancel()
+            self.jobs.append(job)
+            self._queue.append(job)
+            self._cond.notify_all()
+        return job
+
+    def move(self, job, offset: int) -> bool:
+        """Move a still-queued job offset places (negative = earlier)."""
+        with self._cond:
+            if job not in self._queue:
+                return False
+            i = self._queue.index(job)
+            j = max(0, min(len(self._queue) - 1, i + offset))
+            self._queue.insert(j, self._queue.pop(i))
+            # The new head may fit the free threads where the old one didn't
+            self._cond.notify_all()
+            return True
+
+    def cancel(self):
+        """Drop queued jobs; running encodes are allowed to finish."""
+        with self._cond:
+            self._cancel = True
+            self._queue.clear()
+            self._cond.notify_all()
+
+    # ---- running ----------------------------------------------------------
+    def start(self, streaming=False):
+        """Start dispatching. With streaming=True jobs may keep arriving
+        through add() (e.g. from a folder walk) and "done" is only posted
+        after close()."""
+        self._closed = not streaming
+        self._started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._dispatch, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """No more jobs will be added to a streaming run."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def wait(self):
+        if self._thread:
+            self._thread.join()
+
+    def _dispatch(self):
+        while True:
+            with self._cond:
+                head = self._queue[0] if self._queue else None
+            if head is not None and head.threads is None:
+                # ffprobe outside the lock so reordering/stats never wait on it
+                # One cached ffprobe call; convert_video reuses it for the audio plan
+                info = probe_video(head.path, self.fp)
+                w, h = info["width"], info["height"]
+                head.size = (w, h) if w and h else None
+                head.duration = info["duration"]
+                o = head.options
+                if plan_video(info, o["output_format"], o.get("width"), o.get("height"), o.get("remux")) == REMUX:
+                    head.threads = 1  # stream copy is I/O bound
+                elif o.get("chunked") and (head.duration or 0) >= MIN_CHUNKED_DURATION:
+                    # Split encodes spread over every core, so they run alone
+                    head.threads = self.total_threads
+                else:
+                    head.threads = threads_for(w, h, self.total_threads)
+            with self._cond:
+                if not self._queue and not self._running and (self._closed or self._cancel):
+                    self._post("done", None)
+                    return
+                if self._queue and self._queue[0].threads is None:
+                    continue  # queue was reordered; size the new head first
+                job = self._next_admissible()
+                if job is None:
+                    self._cond.wait()
+                    continue
+                self._queue.remove(job)
+                self._running.append(job)
+                job.status = RUNNING
+            threading.Thread(target=self._run_job, args=(job,), daemon=True).start()
+
+    def _post(self, kind, job):
+        self.events.put((kind, job))
+        if self.notify:
+            try:
+                self.notify()
+            except Exception:
+                pass
+
+    def _next_admissible(self):
+        """Return the queue head if it fits the job and thread budgets, else None."""
+        if self._cancel or not self._queue or len(self._running) >= self.max_jobs:
+            return None
+        job = self._queue[0]
+        used = sum(j.threads for j in self._running)
+        if self._running and used + job.threads > self.total_threads:
+            return None
+        return job
+
+    def _run_job(self, job):
+        job.started = time.monotonic()
+        self._post("started", job)
+
+        def on_progress(fields):
+            try:
+                job.frames = int(fields.get("frame", job.frames))
+                job.bytes = int(fields.get("total_size", job.bytes))
+            except ValueError:
+                pass
+            job.progress = progress_stats(fields, job.duration)
+            self._post("progress", job)
+
+        def on_plan(method):
+            job.method = method
+            self._post("plan", job)
+
+        options = dict(job.options)
+        convert = convert_video_chunked if options.pop("chunked", False) else convert_video
+        timer = FileTimer(job.path, "video") if self.timings is not None else NULL_TIMER
+        error = None
+        try:
+            job.result = convert(job.path, **options, ff=self.ff, fp=self.fp, threads=job.threads,
+                                 on_progress=on_progress, on_plan=on_plan, timer=timer)
+        except Exception as e:
+            print(f"Failed to convert {job.path}: {e}")
+            job.result = False
+            error = e
+        if self.timings is not None:
+            timer.set(threads=job.threads)
+            self.timings.add(timer.finish(job.result, error))
+        job.finished = time.monotonic()
+        if job.result and self.history is not None:
+            try:
+                nbytes = os.path.getsize(job.path)
+            except OSError:
+                nbytes = None
+            self.history.record(job.options["output_format"], job.size, job.duration, nbytes,
+                                job.finished - job.started, job.threads, job.method)
+        with self._cond:
+            job.status = DONE if job.result else FAILED
+            self._running.remove(job)
+            # Queued before the dispatcher can see an idle scheduler and post "done"
+            self._post("finished", job)
+            self._cond.notify_all()
+
+    # ---- reporting --------------------------------------------------------
+    def stats(self) -> dict:
+        """Aggregate counters since start(): frames/s and output bytes/s
+        across all jobs, plus queue depth."""
+        with self._cond:
+            running = len(self._running)
+            queued = len(self._queue)
+        elapsed = max(1e-6, time.monotonic() - self._started_at) if self._started_at else 0
+        frames = sum(j.frames for j in self.jobs)
+        nbytes = sum(j.bytes for j in self.jobs)
+        return {
+            "running": running,
+            "queued": queued,
+            "done": sum(1 for j in self.jobs if j.status == DONE),
+            "failed": sum(1 for j in self.jobs if j.status == FAILED),
+            "fps": frames / elapsed if elapsed else 0.0,
+            "bytes_per_sec": nbytes / elapsed if elapsed else 0.0,
+        }
@@ -0,0 +1,442 @@
+"""Local HTTP conversion service (standard library asyncio only).
+
+    POST /convert/image?format=webp&width=1280&quality=80   body: image bytes
+                                 (&max_bytes=200000 or &min_similarity=0.95 search the quality)
+    POST /convert/video?format=mp4&crf=23&height=720        body: video bytes
+                                 (&filename=clip.hevc passes the upload's name/extension)
+    GET  /metrics                                           queue depth, latency percentiles
+    GET  /health
+
+Uploads are streamed to a per-request temp folder in chunks, never held in
+memory whole, and the converted file is streamed back. Images are converted
+in a process pool with convert_image(), videos in a thread pool running
+convert_video() (ffmpeg does the work in its own process). Each pool admits
+at most workers + queue requests at once, counted from the moment the
+headers arrive; anything beyond that gets 429 with Retry-After before its
+body is read (clients sending "Expect: 100-continue" never send it).
+"""
+import asyncio
+import collections
+import functools
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from .engine import default_workers
+from .images import convert_image
+from .quality import JPEG_SUBSAMPLING
+from .scheduler import default_max_jobs
+from .timing import percentile
+from .video import convert_video, ffmpeg_available, find_ffmpeg, find_ffprobe
+
+IMAGE_FORMATS = ("JPEG", "PNG", "BMP", "GIF", "TIFF", "WEBP")
+VIDEO_FORMATS = ("mp4", "mkv", "mov", "avi", "m4v", "webm")
+CONTENT_TYPES = {
+    "jpeg": "image/jpeg", "png": "image/png", "bmp": "image/bmp", "gif": "image/gif", "tiff": "image/tiff",
+    "webp": "image/webp", "mp4": "video/mp4", "mkv": "video/x-matroska", "mov": "video/quicktime",
+    "avi": "video/x-msvideo", "m4v": "video/x-m4v", "webm": "video/webm",
+}
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 411: "Length Required",
+           413: "Payload Too Large", 422: "Unprocessable Entity", 429: "Too Many Requests",
+           500: "Internal Server Error", 503: "Service Unavailable"}
+
+CHUNK = 256 * 1024
+HEADER_LIMIT = 64 * 1024
+HEADER_TIMEOUT = 30.0
+# Unread request bodies discarded after an early response, at most
+LINGER_LIMIT = 64 * 1024 * 1024
+LINGER_TIMEOUT = 5.0
+DEFAULT_MAX_UPLOAD = 4 * 1024 ** 3
+# Latencies kept per pool for the metrics percentiles
+LATENCY_WINDOW = 1000
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message=""):
+        super().__init__(message)
+        self.status = status
+        self.message = message or REASONS.get(status, "")
+
+
+class _Pool:
+    """An executor plus the admission counters and latency window for one
+    kind of request. Only touched from the event loop thread."""
+
+    def __init__(self, executor, workers, queue_limit):
+        self.executor = executor
+        self.workers = workers
+        self.capacity = workers + queue_limit
+        self.active = 0  # admitted: uploading, waiting for a worker or converting
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW)
+
+    def admit(self) -> bool:
+        if self.active >= self.capacity:
+            self.rejected += 1
+            return False
+        self.active += 1
+        return True
+
+    def stats(self):
+        lat = sorted(self.latencies)
+        return {
+            "workers": self.workers,
+            "capacity": self.capacity,
+            "active": self.active,
+            "running": self.running,
+            "queue_depth": self.active - self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "latency_ms": {
+                "p50": round(percentile(lat, 50) * 1000, 1),
+                "p90": round(percentile(lat, 90) * 1000, 1),
+                "p99": round(percentile(lat, 99) * 1000, 1),
+                "max": round((lat[-1] if lat else 0.0) * 1000, 1),
+                "samples": len(lat),
+            },
+        }
+
+
+def _flag(value):
+    return str(value).lower() not in ("0", "false", "no", "off")
+
+
+def _int_param(params, name, low, high):
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        n = int(value)
+    except ValueError:
+        raise HTTPError(400, f"{name} must be an integer")
+    if not low <= n <= high:
+        raise HTTPError(400, f"{name} must be between {low} and {high}")
+    return n
+
+
+def image_options(params):
+    """convert_image() options from query parameters."""
+    fmt = params.get("format", "JPEG").upper().replace("JPG", "JPEG")
+    if fmt not in IMAGE_FORMATS:
+        raise HTTPError(400, f"format must be one of {', '.join(IMAGE_FORMATS)}")
+    resample = params.get("resample", "quality")
+    if resample not in ("fast", "balanced", "quality"):
+        raise HTTPError(400, "resample must be fast, balanced or quality")
+    quality = _int_param(params, "quality", 1, 100)
+    similarity = params.get("min_similarity")
+    if similarity not in (None, ""):
+        try:
+            similarity = float(similarity)
+        except ValueError:
+            raise HTTPError(400, "min_similarity must be a number")
+        if not 0 < similarity < 1:
+            raise HTTPError(400, "min_similarity must be between 0 and 1")
+    subsampling = params.get("subsampling") or None
+    if subsampling is not None and subsampling not in JPEG_SUBSAMPLING:
+        raise HTTPError(400, f"subsampling must be one of {', '.join(JPEG_SUBSAMPLING)}")
+    return {
+        "output_format": fmt,
+        "width": _int_param(params, "width", 1, 65535),
+        "height": _int_param(params, "height", 1, 65535),
+        "keep_aspect": _flag(params.get("keep_aspect", "1")),
+        "jpeg_quality": 95 if quality is None else quality,
+        "resample": resample,
+        "fast_downscale": _flag(params.get("fast_downscale", "0")),
+        "target_bytes": _int_param(params, "max_bytes", 1, 2 ** 31),
+        "target_similarity": similarity or None,
+        "jpeg_optimize": _flag(params.get("optimize", "0")),
+        "jpeg_progressive": _flag(params.get("progressive", "0")),
+        "jpeg_subsampling": subsampling,
+        "webp_method": _int_param(params, "webp_method", 0, 6),
+    }
+
+
+def video_options(params):
+    """convert_video() options from query parameters."""
+    fmt = params.get("format", "mp4").lower()
+    if fmt not in VIDEO_FORMATS:
+        raise HTTPError(400, f"format must be one of {', '.join(VIDEO_FORMATS)}")
+    crf = _int_param(params, "crf", 0, 51)
+    return {
+        "output_format": fmt,
+        "width": _int_param(params, "width", 1, 16384),
+        "height": _int_param(params, "height", 1, 16384),
+        "keep_aspect": _flag(params.get("keep_aspect", "1")),
+        "crf": 23 if crf is None else crf,
+        "remux": _flag(params.get("remux", "0")),
+    }
+
+
+class ConversionServer:
+    """asyncio HTTP front end for convert_image()/convert_video().
+
+    image_workers processes and video_jobs ffmpeg threads do the work; each
+    pool also lets queue requests wait for a free worker. Use
+    ``await server.start()`` then ``serve_forever()``, or run(), which does
+    both in a fresh event loop.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8765, image_workers=None, video_jobs=None, queue_limit=None,
+                 max_upload=DEFAULT_MAX_UPLOAD, ff=None, fp=None, temp_dir=None):
+        self.host = host
+        self.port = port
+        self.max_upload = max_upload
+        self.temp_dir = temp_dir
+        self.ff = ff or find_ffmpeg()
+        self.fp = fp or find_ffprobe()
+        image_workers = image_workers or default_workers()
+        video_jobs = video_jobs or default_max_jobs()
+        self.video_threads = max(1, (os.cpu_count() or 1) // video_jobs)
+        self.images = _Pool(ProcessPoolExecutor(max_workers=image_workers), image_workers,
+                            image_workers * 2 if queue_limit is None else queue_limit)
+        self.videos = _Pool(ThreadPoolExecutor(max_workers=video_jobs), video_jobs,
+                            video_jobs if queue_limit is None else queue_limit)
+        self._ffmpeg_ok = None
+        self._server = None
+        self._started = time.monotonic()
+
+    # ---- lifecycle ----------------------------------------------------------
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=HEADER_LIMIT)
+        # Port 0 picks a free port; report the real one
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.images.executor.shutdown(wait=False, cancel_futures=True)
+        self.videos.executor.shutdown(wait=False, cancel_futures=True)
+
+    def run(self):
+        async def main():
+            await self.start()
+            print(f"Serving on http://{self.host}:{self.port}", flush=True)
+            try:
+                await self.serve_forever()
+            finally:
+                await self.close()
+
+        try:
+            asyncio.run(main())
+        except KeyboardInterrupt:
+            pass
+
+    def metrics(self):
+        return {
+            "uptime_s": round(time.monotonic() - self._started, 1),
+            "image": self.images.stats(),
+            "video": self.videos.stats(),
+        }
+
+    # ---- HTTP -----------------------------------------------------------------
+    async def _handle(self, reader, writer):
+        linger = True
+        try:
+            try:
+                method, target, headers = await asyncio.wait_for(self._read_head(reader), HEADER_TIMEOUT)
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                return
+            except HTTPError as e:
+                await self._send_json(writer, e.status, {"error": e.message})
+                return
+            url = urlsplit(target)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            try:
+                await self._route(method, url.path, params, headers, reader, writer)
+            except HTTPError as e:
+                await self._send_json(writer, e.status, {"error": e.message},
+                                      {"Retry-After": "1"} if e.status == 429 else None)
+            except Exception as e:
+                print(f"Request {target} failed: {e}")
+                await self._send_json(writer, 500, {"error": str(e)})
+        except ConnectionError:
+            pass
+        except asyncio.CancelledError:
+            # Server shutting down: drop the connection instead of lingering
+            linger = False
+        finally:
+            try:
+                if linger:
+                    await self._linger(reader, writer)
+                writer.close()
+                await writer.wait_closed()
+            except (ConnectionError, asyncio.CancelledError):
+                writer.transport.abort()
+
+    async def _linger(self, reader, writer):
+        """Half-close and discard what the client is still sending, so a
+        response sent before the body was read (429, 400...) reaches it
+        instead of being lost to a connection reset."""
+        try:
+            if writer.can_write_eof():
+                writer.write_eof()
+            deadline = time.monotonic() + LINGER_TIMEOUT
+            discarded = 0
+            while discarded < LINGER_LIMIT:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                data = await asyncio.wait_for(reader.read(CHUNK), left)
+                if not data:
+                    break
+                discarded += len(data)
+        except (asyncio.TimeoutError, ConnectionError, OSError):
+            pass
+
+    async def _read_head(self, reader):
+        head = await reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "malformed request line")
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        return method.upper(), target, headers
+
+    async def _route(self, method, path, params, headers, reader, writer):
+        if path == "/health":
+            await self._send_json(writer, 200, {"status": "ok"})
+        elif path == "/metrics":
+            await self._send_json(writer, 200, self.metrics())
+        elif path in ("/convert/image", "/convert/video"):
+            if method != "POST":
+                raise HTTPError(405)
+            if path == "/convert/image":
+                await self._convert(self.images, image_options(params), params, headers, reader, writer)
+            else:
+                if self._ffmpeg_ok is None:
+                    loop = asyncio.get_running_loop()
+                    self._ffmpeg_ok = await loop.run_in_executor(None, ffmpeg_available, self.ff)
+                if not self._ffmpeg_ok:
+                    raise HTTPError(503, "FFmpeg is not available")
+                await self._convert(self.videos, video_options(params), params, headers, reader, writer)
+        else:
+            raise HTTPError(404)
+
+    async def _convert(self, pool, options, params, headers, reader, writer):
+        # Admission is decided on the headers alone, before any body is read
+        if not pool.admit():
+            raise HTTPError(429, "busy, retry later")
+        t0 = time.perf_counter()
+        work = None
+        ok = False
+        try:
+            if headers.get("content-length", "").isdigit() and int(headers["content-length"]) > self.max_upload:
+                raise HTTPError(413)
+            if headers.get("expect", "").lower() == "100-continue":
+                # Clients that ask first only send the body once admitted
+                writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+                await writer.drain()
+            work = tempfile.mkdtemp(prefix="mc-serve-", dir=self.temp_dir)
+            # The upload's extension matters for raw .hevc streams
+            ext = os.path.splitext(os.path.basename(params.get("filename", "")))[1].lower()
+            src = os.path.join(work, "input" + (ext if ext.isascii() and ext[1:].isalnum() else ""))
+            await self._receive(headers, reader, src)
+            out = os.path.join(work, "output." + options["output_format"].lower())
+            if pool is self.images:
+                job = functools.partial(convert_image, src, output_folder=work, output_path=out, **options)
+            else:
+                job = functools.partial(convert_video, src, output_folder=work, output_path=out, ff=self.ff,
+                                        fp=self.fp, threads=self.video_threads, **options)
+            pool.running += 1
+            try:
+                result = await asyncio.get_running_loop().run_in_executor(pool.executor, job)
+            finally:
+                pool.running -= 1
+            if not result:
+                raise HTTPError(422, "conversion failed")
+            await self._send_file(writer, result, CONTENT_TYPES.get(options["output_format"].lower()))
+            ok = True
+        finally:
+            pool.active -= 1
+            if ok:
+                pool.completed += 1
+                pool.latencies.append(time.perf_counter() - t0)
+            else:
+                pool.failed += 1
+            if work:
+                shutil.rmtree(work, ignore_errors=True)
+
+    async def _receive(self, headers, reader, path):
+        """Stream the request body to path (Content-Length or chunked)."""
+        loop = asyncio.get_running_loop()
+        received = 0
+        with open(path, "wb") as fh:
+            if "chunked" in headers.get("transfer-encoding", "").lower():
+                while True:
+                    size_line = await reader.readline()
+                    try:
+                        size = int(size_line.split(b";")[0].strip(), 16)
+                    except ValueError:
+                        raise HTTPError(400, "bad chunk size")
+                    if size == 0:
+                        await reader.readline()  # trailing CRLF (trailers unsupported)
+                        break
+                    received += size
+                    if received > self.max_upload:
+                        raise HTTPError(413)
+                    while size:
+                        data = await reader.readexactly(min(size, CHUNK))
+                        size -= len(data)
+                        await loop.run_in_executor(None, fh.write, data)
+                    await reader.readexactly(2)
+            else:
+                length = headers.get("content-length")
+                if length is None:
+                    raise HTTPError(411)
+                try:
+                    remaining = int(length)
+                except ValueError:
+                    raise HTTPError(400, "bad Content-Length")
+                if remaining > self.max_upload:
+                    raise HTTPError(413)
+                while remaining:
+                    data = await reader.read(min(remaining, CHUNK))
+                    if not data:
+                        raise HTTPError(400, "body ended early")
+                    remaining -= len(data)
+                    await loop.run_in_executor(None, fh.write, data)
+                    received += len(data)
+        if not received:
+            raise HTTPError(400, "empty body")
+
+    async def _send_head(self, writer, status, content_type, length, extra=None):
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", f"Content-Type: {content_type}",
+                 f"Content-Length: {length}", "Connection: close"]
+        lines += [f"{k}: {v}" for k, v in (extra or {}).items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+
+    async def _send_json(self, writer, status, payload, extra=None):
+        body = json.dumps(payload).encode("utf-8")
+        await self._send_head(writer, status, "application/json", len(body), extra)
+        writer.write(body)
+        await writer.drain()
+
+    async def _send_file(self, writer, path, content_type):
+        loop = asyncio.get_running_loop()
+        await self._send_head(writer, 200, content_type or "application/octet-stream", os.path.getsize(path))
+        with open(path, "rb") as fh:
+            while True:
+                data = await loop.run_in_executor(None, fh.read, CHUNK)
+                if not data:
+                    break
+                writer.write(data)
+                await writer.drain()
@@ -0,0 +1,159 @@
+import collections
+import io
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .metadata import read_image_info
+
+# Longest edge of generated thumbnails; smaller views are scaled from these
+THUMB_SIZE = 256
+# In-memory thumbnails are kept as their JPEG bytes (~10 KB each), so this
+# holds a few thousand of them
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+class ThumbnailLRU:
+    """Encoded thumbnails by path, least recently used dropped first once
+    their total size exceeds max_bytes. Safe to share between threads."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, path):
+        with self._lock:
+            return path in self._items
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def get(self, path):
+        with self._lock:
+            data = self._items.get(path)
+            if data is not None:
+                self._items.move_to_end(path)
+            return data
+
+    def put(self, path, data):
+        with self._lock:
+            old = self._items.pop(path, None)
+            if old is not None:
+                self.bytes -= len(old)
+            self._items[path] = data
+            self.bytes += len(data)
+            while self.bytes > self.max_bytes and len(self._items) > 1:
+                _, dropped = self._items.popitem(last=False)
+                self.bytes -= len(dropped)
+
+
+def open_thumbnail(data, size):
+    """Decode encoded thumbnail bytes to a PIL image at most size on the long
+    edge (JPEG draft mode does most of the shrinking)."""
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(data))
+    image.draft("RGB", (size, size))
+    image.thumbnail((size, size))
+    return image
+
+
+class ThumbnailLoader:
+    """Generate thumbnails on a small thread pool, off the UI thread.
+
+    request() replaces the list of wanted paths, most wanted first, so
+    thumbnails for rows that have been scrolled past are never made. Each
+    one comes from the persistent MetadataCache when the file is unchanged,
+    otherwise from a reduced-resolution decode (draft() and thumbnail() via
+    read_image_info), and is stored in both caches. Finished paths land in
+    a queue that the GUI drains from root.after; failures are remembered so
+    unreadable files are not retried.
+    """
+
+    def __init__(self, cache=None, size=THUMB_SIZE, max_bytes=DEFAULT_MAX_BYTES, max_workers=None):
+        self.cache = cache
+        self.size = size
+        self.thumbs = ThumbnailLRU(max_bytes)
+        self.failed = set()
+        self._max_workers = max_workers or min(2, os.cpu_count() or 1)
+        self._pool = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="thumbnails")
+        self._wanted = collections.deque()
+        self._running = 0
+        self._lock = threading.Lock()
+        self._results = queue.Queue()
+
+    def get(self, path):
+        """Encoded thumbnail for path if it is in memory, else None."""
+        return self.thumbs.get(path)
+
+    def request(self, paths):
+        """Make thumbnails for paths (most wanted first) that aren't in memory,
+        dropping earlier requests still waiting."""
+        wanted = [p for p in paths if p not in self.thumbs and p not in self.failed]
+        with self._lock:
+            self._wanted = collections.deque(wanted)
+            start = max(0, min(len(wanted), self._max_workers - self._running))
+            self._running += start
+        for _ in range(start):
+            self._pool.submit(self._work)
+
+    def _work(self):
+        made = 0
+        while True:
+            with self._lock:
+                if not self._wanted:
+                    self._running -= 1
+                    break
+                path = self._wanted.popleft()
+            if path in self.thumbs:
+                continue
+            try:
+                data = self._make(path)
+            except Exception:
+                data = None
+            if data:
+                self.thumbs.put(path, data)
+                made += 1
+            else:
+                self.failed.add(path)
+            self._results.put(path)
+        if made and self.cache is not None:
+            self.cache.flush()
+
+    def _make(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if self.cache is not None:
+            info = self.cache.lookup(path, st.st_size, st.st_mtime_ns)
+            if info is not None and info["thumb"]:
+                return info["thumb"]
+        info = read_image_info(path, self.size)
+        if self.cache is not None and info["format"]:
+            self.cache.store(path, st.st_size, st.st_mtime_ns, **info)
+        return info["thumb"]
+
+    def drain(self, limit=200):
+        """Paths whose thumbnail finished (or failed) since the last call."""
+        out = []
+        try:
+            while len(out) < limit:
+                out.append(self._results.get_nowait())
+        except queue.Empty:
+            pass
+        return out
+
+    @property
+    def busy(self) -> bool:
+        with self._lock:
+            return bool(self._running or self._wanted)
+
+    def shutdown(self):
+        with self._lock:
+            self._wanted.clear()
+        self._pool.shutdown(wait=False, cancel_futures=True)
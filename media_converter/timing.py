@@ -0,0 +1,141 @@
+import contextlib
+import json
+import math
+import os
+import threading
+import time
+
+# Order used in summaries; unknown stages are listed after these
+STAGES = ("open", "preview", "decode", "resize", "convert", "encode", "similarity", "write", "probe", "ffmpeg", "split", "segments", "join")
+
+
+def default_timings_path():
+    """Path from MEDIA_CONVERTER_TIMINGS, or None when timing is off."""
+    return os.environ.get("MEDIA_CONVERTER_TIMINGS") or None
+
+
+class FileTimer:
+    """Per-file stage timings and byte/pixel counts for one conversion.
+
+    Use ``with timer.stage("decode"): ...`` around each step; a stage entered
+    more than once accumulates. ``record`` is a plain dict, so it can be
+    returned from a worker process.
+    """
+
+    enabled = True
+
+    def __init__(self, path, kind):
+        self._t0 = time.perf_counter()
+        self.record = {"path": path, "kind": kind, "ok": None, "error": None, "stages": {}}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            stages = self.record["stages"]
+            stages[name] = stages.get(name, 0.0) + time.perf_counter() - t0
+
+    def set(self, **fields):
+        self.record.update(fields)
+
+    def finish(self, ok, error=None):
+        self.record["ok"] = bool(ok)
+        if error is not None:
+            self.record["error"] = f"{type(error).__name__}: {error}"
+        self.record["wall"] = time.perf_counter() - self._t0
+        return self.record
+
+
+class _NullTimer:
+    """Stand-in used when timing is off: every hook is a constant no-op."""
+
+    enabled = False
+    _null = contextlib.nullcontext()
+
+    def stage(self, name):
+        return self._null
+
+    def set(self, **fields):
+        pass
+
+    def finish(self, ok, error=None):
+        return None
+
+
+NULL_TIMER = _NullTimer()
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+class TimingLog:
+    """Collect FileTimer records, append each as a JSON line to path (if
+    given) and build an end-of-batch summary. Safe to use from several
+    threads."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.records = []
+        self._lock = threading.Lock()
+        self._fh = open(path, "a", encoding="utf-8") if path else None
+        self._started = time.perf_counter()
+
+    def add(self, record):
+        if record is None:
+            return
+        with self._lock:
+            self.records.append(record)
+            if self._fh:
+                self._fh.write(json.dumps(record, default=str) + "\n")
+                self._fh.flush()
+
+    def summary(self, slowest=5) -> str:
+        with self._lock:
+            records = list(self.records)
+        if not records:
+            return "No timings recorded."
+        elapsed = time.perf_counter() - self._started
+        failed = sum(1 for r in records if not r["ok"])
+        lines = [f"Timed {len(records)} files in {elapsed:.2f} s ({failed} failed)"]
+        in_bytes = sum(r.get("in_bytes") or 0 for r in records)
+        out_bytes = sum(r.get("out_bytes") or 0 for r in records)
+        if in_bytes:
+            lines.append(f"Read {in_bytes / 1e6:.1f} MB, wrote {out_bytes / 1e6:.1f} MB")
+
+        searched = [r for r in records if r.get("encode_attempts")]
+        if searched:
+            attempts = sum(r["encode_attempts"] for r in searched)
+            over = sum(1 for r in searched if "size" in (r.get("target_missed") or ()))
+            under = sum(1 for r in searched if "similarity" in (r.get("target_missed") or ()))
+            lines.append(f"Quality search: {len(searched)} files, {attempts} encodes"
+                         f" ({attempts / len(searched):.1f} per file), {over} over size target,"
+                         f" {under} under similarity target")
+
+        names = {n for r in records for n in r["stages"]}
+        ordered = [n for n in STAGES if n in names] + sorted(names - set(STAGES))
+        lines.append(f"  {'stage':10s} {'total s':>9s} {'p50 ms':>9s} {'p90 ms':>9s} {'p99 ms':>9s} {'max ms':>9s}")
+        for name in ordered:
+            vals = sorted(r["stages"][name] for r in records if name in r["stages"])
+            lines.append(f"  {name:10s} {sum(vals):9.2f} {percentile(vals, 50) * 1000:9.1f} {percentile(vals, 90) * 1000:9.1f}"
+                         f" {percentile(vals, 99) * 1000:9.1f} {vals[-1] * 1000:9.1f}")
+
+        lines.append("Slowest files:")
+        for r in sorted(records, key=lambda r: r.get("wall") or 0, reverse=True)[:slowest]:
+            top = max(r["stages"].items(), key=lambda kv: kv[1], default=None)
+            detail = f" (mostly {top[0]} {top[1] * 1000:.0f} ms)" if top else ""
+            status = "" if r["ok"] else f" FAILED {r['error'] or ''}"
+            lines.append(f"  {(r.get('wall') or 0) * 1000:9.1f} ms  {r['path']}{detail}{status}")
+        return "\n".join(lines)
+
+    def close(self):
+        with self._lock:
+            if self._fh:
+                self._fh.close()
+                self._fh = None
@@ -0,0 +1,403 @@
+import functools
+import json
+import os
+import subprocess
+import threading
+
+from .paths import RESOURCES_DIR, commit_output, discard_output, output_path_for, temp_path_for
+from .timing import NULL_TIMER
+
+
+def find_ffmpeg() -> str:
+    """Return path to ffmpeg executable. Prefer bundled ffmpeg under resources/ffmpeg/bin.
+    Fallback to 'ffmpeg' on PATH."""
+    # Allow override via env
+    env_bin = os.environ.get("FFMPEG_BIN")
+    if env_bin and os.path.exists(env_bin):
+        return env_bin
+    # Bundled location under resources
+    bundled = os.path.join(RESOURCES_DIR, "ffmpeg", "bin", "ffmpeg.exe")
+    if os.path.exists(bundled):
+        return bundled
+    # Unix-y fallback if ever applicable
+    bundled2 = os.path.join(RESOURCES_DIR, "ffmpeg", "bin", "ffmpeg")
+    if os.path.exists(bundled2):
+        return bundled2
+    return "ffmpeg"
+
+def find_ffprobe() -> str:
+    """Return path to ffprobe executable matching find_ffmpeg logic."""
+    env_bin = os.environ.get("FFPROBE_BIN")
+    if env_bin and os.path.exists(env_bin):
+        return env_bin
+    bundled = os.path.join(RESOURCES_DIR, "ffmpeg", "bin", "ffprobe.exe")
+    if os.path.exists(bundled):
+        return bundled
+    bundled2 = os.path.join(RESOURCES_DIR, "ffmpeg", "bin", "ffprobe")
+    if os.path.exists(bundled2):
+        return bundled2
+    return "ffprobe"
+
+def ffmpeg_available(ff=None) -> bool:
+    """Quick availability check: True if `ffmpeg -version` runs."""
+    try:
+        subprocess.run([ff or find_ffmpeg(), "-version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        return True
+    except Exception:
+        return False
+
+
+def is_raw_hevc(path: str) -> bool:
+    """Return True if the file extension indicates a raw HEVC elementary stream.
+    Such files typically have no container (e.g., .hevc, .h265) and need input hints."""
+    ext = os.path.splitext(path)[1].lower()
+    return ext in (".hevc", ".h265")
+
+
+def build_scale(width=None, height=None, keep_aspect=True):
+    """Return the ffmpeg scale filter for the requested size, or None."""
+    if width and height and not keep_aspect:
+        return f"scale={width}:{height}"
+    if width and keep_aspect:
+        return f"scale={width}:-2"
+    if height and keep_aspect:
+        return f"scale=-2:{height}"
+    return None
+
+
+# Audio codecs each container accepts as-is; anything else is transcoded
+AUDIO_COPY_CODECS = {
+    "mp4": {"aac", "mp3", "ac3", "eac3", "alac"},
+    "m4v": {"aac", "mp3", "ac3", "eac3", "alac"},
+    "mov": {"aac", "mp3", "ac3", "eac3", "alac", "pcm_s16le", "pcm_s24le"},
+    "mkv": None,  # Matroska takes any codec ffmpeg can mux
+    "avi": {"mp3", "ac3", "pcm_s16le", "aac"},
+    "webm": {"opus", "vorbis"},
+}
+AUDIO_TRANSCODE = {
+    "webm": ["-c:a", "libopus", "-b:a", "128k"],
+}
+DEFAULT_AUDIO_TRANSCODE = ["-c:a", "aac", "-b:a", "192k"]
+
+
+# Video codecs each container can hold without re-encoding (None = any)
+VIDEO_COPY_CODECS = {
+    "mp4": {"h264", "hevc", "mpeg4", "av1"},
+    "m4v": {"h264", "hevc", "mpeg4"},
+    "mov": {"h264", "hevc", "mpeg4", "prores", "mjpeg"},
+    "mkv": None,
+    "avi": {"h264", "mpeg4", "mjpeg", "msmpeg4v2", "msmpeg4v3"},
+    "webm": {"vp8", "vp9", "av1"},
+}
+_MP4_FAMILY = ("mp4", "m4v", "mov")
+# Input containers whose H.264/HEVC is already Annex B (start codes)
+_ANNEXB_EXTS = (".ts", ".m2ts", ".mts", ".hevc", ".h265", ".h264", ".264")
+
+REMUX = "remux"
+ENCODE = "encode"
+
+
+@functools.lru_cache(maxsize=1024)
+def _probe_json(path, size, mtime_ns, fp):
+    # size/mtime are part of the key so an edited file is probed again
+    r = subprocess.run(
+        [fp, "-v", "error", "-print_format", "json", "-show_format", "-show_streams", path],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    return json.loads(r.stdout or "{}")
+
+
+def _rotation(stream) -> int:
+    rotate = (stream.get("tags") or {}).get("rotate")
+    if rotate is None:
+        for side in stream.get("side_data_list") or ():
+            if "rotation" in side:
+                rotate = side["rotation"]
+                break
+    try:
+        return int(float(rotate)) % 360
+    except (TypeError, ValueError):
+        return 0
+
+
+def probe_video(path: str, fp=None):
+    """Probe a file once with ffprobe and return a summary dict:
+
+    duration (seconds or None), bit_rate (overall, bits/s or None), width,
+    height, video_codec, pix_fmt, rotation (degrees), audio_codecs (one
+    per audio stream) and streams
+    (the raw ffprobe stream list). Results are cached per path, size and
+    mtime, so repeated calls for the same file don't start new processes.
+    """
+    info = {"duration": None, "bit_rate": None, "width": None, "height": None, "video_codec": None,
+            "pix_fmt": None, "rotation": 0, "audio_codecs": [], "streams": []}
+    try:
+        st = os.stat(path)
+        data = _probe_json(os.path.abspath(path), st.st_size, st.st_mtime_ns, fp or find_ffprobe())
+    except Exception:
+        return info
+    streams = data.get("streams") or []
+    info["streams"] = streams
+    try:
+        info["duration"] = float(data.get("format", {}).get("duration")) or None
+    except (TypeError, ValueError):
+        pass
+    try:
+        info["bit_rate"] = int(data.get("format", {}).get("bit_rate")) or None
+    except (TypeError, ValueError):
+        pass
+    for stream in streams:
+        kind = stream.get("codec_type")
+        if kind == "video" and info["video_codec"] is None and not (stream.get("disposition") or {}).get("attached_pic"):
+            info["video_codec"] = stream.get("codec_name")
+            info["width"] = stream.get("width")
+            info["height"] = stream.get("height")
+            info["pix_fmt"] = stream.get("pix_fmt")
+            info["rotation"] = _rotation(stream)
+            if info["duration"] is None:
+                try:
+                    info["duration"] = float(stream.get("duration")) or None
+                except (TypeError, ValueError):
+                    pass
+        elif kind == "audio":
+            info["audio_codecs"].append(stream.get("codec_name"))
+    return info
+
+
+def input_has_audio(path: str, fp=None) -> bool:
+    return bool(probe_video(path, fp)["audio_codecs"])
+
+
+def probe_video_size(path: str, fp=None):
+    """Return (width, height) of the first video stream, or None."""
+    info = probe_video(path, fp)
+    if not info["width"] or not info["height"]:
+        return None
+    return info["width"], info["height"]
+
+
+def probe_duration(path: str, fp=None):
+    """Return the duration in seconds, or None if ffprobe can't tell
+    (e.g. raw .hevc streams)."""
+    return probe_video(path, fp)["duration"]
+
+
+def audio_args(info, output_format):
+    """ffmpeg audio arguments for an input probed with probe_video(): copy
+    when every audio track is legal in the target container, otherwise
+    transcode to the container's default codec, and nothing without audio."""
+    codecs = info["audio_codecs"]
+    if not codecs:
+        return []
+    out_fmt = output_format.lower()
+    allowed = AUDIO_COPY_CODECS.get(out_fmt, set())
+    if allowed is None or all(c in allowed for c in codecs):
+        return ["-c:a", "copy"]
+    return list(AUDIO_TRANSCODE.get(out_fmt, DEFAULT_AUDIO_TRANSCODE))
+
+
+def plan_video(info, output_format, width=None, height=None, remux=False) -> str:
+    """Return REMUX if the probed input can be stream-copied into the target
+    container unchanged, else ENCODE. Remuxing needs remux=True, no resize,
+    and video and audio codecs the container accepts; the CRF setting does
+    not apply to a remux."""
+    if not remux or width or height or not info["video_codec"]:
+        return ENCODE
+    out_fmt = output_format.lower()
+    if out_fmt not in VIDEO_COPY_CODECS:
+        return ENCODE
+    allowed = VIDEO_COPY_CODECS[out_fmt]
+    if allowed is not None and info["video_codec"] not in allowed:
+        return ENCODE
+    if info["audio_codecs"] and audio_args(info, out_fmt) != ["-c:a", "copy"]:
+        return ENCODE
+    return REMUX
+
+
+def build_remux_command(input_path, output_format, info, ff=None):
+    """Return the ffmpeg argument list (without output path) that copies the
+    input's streams into a new container, adding the bitstream filters the
+    target container needs."""
+    out_fmt = output_format.lower()
+    ext = os.path.splitext(input_path)[1].lower()
+    in_args = []
+    if is_raw_hevc(input_path):
+        in_args += ["-f", "hevc", "-fflags", "+genpts"]
+    cmd = [ff or find_ffmpeg(), "-y", "-hide_banner", "-loglevel", "error", *in_args, "-i", input_path, "-c", "copy"]
+    vcodec = info["video_codec"]
+    if out_fmt in _MP4_FAMILY:
+        if "aac" in info["audio_codecs"] and ext in _ANNEXB_EXTS:
+            cmd += ["-bsf:a", "aac_adtstoasc"]
+        if vcodec == "hevc":
+            # hvc1 sample entries are required for playback on Apple devices
+            cmd += ["-tag:v", "hvc1"]
+        cmd += ["-movflags", "+faststart"]
+    elif out_fmt == "avi" and vcodec == "h264" and ext not in _ANNEXB_EXTS:
+        cmd += ["-bsf:v", "h264_mp4toannexb"]
+    if out_fmt != "mkv":
+        # Text subtitle formats rarely survive a copy into these containers
+        cmd += ["-sn"]
+    return cmd
+
+
+def progress_stats(fields, duration=None):
+    """Turn one ffmpeg -progress block into percent, fps, speed and eta.
+
+    percent and eta (seconds of wall time left) need the input duration and
+    are None without it; any field ffmpeg reports as N/A is None as well.
+    """
+    def number(key, strip=""):
+        try:
+            return float(fields.get(key, "").rstrip(strip))
+        except ValueError:
+            return None
+
+    stats = {"percent": None, "fps": number("fps"), "speed": number("speed", "x"), "eta": None}
+    out_us = number("out_time_us")
+    if out_us is None:
+        out_us = number("out_time_ms")  # older ffmpeg; also microseconds despite the name
+    if fields.get("progress") == "end":
+        stats["percent"] = 100.0
+        stats["eta"] = 0.0
+    elif duration and out_us is not None and out_us >= 0:
+        done = out_us / 1_000_000
+        stats["percent"] = min(100.0, 100.0 * done / duration)
+        if stats["speed"]:
+            stats["eta"] = max(0.0, duration - done) / stats["speed"]
+    return stats
+
+
+def build_video_command(input_path, output_format, width=None, height=None, keep_aspect=True, crf=23, ff=None, threads=None, info=None):
+    """Return the ffmpeg argument list for encoding input_path, without the
+    output path (see convert_video). With info from probe_video() the audio
+    arguments are included (see audio_args); without it they are left out.
+    threads caps the encoder's thread count; None leaves ffmpeg's default
+    (all cores)."""
+    out_fmt = output_format.lower()
+    in_args = []
+    if is_raw_hevc(input_path):
+        # Hint demuxer and generate timestamps for raw elementary stream
+        in_args += ["-f", "hevc", "-fflags", "+genpts"]
+    cmd = [ff or find_ffmpeg(), "-y", "-hide_banner", "-loglevel", "error", *in_args, "-i", input_path]
+    scale = build_scale(width, height, keep_aspect)
+    if scale:
+        cmd += ["-vf", scale]
+
+    # Choose codec based on container (simple defaults)
+    vcodec = "libx264"
+    if out_fmt in ("webm",):
+        vcodec = "libvpx-vp9"
+    cmd += ["-c:v", vcodec, "-crf", str(crf), "-pix_fmt", "yuv420p"]
+    if threads:
+        cmd += ["-threads", str(threads)]
+
+    # Faststart for mp4/mov/m4v
+    if out_fmt in ("mp4", "mov", "m4v"):
+        cmd += ["-movflags", "+faststart"]
+    if info is not None:
+        cmd += audio_args(info, out_fmt)
+    return cmd
+
+
+def run_ffmpeg(cmd, on_progress=None):
+    """Run an ffmpeg command and return (returncode, stderr text).
+
+    With on_progress, ffmpeg is asked for machine-readable -progress output
+    on stdout and on_progress(fields) is called with each key=value block
+    (frame, fps, total_size, out_time_us, speed, progress=continue|end).
+    """
+    if on_progress is None:
+        res = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        return res.returncode, res.stderr.decode(errors="replace")
+
+    cmd = [cmd[0], "-progress", "pipe:1", "-nostats", *cmd[1:]]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, errors="replace")
+    # Drain stderr separately so a chatty encoder can't fill the pipe and stall
+    err_chunks = []
+    err_thread = threading.Thread(target=lambda: err_chunks.append(proc.stderr.read()), daemon=True)
+    err_thread.start()
+    fields = {}
+    for line in proc.stdout:
+        key, sep, value = line.strip().partition("=")
+        if not sep:
+            continue
+        fields[key] = value
+        if key == "progress":
+            try:
+                on_progress(fields)
+            except Exception:
+                pass
+            fields = {}
+    proc.wait()
+    err_thread.join()
+    return proc.returncode, "".join(err_chunks)
+
+
+def _speed_recorder(timer, on_progress):
+    """Wrap on_progress so the last speed/fps ffmpeg reported end up in timer."""
+    def record(fields):
+        stats = progress_stats(fields)
+        if stats["speed"] is not None:
+            timer.set(ffmpeg_speed=stats["speed"])
+        if stats["fps"] is not None:
+            timer.set(ffmpeg_fps=stats["fps"])
+        if on_progress:
+            on_progress(fields)
+    return record
+
+
+def convert_video(input_path, output_format, output_folder, width=None, height=None, keep_aspect=True, crf=23, conflict='keep', ff=None, fp=None,
+                  output_path=None, threads=None, on_progress=None, remux=False, on_plan=None, timer=NULL_TIMER):
+    """Encode one video with ffmpeg in a single pass. The input is probed
+    first (cached) so audio is copied when the target container accepts it
+    and transcoded otherwise. Returns the output path on success, False otherwise;
+    output_path overrides the derived name like in convert_image().
+    threads and on_progress are passed to build_video_command/run_ffmpeg.
+    With remux=True, inputs that qualify (see plan_video) are stream-copied
+    instead, falling back to an encode if the copy fails; on_plan(method) is
+    called with REMUX or ENCODE before each ffmpeg run. timer (a
+    timing.FileTimer) records probe and ffmpeg wall time, the encode speed
+    ffmpeg reported and input/output sizes."""
+    tmp = None
+    if timer.enabled:
+        on_progress = _speed_recorder(timer, on_progress)
+    try:
+        outp = output_path
+        # With 'keep' the first free " (n)" name is taken when committing
+        exclusive = not outp and conflict == 'keep'
+        if not outp:
+            outp = output_path_for(input_path, output_folder, output_format.lower())
+        # ffmpeg writes a hidden temp file that is renamed into place on success
+        tmp = temp_path_for(outp)
+        with timer.stage("probe"):
+            info = probe_video(input_path, fp)
+        method = plan_video(info, output_format, width, height, remux)
+        if method == REMUX:
+            if on_plan:
+                on_plan(REMUX)
+            with timer.stage("ffmpeg"):
+                code, err = run_ffmpeg(build_remux_command(input_path, output_format, info, ff=ff) + [tmp], on_progress)
+            if code != 0:
+                print(f"Remux failed for {input_path}, re-encoding: {err.strip()}")
+                method = ENCODE
+        if method == ENCODE:
+            if on_plan:
+                on_plan(ENCODE)
+            cmd = build_video_command(input_path, output_format, width, height, keep_aspect, crf, ff=ff, threads=threads, info=info)
+            with timer.stage("ffmpeg"):
+                code, err = run_ffmpeg(cmd + [tmp], on_progress)
+        if timer.enabled:
+            timer.set(method=method, duration=info["duration"], in_bytes=os.path.getsize(input_path),
+                      out_bytes=os.path.getsize(tmp) if code == 0 else None)
+        if code == 0:
+            return commit_output(tmp, outp, exclusive)
+        print(f"Failed to convert {input_path}: {err.strip()}")
+        timer.set(error=err.strip()[-500:])
+    except Exception as e:
+        print(f"Failed to convert {input_path}: {e}")
+        timer.set(error=f"{type(e).__name__}: {e}")
+    if tmp:
+        discard_output(tmp)
+    return False
@@ -0,0 +1,470 @@
+import collections
+import ctypes
+import ctypes.util
+import heapq
+import json
+import os
+import select
+import shutil
+import struct
+import sys
+import threading
+import time
+
+from .paths import OutputPlanner, media_kind, unique_path
+
+# Files must be quiet (no writes, same size and mtime) this long before
+# they are converted
+DEFAULT_SETTLE = 2.0
+DEFAULT_POLL_INTERVAL = 2.0
+# Throughput is averaged over this window
+RATE_WINDOW = 60.0
+# Own outputs and handled inputs remembered, oldest forgotten first, and how
+# often entries whose files are gone are dropped
+MAX_REMEMBERED = 100_000
+PRUNE_INTERVAL = 300.0
+# Partial downloads/uploads and editor temp files
+IGNORED_SUFFIXES = (".part", ".partial", ".crdownload", ".tmp", ".download", ".done", ".failed")
+
+PROCESSED_DIR = "processed"
+FAILED_DIR = "failed"
+
+ON_DONE = ("move", "mark", "leave")
+
+DEFAULT_PRESET = {
+    "image": {"output_format": "JPEG", "output_folder": "", "jpeg_quality": 95},
+    "video": {"output_format": "mp4", "output_folder": "", "crf": 23},
+}
+
+
+def load_preset(path):
+    """Read a watch preset: {"image": {...}, "video": {...}} holding
+    convert_image/convert_video keyword arguments. Missing sections fall
+    back to DEFAULT_PRESET."""
+    with open(path, encoding="utf-8") as fh:
+        data = json.load(fh)
+    return {kind: dict(DEFAULT_PRESET[kind], **(data.get(kind) or {})) for kind in DEFAULT_PRESET}
+
+
+def save_preset(path, preset):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(preset, fh, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+# ---- change sources -----------------------------------------------------------
+
+class _Inotify:
+    """Minimal inotify binding (Linux only) over ctypes; no dependencies."""
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_Q_OVERFLOW = 0x00004000
+    IN_ISDIR = 0x40000000
+    _HEADER = struct.Struct("iIII")
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs = {}
+
+    def add(self, directory):
+        mask = self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_TO
+        wd = self._add_watch(self.fd, os.fsencode(directory), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"cannot watch {directory}")
+        self.dirs[wd] = directory
+
+    def read(self, timeout):
+        """Return [(path, overflow)] for events within timeout seconds; an
+        overflow entry (None, True) means events were lost."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return []
+        out = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = self._HEADER.unpack_from(data, offset)
+            offset += self._HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & self.IN_Q_OVERFLOW:
+                out.append((None, True))
+                continue
+            if mask & self.IN_ISDIR or wd not in self.dirs:
+                continue
+            out.append((os.path.join(self.dirs[wd], os.fsdecode(name)), False))
+        return out
+
+    def close(self):
+        os.close(self.fd)
+
+
+def _scan(directory):
+    """Yield (path, size, mtime_ns) for regular files directly in directory."""
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                try:
+                    if entry.is_file(follow_symlinks=False):
+                        st = entry.stat(follow_symlinks=False)
+                        yield entry.path, st.st_size, st.st_mtime_ns
+                except OSError:
+                    continue
+    except OSError:
+        return
+
+
+class _Debouncer:
+    """Hold paths until they have been quiet for settle seconds.
+
+    Deadlines live in a heap, so each tick only looks at due entries, and a
+    file is released only if its size and mtime did not change since its
+    last event; otherwise it is re-armed.
+    """
+
+    def __init__(self, settle):
+        self.settle = settle
+        self._due = {}  # path -> (deadline, (size, mtime_ns))
+        self._heap = []
+
+    def __len__(self):
+        return len(self._due)
+
+    def touch(self, path, sig=None, now=None):
+        if sig is None:
+            try:
+                st = os.stat(path)
+            except OSError:
+                self._due.pop(path, None)
+                return
+            sig = (st.st_size, st.st_mtime_ns)
+        deadline = (now or time.monotonic()) + self.settle
+        self._due[path] = (deadline, sig)
+        heapq.heappush(self._heap, (deadline, path))
+
+    def pop_ready(self, now=None, accept=None):
+        """Return (path, (size, mtime_ns)) for files quiet since their last
+        event; paths accept() rejects by now are dropped."""
+        now = now or time.monotonic()
+        ready = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, path = heapq.heappop(self._heap)
+            entry = self._due.get(path)
+            if entry is None or entry[0] != deadline:
+                continue  # superseded by a later event
+            try:
+                st = os.stat(path)
+            except OSError:
+                del self._due[path]
+                continue
+            if (st.st_size, st.st_mtime_ns) != entry[1]:
+                self.touch(path, (st.st_size, st.st_mtime_ns), now)
+                continue
+            del self._due[path]
+            if accept is None or accept(path):
+                ready.append((path, entry[1]))
+        return ready
+
+
+def _remember(table, key, value=None):
+    """Set key in an OrderedDict kept to MAX_REMEMBERED entries, dropping the
+    least recently set first."""
+    table[key] = value
+    table.move_to_end(key)
+    while len(table) > MAX_REMEMBERED:
+        table.popitem(last=False)
+
+
+class _RecordingPlanner(OutputPlanner):
+    """OutputPlanner that reports every output path as it is planned, i.e.
+    before the file is written."""
+
+    def __init__(self, on_plan):
+        super().__init__()
+        self._on_plan = on_plan
+
+    def plan_options(self, input_path, options):
+        options = super().plan_options(input_path, options)
+        self._on_plan(options["output_path"])
+        return options
+
+
+# ---- service -----------------------------------------------------------------
+
+class WatchService:
+    """Hot-folder converter: watch directories (not recursive) and convert
+    new images and videos with a preset as soon as they finish being written.
+
+    Linux uses inotify, so a burst of thousands of files costs one event per
+    file and directories are only rescanned at start-up or when the kernel
+    queue overflows; elsewhere (or with use_inotify=False) directories are
+    polled every poll_interval seconds. Ready files are batched to
+    ImageConversionEngine and VideoJobScheduler. Afterwards each input is
+    moved to processed/ or failed/ beside it ("move"), renamed with a .done or
+    .failed suffix ("mark"), or left alone ("leave").
+    """
+
+    def __init__(self, directories, preset=None, output_folder=None, on_done="move", settle=DEFAULT_SETTLE,
+                 poll_interval=DEFAULT_POLL_INTERVAL, use_inotify=None, image_workers=None, video_jobs=None,
+                 timings=None):
+        if on_done not in ON_DONE:
+            raise ValueError(f"on_done must be one of {ON_DONE}")
+        self.directories = [os.path.abspath(d) for d in directories]
+        self.preset = {kind: dict(opts) for kind, opts in (preset or DEFAULT_PRESET).items()}
+        if output_folder is not None:
+            for opts in self.preset.values():
+                opts["output_folder"] = output_folder
+        self.on_done = on_done
+        self.poll_interval = poll_interval
+        self.image_workers = image_workers
+        self.video_jobs = video_jobs
+        self.timings = timings
+        self._debounce = _Debouncer(settle)
+        self._ready = {"image": collections.deque(), "video": collections.deque()}
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._running = {"image": 0, "video": 0}
+        # Our own outputs that land in a watched folder, and input -> (size,
+        # mtime_ns) when queued, until it is moved away; both bounded
+        self._produced = collections.OrderedDict()
+        self._handled = collections.OrderedDict()
+        self._pruned = time.monotonic()
+        self._done = 0
+        self._failed = 0
+        self._completions = collections.deque()  # (monotonic time, input bytes)
+        self._started = None
+        self._threads = []
+        self._inotify = None
+        if use_inotify is None:
+            use_inotify = sys.platform.startswith("linux")
+        if use_inotify:
+            try:
+                self._inotify = _Inotify()
+                for d in self.directories:
+                    self._inotify.add(d)
+            except (OSError, AttributeError) as e:
+                print(f"inotify unavailable ({e}); polling every {poll_interval}s")
+                if self._inotify:
+                    self._inotify.close()
+                self._inotify = None
+
+    @property
+    def mode(self):
+        return "inotify" if self._inotify else "polling"
+
+    # ---- life cycle -----------------------------------------------------------
+    def start(self):
+        self._started = time.monotonic()
+        targets = [self._watch_loop, lambda: self._convert_loop("image"), lambda: self._convert_loop("video")]
+        for target in targets:
+            t = threading.Thread(target=target, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, wait=True):
+        """Stop watching; batches already handed to converters finish first.
+        The watcher thread is always joined (it wakes within half a second)
+        so the inotify fd is never closed under it."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for t in self._threads if wait else self._threads[:1]:
+            t.join()
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
+
+    def run_forever(self, status=None, status_interval=10.0):
+        """Block until KeyboardInterrupt, calling status(stats()) periodically."""
+        self.start()
+        try:
+            while not self._stop.wait(status_interval):
+                if status:
+                    status(self.stats())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    # ---- watching -----------------------------------------------------------
+    def _accept(self, path):
+        name = os.path.basename(path)
+        if name.startswith(".") or name.lower().endswith(IGNORED_SUFFIXES):
+            return False
+        with self._cond:
+            if path in self._produced:
+                return False
+        return media_kind(path) is not None
+
+    def _planned(self, output_path):
+        output_path = os.path.abspath(output_path)
+        if os.path.dirname(output_path) in self.directories:
+            with self._cond:
+                _remember(self._produced, output_path)
+
+    def _prune(self):
+        """Forget inputs and outputs whose files are gone. Outputs are only
+        pruned while nothing is converting, when every planned one has been
+        written or abandoned."""
+        self._pruned = time.monotonic()
+        with self._cond:
+            produced = list(self._produced)
+            handled = list(self._handled.items())
+        produced = [p for p in produced if not os.path.exists(p)]
+        handled = [(p, sig) for p, sig in handled if not os.path.exists(p)]
+        with self._cond:
+            if not any(self._ready.values()) and not any(self._running.values()):
+                for path in produced:
+                    self._produced.pop(path, None)
+            for path, sig in handled:
+                if self._handled.get(path) == sig:
+                    del self._handled[path]
+
+    def _watch_loop(self):
+        snapshot = {}
+        # Files already waiting when the service starts
+        for d in self.directories:
+            for path, size, mtime in _scan(d):
+                snapshot[path] = (size, mtime)
+                if self._accept(path):
+                    self._debounce.touch(path, (size, mtime))
+        while not self._stop.is_set():
+            if self._inotify:
+                for path, overflow in self._inotify.read(min(0.5, self._debounce.settle)):
+                    if overflow:
+                        # Kernel dropped events: fall back to one full rescan
+                        for d in self.directories:
+                            for p, size, mtime in _scan(d):
+                                if self._accept(p):
+                                    self._debounce.touch(p, (size, mtime))
+                    elif self._accept(path):
+                        self._debounce.touch(path)
+            else:
+                self._stop.wait(self.poll_interval)
+                seen = {}
+                for d in self.directories:
+                    for path, size, mtime in _scan(d):
+                        seen[path] = (size, mtime)
+                        if snapshot.get(path) != (size, mtime) and self._accept(path):
+                            self._debounce.touch(path, (size, mtime))
+                snapshot = seen
+            # Outputs planned while a file settled are rejected here
+            ready = self._debounce.pop_ready(accept=self._accept)
+            if ready:
+                with self._cond:
+                    for path, sig in ready:
+                        # Queued, converting or left in place unchanged: not again
+                        if self._handled.get(path) == sig:
+                            continue
+                        _remember(self._handled, path, sig)
+                        self._ready[media_kind(path)].append(path)
+                    self._cond.notify_all()
+            if time.monotonic() - self._pruned >= PRUNE_INTERVAL:
+                self._prune()
+
+    # ---- converting ---------------------------------------------------------
+    def _convert_loop(self, kind):
+        while True:
+            with self._cond:
+                while not self._ready[kind] and not self._stop.is_set():
+                    self._cond.wait()
+                if self._stop.is_set():
+                    return
+                batch = list(self._ready[kind])
+                self._ready[kind].clear()
+                self._running[kind] = len(batch)
+            try:
+                results = self._convert_images(batch) if kind == "image" else self._convert_videos(batch)
+            except Exception as e:
+                print(f"{kind} batch failed: {e}")
+                results = [(path, False) for path in batch]
+            for path, result in results:
+                self._finish(path, result)
+            with self._cond:
+                self._running[kind] = 0
+
+    def _convert_images(self, batch):
+        from .engine import ImageConversionEngine
+
+        outputs = {}
+        engine = ImageConversionEngine(max_workers=self.image_workers)
+        engine.run(batch, self.preset["image"], progress=lambda done, total, path, ok: outputs.setdefault(path, ok),
+                   timings=self.timings, planner=_RecordingPlanner(self._planned))
+        return [(path, outputs.get(path, False)) for path in batch]
+
+    def _convert_videos(self, batch):
+        from .scheduler import VideoJobScheduler
+
+        scheduler = VideoJobScheduler(max_jobs=self.video_jobs, timings=self.timings)
+        planner = _RecordingPlanner(self._planned)
+        for path in batch:
+            scheduler.add(path, planner.plan_options(path, self.preset["video"]))
+        scheduler.start()
+        scheduler.wait()
+        return [(job.path, job.result) for job in scheduler.jobs]
+
+    def _finish(self, path, result):
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        if self.on_done == "move":
+            target = os.path.join(os.path.dirname(path), PROCESSED_DIR if result else FAILED_DIR)
+            os.makedirs(target, exist_ok=True)
+            dest = os.path.join(target, os.path.basename(path))
+            if os.path.exists(dest):
+                dest = unique_path(dest)
+            self._move(path, dest)
+        elif self.on_done == "mark":
+            self._move(path, path + (".done" if result else ".failed"))
+        with self._cond:
+            if self.on_done != "leave" and not os.path.exists(path):
+                # Moved away: a new file arriving under this name is new work
+                self._handled.pop(path, None)
+            if result:
+                self._done += 1
+            else:
+                self._failed += 1
+            self._completions.append((time.monotonic(), size))
+
+    @staticmethod
+    def _move(src, dest):
+        try:
+            shutil.move(src, dest)
+        except OSError as e:
+            print(f"Could not move {src}: {e}")
+
+    # ---- reporting ----------------------------------------------------------
+    def stats(self) -> dict:
+        """Queue depth and throughput: files waiting to settle, ready to
+        convert, converting now, finished, and files/s and input bytes/s over
+        the last RATE_WINDOW seconds."""
+        now = time.monotonic()
+        with self._cond:
+            while self._completions and self._completions[0][0] < now - RATE_WINDOW:
+                self._completions.popleft()
+            window = min(RATE_WINDOW, now - self._started) if self._started else 0
+            ready = sum(len(q) for q in self._ready.values())
+            running = sum(self._running.values())
+            return {
+                "mode": self.mode,
+                "settling": len(self._debounce),
+                "ready": ready,
+                "converting": running,
+                "queue_depth": len(self._debounce) + ready + running,
+                "done": self._done,
+                "failed": self._failed,
+                "files_per_sec": len(self._completions) / window if window else 0.0,
+                "bytes_per_sec": sum(n for _, n in self._completions) / window if window else 0.0,
+            }